@@ -0,0 +1,65 @@
+# Compares the thumbnail decode pipeline against a full decode followed by
+# a LANCZOS resize, on a synthetic full-HD JPEG poster.
+#
+#     python benchmarks/decode_images.py [--runs 20] [--width 1920] [--height 2880]
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from gw_collections.images import IMAGE_SIZE  # noqa: E402
+from gw_collections.thumbnails import decode_thumbnail  # noqa: E402
+
+
+def sample_jpeg(width, height):
+    image = Image.new('RGB', (width, height), (30, 40, 60))
+    draw = ImageDraw.Draw(image)
+    for i in range(0, width, 40):
+        draw.line([(i, 0), (width - i, height)], fill=(i % 256, 120, 255 - i % 256), width=5)
+    out = io.BytesIO()
+    image.save(out, format='JPEG', quality=90)
+    return out.getvalue()
+
+
+def full_decode(data, size):
+    image = Image.open(io.BytesIO(data))
+    image = image.resize(size, Image.LANCZOS)
+    image.load()
+    return image
+
+
+def cpu_ms(decode, data, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.process_time()
+        decode(data, IMAGE_SIZE)
+        timings.append((time.process_time() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Poster decode CPU time")
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=2880)
+    args = parser.parse_args(argv)
+
+    data = sample_jpeg(args.width, args.height)
+    before = cpu_ms(full_decode, data, args.runs)
+    after = cpu_ms(decode_thumbnail, data, args.runs)
+    print(f"{args.width}x{args.height} JPEG ({len(data) // 1024} KiB) to fit {IMAGE_SIZE[0]}x{IMAGE_SIZE[1]}: "
+          f"full decode + LANCZOS {before:.1f} ms CPU, draft + reduce + LANCZOS {after:.1f} ms CPU "
+          f"({before / after:.1f}x)")
+    print(f"thumbnail size: {decode_thumbnail(data, IMAGE_SIZE).size}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
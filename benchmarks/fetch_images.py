@@ -0,0 +1,92 @@
+# Fetches posters from the local stand-in server with the pooled fetch layer
+# and with a plain urlopen per image, and checks that the pool behaves:
+# conditional requests, retries, timeouts, compressed bodies and the body
+# size limit, compressed or not.
+#
+#     python benchmarks/fetch_images.py [--images 200] [--latency-ms 5]
+import argparse
+import os
+import socket
+import sys
+import time
+from urllib.request import urlopen
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from gw_collections.fetch import ConnectionPool  # noqa: E402
+from image_server import PosterServer  # noqa: E402
+
+
+def timed(fetch, urls):
+    start = time.perf_counter()
+    for url in urls:
+        fetch(url)
+    return time.perf_counter() - start
+
+
+def check(name, condition):
+    print(f"{'ok' if condition else 'FAIL'}: {name}")
+    return condition
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pooled vs one-connection-per-image fetching")
+    parser.add_argument('--images', type=int, default=200)
+    parser.add_argument('--latency-ms', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    server = PosterServer(latency_ms=args.latency_ms).start()
+    urls = [f"{server.url}/poster/{n}.png" for n in range(args.images)]
+    pool = ConnectionPool(timeout=2, deadline=5, backoff=0.05)
+    ok = True
+    try:
+        pool.get(urls[0])  # warm up the server's poster bytes
+        plain = timed(lambda url: urlopen(url, timeout=10).read(), urls)
+        before = len(server.connections)
+        pooled = timed(pool.get, urls)
+        print(f"{args.images} posters: urlopen {plain * 1000:.0f} ms, "
+              f"pooled {pooled * 1000:.0f} ms ({plain / pooled:.1f}x)")
+        ok &= check("pooled fetches reuse one connection", len(server.connections) - before <= 1)
+
+        first = pool.get(urls[1])
+        again = pool.get(urls[1], {'If-None-Match': first.headers['ETag']})
+        ok &= check("conditional request answered with 304", again.status == 304 and again.body == b'')
+
+        retried = pool.get(f"{server.url}/poster/1.png?fail=2")
+        ok &= check("503s retried with backoff", retried.status == 200)
+
+        start = time.perf_counter()
+        try:
+            ConnectionPool(timeout=0.5, deadline=2, retries=1, backoff=0.05).get(f"{server.url}/hang")
+            hung = False
+        except socket.timeout:
+            hung = True
+        ok &= check(f"hung host gives up after {time.perf_counter() - start:.1f} s", hung)
+
+        try:
+            ConnectionPool(max_body=1024 * 1024).get(f"{server.url}/big")
+            limited = False
+        except ValueError:
+            limited = True
+        ok &= check("oversized body rejected", limited)
+
+        plain_body = pool.get(urls[2]).body
+        for encoding in ('gzip', 'deflate', 'raw-deflate'):
+            decoded = pool.get(f"{urls[2]}?encoding={encoding}").body
+            ok &= check(f"{encoding} body decoded", decoded == plain_body)
+
+        try:
+            ConnectionPool(max_body=1024 * 1024).get(f"{server.url}/big?encoding=gzip")
+            limited = False
+        except ValueError:
+            limited = True
+        ok &= check("oversized body rejected when sent gzip-encoded", limited)
+    finally:
+        pool.close()
+        server.shutdown()
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
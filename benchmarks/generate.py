@@ -0,0 +1,85 @@
+# Synthetic Movie/Game/Book collections for the benchmarks. Items are made
+# from a seed so every run sees the same data, and files are written as a
+# stream so even 10M-item collections never have to fit in memory.
+#
+#     python benchmarks/generate.py movies 100000 movies.json [--seed 0]
+import argparse
+import json
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from gw_collections.models import Book, Game, Movie  # noqa: E402
+
+WORDS = ('night dark star war love city last blood dead king queen secret lost return rise fall '
+         'shadow fire ice storm dream heart iron golden silent wild black white red blue empire '
+         'journey house river mountain ocean sky island garden ghost machine legend hunter').split()
+NAMES = ('Smith Johnson Garcia Miller Davis Rodriguez Martinez Hernandez Lopez Wilson Anderson '
+         'Thomas Taylor Moore Jackson Martin Lee Thompson White Harris Clark Lewis Walker Young').split()
+GENRES = {
+    'movies': ('Action', 'Drama', 'Comedy', 'Horror', 'Sci-Fi', 'Thriller', 'Romance', 'Animation', 'Documentary'),
+    'games': ('RPG', 'Shooter', 'Strategy', 'Puzzle', 'Platformer', 'Racing', 'Sports', 'Simulation'),
+    'books': ('Fantasy', 'Mystery', 'Biography', 'History', 'Science', 'Romance', 'Poetry', 'Thriller'),
+}
+PLATFORMS = ('PC', 'PlayStation 5', 'Xbox Series X', 'Switch', 'Mobile')
+KINDS = tuple(GENRES)
+
+
+def skewed(rng, values):
+    # A few values are much more common than the rest, as in real collections
+    return values[min(int(rng.paretovariate(1.2)) - 1, len(values) - 1)]
+
+
+def title(rng, number):
+    words = [rng.choice(WORDS).capitalize() for _ in range(rng.randint(1, 4))]
+    return f"The {' '.join(words)}" if number % 3 == 0 else ' '.join(words)
+
+
+def make_item(kind, rng, number, image_base=None):
+    genre = skewed(rng, GENRES[kind])
+    creator = f"{rng.choice(NAMES)} {skewed(rng, NAMES)}"
+    description = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 30)))
+    image_url = f"{image_base}/poster/{number % 5000}.png" if image_base else ''
+    if kind == 'movies':
+        length = f"{rng.randint(1, 3)}:{rng.randint(0, 59):02d}"
+        return Movie(title(rng, number), creator, genre, length, description, image_url)
+    if kind == 'games':
+        return Game(title(rng, number), creator, genre, rng.choice(PLATFORMS), description, image_url)
+    return Book(title(rng, number), creator, genre, str(rng.randint(80, 1200)), description, image_url)
+
+
+def generate_items(kind, count, seed=0, image_base=None):
+    rng = random.Random(f"{kind}:{seed}")
+    for number in range(count):
+        yield make_item(kind, rng, number, image_base)
+
+
+def write_collection(file_name, items):
+    # A JSON array FileManager can read, one item per line
+    temp_name = file_name + '.tmp'
+    with open(temp_name, 'w') as f:
+        f.write('[')
+        for number, item in enumerate(items):
+            f.write(',\n' if number else '\n')
+            f.write(json.dumps(item.to_dict()))
+        f.write('\n]\n')
+    os.replace(temp_name, file_name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic collection file")
+    parser.add_argument('kind', choices=KINDS)
+    parser.add_argument('count', type=int)
+    parser.add_argument('file_name')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--image-base', help="e.g. http://127.0.0.1:8765 for benchmarks/image_server.py")
+    args = parser.parse_args(argv)
+    write_collection(args.file_name, generate_items(args.kind, args.count, args.seed, args.image_base))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,157 @@
+# A local stand-in for a poster CDN, for benchmarks and manual testing.
+# Serves keep-alive HTTP/1.1 with ETag/Last-Modified and 304 responses.
+#
+#     python benchmarks/image_server.py [--port 8765] [--latency-ms 20]
+#
+# Paths:
+#     /poster/<n>.png   a poster (a real PNG when Pillow is installed)
+#     ?delay=<ms>       answer after a delay
+#     ?fail=<n>         answer 503 to the first n requests for the path
+#     ?encoding=<e>     send the body compressed: gzip, deflate (zlib) or raw-deflate
+#     /hang             never answer within any sensible timeout
+#     /big              a body larger than any poster should be (small with ?encoding)
+import argparse
+import hashlib
+import io
+import sys
+import threading
+import time
+import zlib
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+LAST_MODIFIED = formatdate(time.time() - 3600, usegmt=True)
+
+
+def poster_bytes(number, size=(600, 900)):
+    try:
+        from PIL import Image
+    except ImportError:
+        # Deterministic filler of a typical poster size
+        seed = hashlib.sha256(str(number).encode()).digest()
+        return seed * (120 * 1024 // len(seed))
+    image = Image.new('RGB', size, ((number * 37) % 256, (number * 91) % 256, (number * 53) % 256))
+    out = io.BytesIO()
+    image.save(out, format='PNG')
+    return out.getvalue()
+
+
+class PosterHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'PosterStandIn/1.0'
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        self.server.count_request(self)
+        latency = self.server.latency + int(query.get('delay', ['0'])[0]) / 1000
+        if latency:
+            time.sleep(latency)
+
+        if parts.path == '/hang':
+            time.sleep(3600)
+            return
+        encoding = query.get('encoding', [None])[0]
+        if parts.path == '/big':
+            body = b'\0' * (64 * 1024 * 1024)
+            return self.respond(200, body, 'application/octet-stream', encoding=encoding)
+        failures = int(query.get('fail', ['0'])[0])
+        if failures and self.server.count_failure(self.path) <= failures:
+            return self.respond(503, b'busy', 'text/plain')
+        if not parts.path.startswith('/poster/'):
+            return self.respond(404, b'not found', 'text/plain')
+
+        try:
+            number = int(parts.path[len('/poster/'):].split('.')[0])
+        except ValueError:
+            return self.respond(404, b'not found', 'text/plain')
+        body = self.server.poster(number)
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            return self.respond(304, b'', None, etag)
+        self.respond(200, body, 'image/png', etag, encoding)
+
+    def respond(self, status, body, content_type, etag=None, encoding=None):
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        if encoding:
+            # Raw deflate is what some servers send as 'deflate'
+            wbits = {'gzip': 31, 'deflate': 15, 'raw-deflate': -15}[encoding]
+            compressor = zlib.compressobj(wbits=wbits)
+            body = compressor.compress(body) + compressor.flush()
+            self.send_header('Content-Encoding', 'gzip' if encoding == 'gzip' else 'deflate')
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', LAST_MODIFIED)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body:
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PosterServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0), latency_ms=0):
+        ThreadingHTTPServer.__init__(self, address, PosterHandler)
+        self.latency = latency_ms / 1000
+        self.lock = threading.Lock()
+        self.posters = {}
+        self.failures = {}
+        self.requests = 0
+        self.connections = set()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def poster(self, number):
+        with self.lock:
+            body = self.posters.get(number)
+        if body is None:
+            body = poster_bytes(number)
+            with self.lock:
+                self.posters[number] = body
+        return body
+
+    def count_request(self, handler):
+        with self.lock:
+            self.requests += 1
+            self.connections.add(handler.client_address)
+
+    def count_failure(self, path):
+        with self.lock:
+            self.failures[path] = self.failures.get(path, 0) + 1
+            return self.failures[path]
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for a poster CDN")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=int, default=20)
+    args = parser.parse_args(argv)
+    server = PosterServer(('127.0.0.1', args.port), args.latency_ms)
+    print(f"Serving posters on {server.url}/poster/<n>.png")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,58 @@
+# Measures how long `import gw_collections` takes in a fresh interpreter and
+# checks that the headless core does not pull in the GUI or network stacks.
+#
+#     python benchmarks/import_time.py [--runs 20] [--max-ms 50]
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('tkinter', 'PIL', 'urllib.request')
+
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+import gw_collections
+elapsed = time.perf_counter() - start
+print(json.dumps({'ms': elapsed * 1000, 'heavy': [m for m in %r if m in sys.modules]}))
+''' % (HEAVY_MODULES,)
+
+
+def measure(runs):
+    timings = []
+    heavy = set()
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, check=True,
+                                capture_output=True, text=True).stdout
+        result = json.loads(output)
+        timings.append(result['ms'])
+        heavy.update(result['heavy'])
+    return timings, sorted(heavy)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import-time benchmark for the headless core")
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--max-ms', type=float, default=50.0,
+                        help="fail if the median import time exceeds this")
+    args = parser.parse_args(argv)
+
+    timings, heavy = measure(args.runs)
+    median = statistics.median(timings)
+    print(f"import gw_collections: median {median:.2f} ms, min {min(timings):.2f} ms, "
+          f"max {max(timings):.2f} ms over {args.runs} runs")
+    failed = False
+    if heavy:
+        print(f"FAIL: importing the core loaded {', '.join(heavy)}")
+        failed = True
+    if median > args.max_ms:
+        print(f"FAIL: median import time above {args.max_ms:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,523 @@
+# Benchmarks for the load, save, edit, service, search (JSON and SQLite),
+# fuzzy search, query, duplicate detection, list refresh and poster paths
+# over synthetic collections of growing size. Each benchmark runs in a fresh interpreter so
+# its peak memory is its own. Results are written to
+# benchmarks/results/ and can be compared with an earlier run.
+#
+#     python benchmarks/suite.py [--sizes 1000,10000,100000] [--only search,load-json]
+#                                [--compare benchmarks/results/<earlier>.json]
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BENCH_DIR, 'data')
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from generate import KINDS, WORDS, generate_items, write_collection  # noqa: E402
+
+
+def data_files(size):
+    # `size` items split across the three collections
+    counts = {kind: size // len(KINDS) for kind in KINDS}
+    counts[KINDS[0]] += size - sum(counts.values())
+    file_names = {}
+    os.makedirs(DATA_DIR, exist_ok=True)
+    for kind, count in counts.items():
+        file_name = os.path.join(DATA_DIR, f"{kind}-{count}.json")
+        if not os.path.exists(file_name):
+            write_collection(file_name, generate_items(kind, count, image_base='http://127.0.0.1:9'))
+        file_names[kind] = file_name
+    return file_names
+
+
+def copy_files(file_names, directory):
+    copies = {}
+    for kind, file_name in file_names.items():
+        copies[kind] = os.path.join(directory, os.path.basename(file_name))
+        shutil.copyfile(file_name, copies[kind])
+    return copies
+
+
+def latencies(timings):
+    timings = sorted(timing * 1000 for timing in timings)
+    cuts = statistics.quantiles(timings, n=100) if len(timings) > 1 else timings * 99
+    return {'ops': len(timings), 'p50_ms': cuts[49], 'p90_ms': cuts[89], 'p99_ms': cuts[98],
+            'max_ms': timings[-1]}
+
+
+def throughput(items, seconds):
+    return {'items': items, 'seconds': seconds, 'items_per_s': items / seconds if seconds else None}
+
+
+def search_terms(rng, count):
+    terms = []
+    while len(terms) < count:
+        word = rng.choice(WORDS)
+        # Typing a word one key at a time, then a two-word query
+        terms.extend(word[:end] for end in range(2, len(word) + 1))
+        terms.append(f"{word} {rng.choice(WORDS)}")
+    return terms[:count]
+
+
+def bench_load_json(size, args):
+    from gw_collections import FileManager
+    file_names = data_files(size)
+    start = time.perf_counter()
+    collections = FileManager(file_names).load_data()
+    seconds = time.perf_counter() - start
+    return throughput(sum(map(len, collections.values())), seconds)
+
+
+def bench_load_shards(size, args):
+    # The same collections split into one shard file per core
+    from gw_collections import FileManager
+    shards = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as directory:
+        file_names = {kind: [os.path.join(directory, f"{kind}-{number}.json") for number in range(shards)]
+                      for kind in KINDS}
+        file_manager = FileManager(file_names)
+        for kind, items in FileManager(data_files(size)).load_data().items():
+            file_manager.compact(kind, items)
+        start = time.perf_counter()
+        collections = FileManager(file_names).load_data()
+        seconds = time.perf_counter() - start
+    result = throughput(sum(map(len, collections.values())), seconds)
+    result['shards'] = shards
+    return result
+
+
+def bench_load_snapshot(size, args):
+    # Loading from binary snapshots written by an earlier run
+    from gw_collections import FileManager
+    with tempfile.TemporaryDirectory() as directory:
+        file_names = copy_files(data_files(size), directory)
+        FileManager(file_names, binary_snapshots=True).load_data()
+        start = time.perf_counter()
+        collections = FileManager(file_names, binary_snapshots=True).load_data()
+        seconds = time.perf_counter() - start
+    return throughput(sum(map(len, collections.values())), seconds)
+
+
+def bench_open_paged(size, args):
+    # Opening paged collections from binary snapshots and showing a first page
+    from gw_collections import CollectionManager, FileManager
+    with tempfile.TemporaryDirectory() as directory:
+        file_names = copy_files(data_files(size), directory)
+        FileManager(file_names, binary_snapshots=True).load_data()
+        start = time.perf_counter()
+        manager = CollectionManager(FileManager(file_names, binary_snapshots=True), cache_size=5000)
+        rows = sum(len(items[:50]) for items in manager.collections.values())
+        seconds = time.perf_counter() - start
+    result = throughput(sum(map(len, manager.collections.values())), seconds)
+    result['rows_built'] = rows
+    return result
+
+
+def bench_save_json(size, args):
+    from gw_collections import FileManager
+    with tempfile.TemporaryDirectory() as directory:
+        file_manager = FileManager(copy_files(data_files(size), directory))
+        collections = file_manager.load_data()
+        start = time.perf_counter()
+        file_manager.save_data(collections)
+        seconds = time.perf_counter() - start
+    return throughput(sum(map(len, collections.values())), seconds)
+
+
+def bench_edit(size, args):
+    # Edit latency as the Tk thread sees it, with edits saved in the
+    # background, and the time flush() then takes to make them durable
+    from gw_collections import CollectionManager, FileManager
+    from gw_collections.models import Movie
+    with tempfile.TemporaryDirectory() as directory:
+        manager = CollectionManager(FileManager(copy_files(data_files(size), directory)), write_delay=0.5)
+        movies = list(manager.collections['movies'])
+        rng = random.Random(3)
+        timings = []
+        for number in range(args.ops):
+            old_movie = manager.get_item('movies', rng.choice(movies).id)
+            movie = Movie(f"Edited {number}", old_movie.director, old_movie.genre, old_movie.length,
+                          old_movie.description, old_movie.image_url)
+            start = time.perf_counter()
+            manager.update_item('movies', old_movie, movie)
+            timings.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        manager.flush()
+        flush = time.perf_counter() - start
+        manager.close()
+    result = latencies(timings)
+    result['flush_ms'] = flush * 1000
+    return result
+
+
+def bench_service(size, args):
+    # Search latency through a collection service with the --ops searches
+    # shared by 1, 2 and 4 clients reading at once, the requests per second
+    # served at each count, and the latency of edits sent while they read
+    from gw_collections.models import Movie
+    from gw_collections.service import ServiceClient
+    with tempfile.TemporaryDirectory() as directory:
+        address = os.path.join(directory, 'service.sock')
+        command = [sys.executable, '-m', 'gw_collections', '--storage', 'json', '--serve', address]
+        for kind, file_name in copy_files(data_files(size), directory).items():
+            command += ['--collection', f"{kind}={file_name}"]
+        server = subprocess.Popen(command, cwd=directory, env=dict(os.environ, PYTHONPATH=ROOT),
+                                  stdout=subprocess.DEVNULL)
+        try:
+            while not os.path.exists(address):
+                if server.poll() is not None:
+                    raise RuntimeError("The collection service didn't start")
+                time.sleep(0.05)
+            editor = ServiceClient(address)
+            movie_ids = editor.ids('movies')
+            rng = random.Random(4)
+            requests_per_s = {}
+            for readers in (1, 2, 4):
+                clients = [ServiceClient(address) for _ in range(readers)]
+                timings = []
+                edit_timings = []
+
+                def read(client, terms):
+                    for term in terms:
+                        start = time.perf_counter()
+                        client.search('movies', term, limit=20)
+                        timings.append(time.perf_counter() - start)
+
+                threads = [threading.Thread(target=read, args=(client, search_terms(random.Random(i), args.ops // readers)))
+                           for i, client in enumerate(clients)]
+                start = time.perf_counter()
+                for thread in threads:
+                    thread.start()
+                while any(thread.is_alive() for thread in threads):
+                    old_movie = editor.get_item('movies', rng.choice(movie_ids))
+                    movie = Movie(f"Edited {len(edit_timings)}", old_movie.director, old_movie.genre,
+                                  old_movie.length, old_movie.description, old_movie.image_url)
+                    edit_start = time.perf_counter()
+                    editor.update_item('movies', old_movie, movie)
+                    edit_timings.append(time.perf_counter() - edit_start)
+                    time.sleep(0.01)
+                for thread in threads:
+                    thread.join()
+                requests_per_s[readers] = len(timings) / (time.perf_counter() - start)
+                for client in clients:
+                    client.close()
+            editor.close()
+        finally:
+            server.terminate()
+            server.wait()
+    result = latencies(timings)
+    result['readers'] = readers
+    result['requests_per_s'] = requests_per_s
+    result['edit_p50_ms'] = latencies(edit_timings)['p50_ms'] if edit_timings else None
+    return result
+
+
+def bench_load_sqlite(size, args):
+    from gw_collections import SQLiteStorage
+    with tempfile.TemporaryDirectory() as directory:
+        file_names = copy_files(data_files(size), directory)
+        db_path = os.path.join(directory, 'collections.db')
+        start = time.perf_counter()
+        storage = SQLiteStorage(db_path, file_names)
+        migrate = time.perf_counter() - start
+        storage.close({})
+        start = time.perf_counter()
+        storage = SQLiteStorage(db_path, file_names)
+        collections = storage.load_data()
+        seconds = time.perf_counter() - start
+        storage.close({})
+    result = throughput(sum(map(len, collections.values())), seconds)
+    result['migrate_s'] = migrate
+    return result
+
+
+def bench_search(size, args):
+    from gw_collections import CollectionManager, FileManager
+    manager = CollectionManager(FileManager(data_files(size)))
+    timings = []
+    for term in search_terms(random.Random(1), args.ops):
+        start = time.perf_counter()
+        manager.search(term)
+        timings.append(time.perf_counter() - start)
+    return latencies(timings)
+
+
+def bench_search_sqlite(size, args):
+    # The same searches answered by SQLite, which must find what the
+    # in-memory index finds
+    from gw_collections import CollectionManager, FileManager, SQLiteStorage
+    expected = CollectionManager(FileManager(data_files(size)))
+    with tempfile.TemporaryDirectory() as directory:
+        file_names = copy_files(data_files(size), directory)
+        manager = CollectionManager(SQLiteStorage(os.path.join(directory, 'collections.db'), file_names))
+        timings = []
+        for term in search_terms(random.Random(1), args.ops):
+            start = time.perf_counter()
+            results = manager.search(term)
+            timings.append(time.perf_counter() - start)
+            for collection, items in results.items():
+                if {item.id for item in items} != expected.search_collection(collection, term).ids():
+                    raise RuntimeError(f"SQLite and the search index disagree on {term!r} in {collection}")
+        manager.close()
+    return latencies(timings)
+
+
+def typo(rng, word):
+    position = rng.randrange(len(word))
+    return word[:position] + word[position + 1:]
+
+
+def bench_fuzzy(size, args):
+    # Type-ahead over misspelled two-word titles, e.g. "shadw fire"
+    from gw_collections import CollectionManager, FileManager
+    manager = CollectionManager(FileManager(data_files(size)))
+    rng = random.Random(4)
+    start = time.perf_counter()
+    manager.fuzzy_index('movies')
+    build = time.perf_counter() - start
+    timings = []
+    for _ in range(args.ops):
+        term = f"{typo(rng, rng.choice(WORDS))} {rng.choice(WORDS)}"
+        start = time.perf_counter()
+        manager.fuzzy_search('movies', term)
+        timings.append(time.perf_counter() - start)
+    result = latencies(timings)
+    result['build_s'] = build
+    return result
+
+
+def bench_dedup(size, args):
+    # The batch duplicate check over every collection
+    from gw_collections import CollectionManager, FileManager
+    manager = CollectionManager(FileManager(data_files(size)))
+    start = time.perf_counter()
+    groups = sum(len(manager.find_duplicates(collection)) for collection in manager.collections)
+    seconds = time.perf_counter() - start
+    result = throughput(sum(map(len, manager.collections.values())), seconds)
+    result['groups'] = groups
+    return result
+
+
+def bench_query(size, args):
+    from gw_collections import CollectionManager, FileManager
+    manager = CollectionManager(FileManager(data_files(size)))
+    rng = random.Random(2)
+    genres = [value for value, _ in manager.facet_counts('movies', 'genre')]
+    sorts = [('title',), ('creator', 'title'), ('length', 'title'), None]
+    timings = []
+    for _ in range(args.ops):
+        filters = {'genre': rng.choice(genres)} if rng.random() < 0.7 else None
+        start = time.perf_counter()
+        manager.facet_counts('movies', 'creator', filters)
+        rows = manager.query('movies', filters, rng.choice(sorts), descending=rng.random() < 0.5)
+        rows[:50]
+        timings.append(time.perf_counter() - start)
+    return latencies(timings)
+
+
+def bench_refresh(size, args):
+    import tkinter as tk
+    from gw_collections import CollectionManager, FileManager
+    try:
+        from gw_collections.gui import GUI
+        app = GUI(CollectionManager(FileManager(data_files(size))))
+    except (ImportError, tk.TclError) as e:
+        return {'skipped': str(e)}
+    app.withdraw()
+    app.update()
+    refresh, scroll = [], []
+    for _ in range(args.ops):
+        start = time.perf_counter()
+        app.refresh_movie_list(deployed=1)
+        app.update_idletasks()
+        refresh.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        app.movies_listbox.scroll(app.movies_listbox.visible)
+        app.update_idletasks()
+        scroll.append(time.perf_counter() - start)
+    app.on_close()
+    result = latencies(refresh)
+    result['scroll_p50_ms'] = latencies(scroll)['p50_ms']
+    return result
+
+
+def bench_show_image(size, args):
+    # The worker-thread half of show_image: download, decode, resize and
+    # cache a poster, then the same posters again from the thumbnail cache
+    try:
+        from gw_collections.fetch import ConnectionPool
+        from gw_collections.images import IMAGE_SIZE, ThumbnailCache, fetch_image
+    except ImportError as e:
+        return {'skipped': str(e)}
+    from image_server import PosterServer
+    server = PosterServer(latency_ms=args.latency_ms).start()
+    pool = ConnectionPool()
+    cold, warm = [], []
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ThumbnailCache(directory)
+            urls = [f"{server.url}/poster/{number}.png" for number in range(args.ops)]
+            for number in range(args.ops):
+                server.poster(number)  # not timed: making the poster is the server's cost
+            for timings in (cold, warm):
+                for url in urls:
+                    start = time.perf_counter()
+                    fetch_image(url, IMAGE_SIZE, cache, pool)
+                    timings.append(time.perf_counter() - start)
+    finally:
+        pool.close()
+        server.shutdown()
+    result = latencies(cold)
+    result['cached_p50_ms'] = latencies(warm)['p50_ms']
+    return result
+
+
+# name -> (function, whether it runs once per size)
+BENCHMARKS = {
+    'load-json': (bench_load_json, True),
+    'load-shards': (bench_load_shards, True),
+    'load-snapshot': (bench_load_snapshot, True),
+    'open-paged': (bench_open_paged, True),
+    'save-json': (bench_save_json, True),
+    'edit': (bench_edit, True),
+    'service': (bench_service, True),
+    'load-sqlite': (bench_load_sqlite, True),
+    'search': (bench_search, True),
+    'search-sqlite': (bench_search_sqlite, True),
+    'fuzzy': (bench_fuzzy, True),
+    'query': (bench_query, True),
+    'dedup': (bench_dedup, True),
+    'refresh': (bench_refresh, True),
+    'show-image': (bench_show_image, False),
+}
+
+
+def run_worker(name, size, args):
+    result = BENCHMARKS[name][0](size, args)
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result['peak_rss_mb'] = peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    print(json.dumps(result))
+
+
+def start_display():
+    # A virtual X server for the Tk benchmark when there is no display
+    if os.environ.get('DISPLAY') or not shutil.which('Xvfb'):
+        return None, os.environ.get('DISPLAY')
+    display = f":{random.randint(100, 999)}"
+    server = subprocess.Popen(['Xvfb', display, '-nolisten', 'tcp'],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(1)
+    return server, display
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def headline(result):
+    for metric in ('seconds', 'p50_ms'):
+        if result.get(metric) is not None:
+            return metric, result[metric]
+    return None, None
+
+
+def describe(result):
+    if 'skipped' in result:
+        return f"skipped ({result['skipped']})"
+    if 'items_per_s' in result:
+        text = f"{result['seconds']:.3f} s, {result['items_per_s']:,.0f} items/s"
+    else:
+        text = f"p50 {result['p50_ms']:.2f} ms, p90 {result['p90_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms"
+    return f"{text}, peak {result['peak_rss_mb']:.0f} MB"
+
+
+def compare(results, earlier_file):
+    with open(earlier_file, 'r') as f:
+        earlier = {(r['benchmark'], r['size']): r for r in json.load(f)['results']}
+    print(f"\nCompared with {earlier_file}:")
+    for result in results:
+        before = earlier.get((result['benchmark'], result['size']))
+        metric, now = headline(result)
+        if before is None or metric is None or before.get(metric) is None:
+            continue
+        change = (now - before[metric]) / before[metric] * 100 if before[metric] else 0.0
+        print(f"  {result['benchmark']:<12} {result['size'] or '':>10}  {metric} "
+              f"{before[metric]:.4g} -> {now:.4g} ({change:+.1f}%)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GW Collections benchmark suite")
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help="comma-separated total item counts, up to 10000000")
+    parser.add_argument('--only', help="comma-separated benchmarks: " + ', '.join(BENCHMARKS))
+    parser.add_argument('--ops', type=int, default=200, help="operations per latency benchmark")
+    parser.add_argument('--latency-ms', type=int, default=5, help="image server latency")
+    parser.add_argument('--compare', help="an earlier results file")
+    parser.add_argument('--worker', nargs=2, metavar=('BENCHMARK', 'SIZE'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        run_worker(args.worker[0], int(args.worker[1]), args)
+        return 0
+
+    names = args.only.split(',') if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    display_server, display = start_display()
+    env = dict(os.environ, **({'DISPLAY': display} if display else {}))
+    results = []
+    try:
+        for name in names:
+            for size in (sizes if BENCHMARKS[name][1] else [0]):
+                if size:
+                    data_files(size)  # generated outside the timed run
+                command = [sys.executable, __file__, '--worker', name, str(size),
+                           '--ops', str(args.ops), '--latency-ms', str(args.latency_ms)]
+                output = subprocess.run(command, env=env, capture_output=True, text=True)
+                if output.returncode:
+                    result = {'skipped': output.stderr.strip().splitlines()[-1]}
+                else:
+                    result = json.loads(output.stdout.strip().splitlines()[-1])
+                result.update(benchmark=name, size=size or None)
+                results.append(result)
+                print(f"{name:<12} {size or '':>10}  {describe(result)}")
+    finally:
+        if display_server:
+            display_server.terminate()
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    results_file = os.path.join(RESULTS_DIR, f"{stamp}.json")
+    with open(results_file, 'w') as f:
+        json.dump({'time': stamp, 'git': git_revision(), 'python': platform.python_version(),
+                   'machine': platform.platform(), 'sizes': sizes, 'results': results}, f, indent=2)
+    print(f"\nResults written to {results_file}")
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
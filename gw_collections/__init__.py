@@ -0,0 +1,12 @@
+# Headless core: models, storage and the collection manager. The Tk GUI lives
+# in gw_collections.gui and is only imported when the app is launched.
+from .models import Item, Movie, Game, Book
+from .storage import StorageBackend, FileManager, SQLiteStorage
+from .search import SearchIndex
+from .manager import CollectionManager
+
+__all__ = [
+    'Item', 'Movie', 'Game', 'Book',
+    'StorageBackend', 'FileManager', 'SQLiteStorage',
+    'SearchIndex', 'CollectionManager',
+]
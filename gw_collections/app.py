@@ -0,0 +1,131 @@
+import argparse
+import glob
+import os
+
+from .manager import CollectionManager
+from .metrics import METRICS
+from .models import item_creator
+from .storage import FileManager, SQLiteStorage
+
+FILE_NAMES = {
+    'movies': 'movies.json',
+    'games': 'games.json',
+    'books': 'books.json'
+}
+
+
+def create_storage(storage='sqlite', db_path='collections.db', file_names=FILE_NAMES, binary_snapshots=False):
+    if storage == 'json':
+        return FileManager(file_names, binary_snapshots=binary_snapshots)
+    return SQLiteStorage(db_path, file_names)
+
+
+def collection_files(specs, file_names=FILE_NAMES):
+    # Each spec is NAME=FILES, FILES being comma-separated paths or globs; a
+    # collection given several files is loaded as shards in parallel
+    file_names = dict(file_names)
+    for spec in specs:
+        name, _, patterns = spec.partition('=')
+        if not name or not patterns:
+            raise ValueError(f"Expected NAME=FILES, got {spec!r}")
+        files = []
+        for pattern in patterns.split(','):
+            matches = sorted(glob.glob(pattern))
+            if matches:
+                files.extend(matches)
+            elif not glob.has_magic(pattern):
+                files.append(pattern)
+        if not files:
+            raise ValueError(f"No files match {patterns!r}")
+        file_names[name] = files[0] if len(files) == 1 else files
+    return file_names
+
+
+def report_duplicates(manager):
+    # Prints the merge candidates of every collection instead of opening the GUI
+    for collection in manager.collections:
+        groups = manager.find_duplicates(collection)
+        print(f"{collection}: {len(groups)} groups of possible duplicates")
+        for group in groups:
+            print()
+            for item in group:
+                other, kind, score = manager.duplicates_of(collection, item)[0]
+                print(f"  {item.id}  {item.title} / {item_creator(item)}  ({kind} {score:.2f}, {other.id})")
+        print()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='gw_collections', description="GW Collections")
+    parser.add_argument('--storage', choices=('sqlite', 'json'),
+                        default=os.environ.get('GW_COLLECTIONS_STORAGE', 'sqlite'),
+                        help="where collections are kept (default: sqlite)")
+    parser.add_argument('--db', default=os.environ.get('GW_COLLECTIONS_DB', 'collections.db'),
+                        help="SQLite database file")
+    parser.add_argument('--collection', action='append', default=[], metavar='NAME=FILES',
+                        help="files of a collection, e.g. movies=shards/movies-*.json (repeatable)")
+    parser.add_argument('--binary-snapshots', action='store_true',
+                        help="with json storage, keep memory-mapped snapshots next to the files and page items in from them")
+    shared = parser.add_mutually_exclusive_group()
+    shared.add_argument('--serve', metavar='ADDRESS',
+                        help="share the collections with other clients on a Unix socket path or HOST:PORT")
+    shared.add_argument('--connect', metavar='ADDRESS',
+                        help="work on the collections of a running --serve instead of local storage")
+    parser.add_argument('--find-duplicates', action='store_true',
+                        help="list items that look like duplicates and exit")
+    parser.add_argument('--check-duplicates', action='store_true',
+                        help="warn when an added item looks like one already in its collection")
+    parser.add_argument('--metrics', metavar='FILE', help="write timings and counters as JSON on exit")
+    parser.add_argument('--trace', metavar='FILE', help="write a Chrome trace (chrome://tracing) on exit")
+    parser.add_argument('--overlay', action='store_true', help="show the performance overlay (F12 toggles it)")
+    args = parser.parse_args(argv)
+    try:
+        file_names = collection_files(args.collection)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.metrics or args.trace or args.overlay:
+        METRICS.enable()
+
+    if args.connect:
+        from .service import RemoteStorage
+        try:
+            storage = RemoteStorage(args.connect)
+        except OSError as e:
+            parser.error(f"Can't connect to {args.connect}: {e}")
+    else:
+        storage = create_storage(args.storage, args.db, file_names, args.binary_snapshots)
+
+    if args.serve:
+        from .service import serve
+        # The edits of every client are saved together, half a second after the last one
+        manager = CollectionManager(storage, write_delay=0.5, cache_size=5000)
+        print(f"Serving {', '.join(manager.collections)} on {args.serve}")
+        try:
+            serve(manager, args.serve)
+        finally:
+            manager.close()
+        return
+
+    if args.find_duplicates:
+        manager = CollectionManager(storage)
+        report_duplicates(manager)
+        manager.close()
+        return
+
+    # tkinter, PIL and urllib are only needed once there is a window to show
+    from .gui import GUI
+
+    # Edits are saved in the background half a second after the last one, and
+    # collections with a binary snapshot are paged in rather than loaded. Edits
+    # sent to a collection service are saved at once, so one it refuses is
+    # reported while the user is still looking at it
+    if args.connect:
+        manager = CollectionManager(storage, load=False, check_duplicates=args.check_duplicates)
+    else:
+        manager = CollectionManager(storage, load=False, write_delay=0.5, cache_size=5000,
+                                    check_duplicates=args.check_duplicates)
+    app = GUI(manager, overlay=args.overlay)
+    app.mainloop()
+    if args.metrics:
+        METRICS.export_json(args.metrics)
+    if args.trace:
+        METRICS.export_chrome_trace(args.trace)
@@ -0,0 +1,365 @@
+import bisect
+import sys
+from collections import OrderedDict, namedtuple
+
+from .metrics import count
+from .query import field_value
+from .snapshot import FIELD_COLUMNS
+
+# What a list view shows of an item that isn't built
+ListRow = namedtuple('ListRow', ['id', 'title', 'image_url'])
+
+
+class ItemCollection:
+    # The items of one collection in order, looked up by id in O(1).
+    # Positional access (indexing and slicing, used by list views) goes
+    # through a list that edits patch in place. A removal leaves a hole in
+    # it, so no other row moves; the holes are dropped the next time rows
+    # are read by position, or once they make up half of the list.
+    def __init__(self, items=()):
+        self.by_id = {}
+        self.order = []
+        self.positions = None  # id -> index into order, built on demand
+        self.holes = 0  # removed rows still in order as None
+        self.extend(items)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __iter__(self):
+        return iter(self.by_id.values())
+
+    def __contains__(self, item):
+        return self.by_id.get(getattr(item, 'id', None)) is item
+
+    def __getitem__(self, index):
+        return self.ordered()[index]
+
+    def ordered(self):
+        if self.order is None:
+            self.order = list(self.by_id.values())
+            self.positions = None
+        elif self.holes:
+            self.compact()
+        return self.order
+
+    def compact(self):
+        self.order = [item for item in self.order if item is not None]
+        self.positions = None
+        self.holes = 0
+
+    def position_of(self, item):
+        # Index of the item in order, holes included
+        order = self.order if self.order is not None else self.ordered()
+        if self.positions is None:
+            self.positions = {existing.id: i for i, existing in enumerate(order) if existing is not None}
+        position = self.positions.get(getattr(item, 'id', None))
+        if position is None or order[position] is not item:
+            return None
+        return position
+
+    def get(self, item_id, default=None):
+        return self.by_id.get(item_id, default)
+
+    def has_id(self, item_id):
+        return item_id in self.by_id
+
+    def add(self, item):
+        if item.id in self.by_id:
+            raise KeyError(f"Duplicate item id {item.id}")
+        self.by_id[item.id] = item
+        if self.order is not None:
+            if self.positions is not None:
+                self.positions[item.id] = len(self.order)
+            self.order.append(item)
+
+    def extend(self, items):
+        for item in items:
+            self.add(item)
+
+    def replace(self, item):
+        # Swap in a new version of an item, keeping its place; returns the old one
+        old_item = self.by_id[item.id]
+        if self.order is not None:
+            self.order[self.position_of(old_item)] = item
+        self.by_id[item.id] = item
+        return old_item
+
+    def remove(self, item_id):
+        item = self.by_id[item_id]
+        if self.order is not None:
+            self.order[self.position_of(item)] = None
+            del self.positions[item_id]
+            self.holes += 1
+            if self.holes * 2 > len(self.order):
+                self.compact()
+        del self.by_id[item_id]
+        return item
+
+    def copy(self):
+        # A shallow copy, for writing the collection out while it keeps changing
+        items = ItemCollection()
+        items.by_id = dict(self.by_id)
+        items.order = None
+        return items
+
+    def index(self, item):
+        # Rows are counted without holes
+        self.ordered()
+        position = self.position_of(item)
+        if position is None:
+            raise ValueError("item is not in the collection")
+        return position
+
+    def index_of(self, item_id):
+        # Row of an item, or None if it isn't in the collection
+        item = self.by_id.get(item_id)
+        return None if item is None else self.index(item)
+
+    def ids(self):
+        # In collection order; replacing an item keeps its place in by_id
+        return iter(self.by_id)
+
+
+class PagedCollection:
+    # The ItemCollection interface over a binary snapshot. Items are built
+    # from the snapshot when they are touched and the last `cache_size` of
+    # them are kept; edits made since the snapshot are held in memory on top
+    # of it. Items are addressed by snapshot position, an id -> position map
+    # is read from the id column the first time an item is looked up by id.
+    BATCH = 2000
+
+    def __init__(self, snapshot, cache_size=5000):
+        self.snapshot = snapshot
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # snapshot position -> item
+        self.replaced = {}  # snapshot position -> item that replaced it
+        self.removed = []  # sorted snapshot positions
+        self.removed_positions = set()
+        self.added = ItemCollection()  # items added since the snapshot, after its items
+        self.positions = None
+
+    def __len__(self):
+        return self.base_length() + len(self.added)
+
+    def base_length(self):
+        return len(self.snapshot) - len(self.removed)
+
+    def __iter__(self):
+        # Builds items a batch at a time without caching them, so walking the
+        # whole collection (e.g. to index it) doesn't evict the rows in view
+        snapshot = self.snapshot
+        for start in range(0, len(snapshot), self.BATCH):
+            stop = min(start + self.BATCH, len(snapshot))
+            for position, item in enumerate(snapshot.items(start, stop), start):
+                if position in self.removed_positions:
+                    continue
+                yield self.replaced.get(position) or self.cache.get(position) or item
+        yield from self.added
+
+    def __contains__(self, item):
+        return self.get(getattr(item, 'id', None)) is item
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("collection index out of range")
+        if index >= self.base_length():
+            return self.added[index - self.base_length()]
+        return self.at(self.position(index))
+
+    def position(self, index):
+        # The snapshot position of the index-th item that wasn't removed
+        position = index
+        while True:
+            shifted = index + bisect.bisect_right(self.removed, position)
+            if shifted == position:
+                return position
+            position = shifted
+
+    def at(self, position):
+        item = self.replaced.get(position)
+        if item is not None:
+            return item
+        item = self.cache.get(position)
+        if item is not None:
+            self.cache.move_to_end(position)
+            count('item cache hits')
+            return item
+        count('item cache misses')
+        item = self.snapshot.item(position)
+        self.cache[position] = item
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return item
+
+    def id_at(self, index):
+        if index >= self.base_length():
+            return self.added[index - self.base_length()].id
+        position = self.position(index)
+        item = self.replaced.get(position)
+        return item.id if item is not None else sys.intern(self.snapshot.item_id(position))
+
+    def row_at(self, index):
+        if index >= self.base_length():
+            return self.added[index - self.base_length()]
+        return self.snapshot_row(self.position(index))
+
+    def row(self, item_id):
+        if self.added.has_id(item_id):
+            return self.added.get(item_id)
+        position = self.snapshot_position(item_id)
+        return None if position is None else self.snapshot_row(position)
+
+    def snapshot_row(self, position):
+        # The item if it is built already, else just the columns a list view shows
+        item = self.replaced.get(position) or self.cache.get(position)
+        if item is not None:
+            return item
+        snapshot = self.snapshot
+        return ListRow(sys.intern(snapshot.item_id(position)), snapshot.title(position), snapshot.image_url(position))
+
+    def snapshot_position(self, item_id):
+        if self.positions is None:
+            self.positions = {}
+            for start in range(0, len(self.snapshot), self.BATCH):
+                ids = self.snapshot.column(0, start, min(start + self.BATCH, len(self.snapshot)))
+                self.positions.update(zip(map(sys.intern, ids), range(start, start + len(ids))))
+        position = self.positions.get(item_id)
+        if position is None or position in self.removed_positions:
+            return None
+        return position
+
+    def ordered(self):
+        return self
+
+    def get(self, item_id, default=None):
+        if self.added.has_id(item_id):
+            return self.added.get(item_id)
+        position = self.snapshot_position(item_id)
+        return default if position is None else self.at(position)
+
+    def has_id(self, item_id):
+        return self.added.has_id(item_id) or self.snapshot_position(item_id) is not None
+
+    def add(self, item):
+        if self.has_id(item.id):
+            raise KeyError(f"Duplicate item id {item.id}")
+        self.added.add(item)
+
+    def extend(self, items):
+        for item in items:
+            self.add(item)
+
+    def replace(self, item):
+        if self.added.has_id(item.id):
+            return self.added.replace(item)
+        position = self.snapshot_position(item.id)
+        if position is None:
+            raise KeyError(item.id)
+        old_item = self.at(position)
+        self.replaced[position] = item
+        self.cache.pop(position, None)
+        return old_item
+
+    def remove(self, item_id):
+        if self.added.has_id(item_id):
+            return self.added.remove(item_id)
+        position = self.snapshot_position(item_id)
+        if position is None:
+            raise KeyError(item_id)
+        item = self.at(position)
+        bisect.insort(self.removed, position)
+        self.removed_positions.add(position)
+        self.replaced.pop(position, None)
+        self.cache.pop(position, None)
+        return item
+
+    def index(self, item):
+        if self.added.has_id(getattr(item, 'id', None)):
+            return self.base_length() + self.added.index(item)
+        index = self.index_of(getattr(item, 'id', None))
+        if index is None:
+            raise ValueError("item is not in the collection")
+        return index
+
+    def index_of(self, item_id):
+        # Row of an item, or None if it isn't in the collection
+        if self.added.has_id(item_id):
+            return self.base_length() + self.added.index(self.added.get(item_id))
+        position = self.snapshot_position(item_id)
+        if position is None:
+            return None
+        return position - bisect.bisect_left(self.removed, position)
+
+    def ids(self):
+        return (item_id for item_id, _ in self.field_rows(()))
+
+    def field_rows(self, fields):
+        # (id, [value of each field]) for every item, read from the snapshot's
+        # columns without building items
+        snapshot = self.snapshot
+        for start in range(0, len(snapshot), self.BATCH):
+            stop = min(start + self.BATCH, len(snapshot))
+            ids = snapshot.column(0, start, stop)
+            codes = snapshot.class_codes(start, stop)
+            columns = {FIELD_COLUMNS[code][field] for code in set(codes) for field in fields
+                       if field in FIELD_COLUMNS[code]}
+            values = {column: snapshot.column(column, start, stop) for column in columns}
+            for offset, (item_id, code) in enumerate(zip(ids, codes)):
+                position = start + offset
+                if position in self.removed_positions:
+                    continue
+                item = self.replaced.get(position)
+                if item is not None:
+                    yield item.id, [field_value(item, field) for field in fields]
+                    continue
+                field_columns = FIELD_COLUMNS[code]
+                yield sys.intern(item_id), [values[field_columns[field]][offset] if field in field_columns else None
+                                            for field in fields]
+        for item in self.added:
+            yield item.id, [field_value(item, field) for field in fields]
+
+    def verify(self):
+        # Raises ValueError if the snapshot is damaged; reads all of it
+        self.snapshot.verify()
+
+    def copy(self):
+        # Shares the snapshot; only the edits made since it are copied
+        items = PagedCollection(self.snapshot, self.cache_size)
+        items.replaced = dict(self.replaced)
+        items.removed = list(self.removed)
+        items.removed_positions = set(self.removed_positions)
+        items.added = self.added.copy()
+        items.positions = self.positions
+        return items
+
+
+class ListRows:
+    # What a list view shows of a PagedCollection, or of a query or search
+    # result over one. Rows that aren't built yet come back as ListRows read
+    # from the snapshot's columns, so scrolling through a large collection
+    # neither builds whole items nor pushes the ones in use out of the cache.
+    def __init__(self, rows, items):
+        self.rows = rows  # the collection itself, or a result with id_at()
+        self.items = items
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("list row index out of range")
+        if self.rows is self.items:
+            return self.items.row_at(index)
+        return self.items.row(self.rows.id_at(index))
+
+    def index_of(self, item_id):
+        return self.rows.index_of(item_id)
@@ -0,0 +1,171 @@
+import bisect
+import itertools
+import operator
+import re
+import unicodedata
+import zlib
+from collections import defaultdict
+
+from .collection import ItemCollection
+from .models import item_creator
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def normalize(text):
+    # Case, accents, punctuation and spacing don't make two entries different
+    text = str(text or '')
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(WORD_PATTERN.findall(text.casefold()))
+
+
+def exact_key(item):
+    return (item.__class__.__name__, normalize(item.title), normalize(item_creator(item)))
+
+
+def shingles(item):
+    # Word pairs of title, creator and description; single words for very short texts
+    words = normalize(f"{item.title} {item_creator(item)} {item.description}").split()
+    if len(words) < 2:
+        return set(words)
+    return {f"{first} {second}" for first, second in zip(words, words[1:])}
+
+
+def signature(shingles, bins):
+    # One-permutation MinHash: every shingle is hashed once and only counts
+    # towards the bin its hash falls in. Empty bins borrow from the next
+    # filled one, offset by the distance, so sparse texts still compare well
+    if not shingles:
+        return None
+    width = (1 << 32) // bins + 1
+    mins = [None] * bins
+    for shingle in shingles:
+        value = zlib.crc32(shingle.encode('utf-8'))
+        position = value % bins
+        value //= bins
+        if mins[position] is None or value < mins[position]:
+            mins[position] = value
+    filled = [position for position, value in enumerate(mins) if value is not None]
+    if len(filled) < bins:
+        for position in range(bins):
+            if mins[position] is None:
+                source = filled[bisect.bisect(filled, position) % len(filled)]
+                mins[position] = mins[source] + ((source - position) % bins) * width
+    return tuple(mins)
+
+
+def similarity(first, second):
+    # The share of equal bins estimates the Jaccard similarity of the shingles
+    return sum(map(operator.eq, first, second)) / len(first)
+
+
+class DuplicateFinder:
+    # Exact duplicates share a normalized (class, title, creator) key; near
+    # duplicates are found with MinHash signatures over title, creator and
+    # description, split into `bands` bands of `rows` bins for locality
+    # sensitive hashing. An item is only compared with items that share a key
+    # or a band, at most `max_candidates` of them, so checking an item costs
+    # the same however large the collection is. Matches are kept as links and
+    # reported as groups of merge candidates.
+    def __init__(self, items=None, threshold=0.7, bands=8, rows=4, max_candidates=50):
+        self.items = items if items is not None else ItemCollection()
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self.max_candidates = max_candidates
+        self.keys = defaultdict(set)  # exact key -> ids
+        self.item_keys = {}  # id -> exact key
+        self.signatures = {}  # id -> signature
+        self.buckets = [defaultdict(set) for _ in range(bands)]  # band -> band hash -> ids
+        self.links = defaultdict(dict)  # id -> {id: (kind, similarity)}
+        for item in self.items:
+            self.link(item)
+
+    def band_keys(self, item_signature):
+        return [hash(item_signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+    def add(self, item):
+        # Indexes the item and returns its matches, best first
+        self.link(item)
+        return self.matches(item)
+
+    def link(self, item):
+        key = exact_key(item)
+        item_signature = signature(shingles(item), self.bands * self.rows)
+        matches = {}
+        for other_id in itertools.islice(self.keys.get(key, ()), self.max_candidates):
+            matches[other_id] = ('exact', 1.0)
+        if item_signature is not None:
+            candidates = set()
+            for bucket, band_key in zip(self.buckets, self.band_keys(item_signature)):
+                room = self.max_candidates - len(candidates)
+                if room <= 0:
+                    break
+                candidates.update(itertools.islice(bucket.get(band_key, ()), room))
+            for other_id in candidates - matches.keys():
+                score = similarity(item_signature, self.signatures[other_id])
+                if score >= self.threshold:
+                    matches[other_id] = ('near', score)
+
+        self.keys[key].add(item.id)
+        self.item_keys[item.id] = key
+        if item_signature is not None:
+            self.signatures[item.id] = item_signature
+            for bucket, band_key in zip(self.buckets, self.band_keys(item_signature)):
+                bucket[band_key].add(item.id)
+        for other_id, match in matches.items():
+            self.links[item.id][other_id] = match
+            self.links[other_id][item.id] = match
+
+    def remove(self, item):
+        key = self.item_keys.pop(item.id, None)
+        if key is not None:
+            self.discard(self.keys, key, item.id)
+        item_signature = self.signatures.pop(item.id, None)
+        if item_signature is not None:
+            for bucket, band_key in zip(self.buckets, self.band_keys(item_signature)):
+                self.discard(bucket, band_key, item.id)
+        for other_id in self.links.pop(item.id, {}):
+            self.links[other_id].pop(item.id, None)
+            if not self.links[other_id]:
+                del self.links[other_id]
+
+    def discard(self, index, key, item_id):
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(item_id)
+            if not ids:
+                del index[key]
+
+    def matches(self, item):
+        # [(other item, 'exact' or 'near', similarity)] for `item`, best first
+        matches = []
+        for other_id, (kind, score) in self.links.get(item.id, {}).items():
+            other = self.items.get(other_id)
+            if other is not None:
+                matches.append((other, kind, score))
+        matches.sort(key=lambda match: -match[2])
+        return matches
+
+    def groups(self):
+        # Merge candidates: lists of items linked to each other directly or
+        # through other items, largest groups first
+        groups = []
+        seen = set()
+        for start in self.links:
+            if start in seen:
+                continue
+            seen.add(start)
+            group = [start]
+            for item_id in group:
+                for other_id in self.links[item_id]:
+                    if other_id not in seen:
+                        seen.add(other_id)
+                        group.append(other_id)
+            items = [self.items.get(item_id) for item_id in group]
+            groups.append([item for item in items if item is not None])
+        groups.sort(key=len, reverse=True)
+        return groups
+
@@ -0,0 +1,167 @@
+import http.client
+import socket
+import threading
+import time
+import zlib
+from urllib.parse import urljoin, urlsplit
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+
+
+class Response:
+    def __init__(self, url, status, headers, body):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+
+class ConnectionPool:
+    # Keep-alive HTTP(S) connections, kept per host and reused across fetches so
+    # posters from the same CDN skip the TCP and TLS handshakes. Every socket
+    # operation has a timeout and the whole fetch has a deadline, so a hung
+    # host fails the fetch instead of holding a worker forever.
+    def __init__(self, max_idle_per_host=4, timeout=10, deadline=30, retries=2, backoff=0.5,
+                 max_body=20 * 1024 * 1024, max_redirects=5):
+        self.max_idle_per_host = max_idle_per_host
+        self.timeout = timeout
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.max_body = max_body
+        self.max_redirects = max_redirects
+        self.lock = threading.Lock()
+        self.idle = {}  # (scheme, host, port) -> idle connections, most recent last
+
+    def get(self, url, headers=None):
+        # Follows redirects; returns 304 and other non-error statuses to the caller
+        deadline = time.monotonic() + self.deadline
+        for _ in range(self.max_redirects + 1):
+            response = self.get_once(url, headers or {}, deadline)
+            if response.status not in REDIRECT_STATUSES:
+                if response.status >= 400:
+                    raise OSError(f"HTTP {response.status} for {url}")
+                return response
+            location = response.headers.get('Location')
+            if not location:
+                raise OSError(f"Redirect without a location for {url}")
+            url = urljoin(url, location)
+        raise OSError(f"Too many redirects for {url}")
+
+    def get_once(self, url, headers, deadline):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported URL scheme: {url}")
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        headers = dict(headers, **{'Accept-Encoding': 'gzip, deflate', 'Connection': 'keep-alive'})
+
+        attempt = 0
+        while True:
+            connection, reused = self.checkout(key)
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                body = self.read_body(response, deadline)
+            except (OSError, ValueError, http.client.HTTPException) as e:
+                connection.close()
+                # A kept-alive connection the server already dropped is retried
+                # right away on a fresh one without using up an attempt
+                if reused and isinstance(e, (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)):
+                    continue
+                if isinstance(e, ValueError) or attempt >= self.retries:
+                    raise
+                self.wait(attempt, deadline)
+                attempt += 1
+                continue
+
+            if response.will_close:
+                connection.close()
+            else:
+                self.checkin(key, connection)
+            if response.status in RETRY_STATUSES and attempt < self.retries:
+                self.wait(attempt, deadline, response.getheader('Retry-After'))
+                attempt += 1
+                continue
+            return Response(url, response.status, response.headers,
+                            self.decode(body, response.getheader('Content-Encoding')))
+
+    def read_body(self, response, deadline):
+        length = response.getheader('Content-Length')
+        if length and length.isdigit() and int(length) > self.max_body:
+            raise ValueError(f"Response of {length} bytes exceeds the {self.max_body} byte limit")
+        chunks = []
+        received = 0
+        while True:
+            if time.monotonic() > deadline:
+                raise socket.timeout("Fetch took longer than the deadline")
+            chunk = response.read(1 << 16)
+            if not chunk:
+                break
+            received += len(chunk)
+            if received > self.max_body:
+                raise ValueError(f"Response exceeds the {self.max_body} byte limit")
+            chunks.append(chunk)
+        return b''.join(chunks)
+
+    def decode(self, body, encoding):
+        # Decompressed no further than max_body, so a small compressed body
+        # can't get past the limit read_body enforces. 'deflate' is meant to
+        # be zlib data, but some servers send raw deflate instead
+        encoding = (encoding or '').lower()
+        if encoding == 'gzip':
+            formats = [47]  # gzip or zlib, by header
+        elif encoding == 'deflate':
+            formats = [zlib.MAX_WBITS, -zlib.MAX_WBITS]
+        else:
+            return body
+        for wbits in formats:
+            decompressor = zlib.decompressobj(wbits=wbits)
+            try:
+                data = decompressor.decompress(body, self.max_body + 1)
+            except zlib.error as e:
+                if wbits == formats[-1]:
+                    raise ValueError(f"Can't decode the {encoding} response: {e}") from e
+                continue
+            if decompressor.unconsumed_tail or len(data) > self.max_body:
+                raise ValueError(f"Decoded response exceeds the {self.max_body} byte limit")
+            if not decompressor.eof:
+                raise ValueError(f"Truncated {encoding} response")
+            return data
+
+    def wait(self, attempt, deadline, retry_after=None):
+        delay = self.backoff * 2 ** attempt
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, int(retry_after))
+        if time.monotonic() + delay > deadline:
+            raise socket.timeout("Retrying would exceed the fetch deadline")
+        time.sleep(delay)
+
+    def checkout(self, key):
+        with self.lock:
+            idle = self.idle.get(key)
+            if idle:
+                return idle.pop(), True
+        scheme, host, port = key
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout), False
+        return http.client.HTTPConnection(host, port, timeout=self.timeout), False
+
+    def checkin(self, key, connection):
+        with self.lock:
+            idle = self.idle.setdefault(key, [])
+            idle.append(connection)
+            if len(idle) <= self.max_idle_per_host:
+                return
+            connection = idle.pop(0)
+        connection.close()
+
+    def close(self):
+        with self.lock:
+            connections = [connection for idle in self.idle.values() for connection in idle]
+            self.idle.clear()
+        for connection in connections:
+            connection.close()
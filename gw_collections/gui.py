@@ -0,0 +1,1283 @@
+import queue
+import sqlite3
+import sys
+import threading
+import time
+import tkinter as tk
+from tkinter import ttk
+import tkinter.font as tkfont
+import tkinter.messagebox as messagebox
+import traceback
+
+from .collection import ItemCollection, ListRows, PagedCollection
+from .images import IMAGE_SIZE, NEIGHBOUR_PRIORITY, VISIBLE_PRIORITY, ImageLoader, ThumbnailCache
+from .metrics import METRICS, count, span
+from .models import Movie, Game, Book
+from .service import ConflictError
+
+
+class VirtualListbox(tk.Frame):
+    # A Listbox that only holds the rows currently in view; the full list of
+    # rows lives in a Python sequence and is scrolled through by hand. Rows are
+    # tracked by key (the item id), so the selection survives filtering and edits
+    def __init__(self, master, label=lambda row: row.title, key=lambda row: row.id, on_select=None,
+                 on_render=None, **kwargs):
+        tk.Frame.__init__(self, master, **kwargs)
+        self.label = label
+        self.key = key
+        self.on_select = on_select
+        self.on_render = on_render
+        self.rows = []
+        self.top = 0
+        self.visible = 10
+        self.selected_key = None
+        self.shown_labels = []
+        self.shown_rows = []
+
+        self.listbox = tk.Listbox(self, exportselection=False, activestyle='none')
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.listbox.pack(side=tk.LEFT, fill='both', expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill='y')
+        self.row_height = tkfont.Font(font=self.listbox['font']).metrics('linespace') + 1
+
+        self.listbox.bind('<<ListboxSelect>>', self.on_listbox_select)
+        self.listbox.bind('<Configure>', self.on_resize)
+        self.listbox.bind('<MouseWheel>', lambda event: self.scroll(-3 if event.delta > 0 else 3))
+        self.listbox.bind('<Button-4>', lambda event: self.scroll(-3))
+        self.listbox.bind('<Button-5>', lambda event: self.scroll(3))
+        self.listbox.bind('<Up>', lambda event: self.move_selection(-1))
+        self.listbox.bind('<Down>', lambda event: self.move_selection(1))
+        self.listbox.bind('<Prior>', lambda event: self.move_selection(-self.visible))
+        self.listbox.bind('<Next>', lambda event: self.move_selection(self.visible))
+
+    def set_rows(self, rows, scroll_to_top=False):
+        # A paged collection is shown from its snapshot's titles
+        items = rows if isinstance(rows, PagedCollection) else getattr(rows, 'items', None)
+        if isinstance(items, PagedCollection):
+            rows = ListRows(rows, items)
+        self.rows = rows
+        if scroll_to_top:
+            self.top = 0
+        self.render()
+
+    def visible_rows(self):
+        return self.rows[self.top:self.top + self.visible]
+
+    def neighbour_rows(self, distance=2):
+        # The rows the arrow keys would select next, nearest first
+        index = self.index_of(self.selected_key) if self.selected_key is not None else None
+        if index is None:
+            return []
+        rows = []
+        for offset in range(1, distance + 1):
+            for position in (index + offset, index - offset):
+                if 0 <= position < len(self.rows):
+                    rows.append(self.rows[position])
+        return rows
+
+    def render(self):
+        with span('render list', 'gui'):
+            self.top = max(0, min(self.top, len(self.rows) - self.visible))
+            # One extra row covers the partially visible line at the bottom
+            rows = self.rows[self.top:self.top + self.visible + 1]
+            labels = [self.label(row) for row in rows]
+
+            # Only touch the lines that differ from what is already on screen
+            common = 0
+            while common < min(len(labels), len(self.shown_labels)) and labels[common] == self.shown_labels[common]:
+                common += 1
+            if common < len(self.shown_labels):
+                self.listbox.delete(common, tk.END)
+            if common < len(labels):
+                self.listbox.insert(tk.END, *labels[common:])
+                count('rows rendered', len(labels) - common)
+            self.shown_labels = labels
+            self.shown_rows = rows
+
+            self.listbox.selection_clear(0, tk.END)
+            for i, row in enumerate(rows):
+                if self.key(row) == self.selected_key:
+                    self.listbox.selection_set(i)
+
+            if self.rows:
+                self.scrollbar.set(self.top / len(self.rows), min(1.0, (self.top + self.visible) / len(self.rows)))
+            else:
+                self.scrollbar.set(0.0, 1.0)
+            if self.on_render:
+                self.on_render(self)
+
+    def scroll(self, amount):
+        self.top += amount
+        self.render()
+        return 'break'
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.top = int(float(amount) * len(self.rows))
+            self.render()
+        elif action == 'scroll':
+            self.scroll(int(amount) * (self.visible if unit == 'pages' else 1))
+
+    def on_resize(self, event):
+        visible = max(1, event.height // self.row_height)
+        if visible != self.visible:
+            self.visible = visible
+            self.render()
+
+    def on_listbox_select(self, event):
+        selection = self.listbox.curselection()
+        if selection and selection[0] < len(self.shown_rows):
+            self.select(self.shown_rows[selection[0]])
+
+    def move_selection(self, amount):
+        if not self.rows:
+            return 'break'
+        index = self.index_of(self.selected_key)
+        index = 0 if index is None else max(0, min(len(self.rows) - 1, index + amount))
+        # Scroll just enough to keep the selection in view
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + self.visible:
+            self.top = index - self.visible + 1
+        self.select(self.rows[index])
+        return 'break'
+
+    def index_of(self, key):
+        for i, shown in enumerate(self.shown_rows):
+            if self.key(shown) == key:
+                return self.top + i
+        if isinstance(self.rows, ItemCollection):
+            item = self.rows.get(key)
+            return None if item is None else self.rows.index(item)
+        if hasattr(self.rows, 'index_of'):
+            return self.rows.index_of(key)
+        for i, candidate in enumerate(self.rows):
+            if self.key(candidate) == key:
+                return i
+        return None
+
+    def select(self, row):
+        self.selected_key = self.key(row)
+        self.render()
+        if self.on_select:
+            self.on_select(self.selected_key)
+
+    def clear_selection(self):
+        self.selected_key = None
+        self.render()
+
+
+class SearchController:
+    # Debounces keystrokes and drops queries that were superseded before they ran
+    def __init__(self, root, search, publish, delay=150):
+        self.root = root
+        self.search = search
+        self.publish = publish
+        self.delay = delay
+        self.pending = None
+        self.generation = 0
+        self.last_term = None
+
+    def submit(self, term):
+        if self.pending is not None:
+            self.root.after_cancel(self.pending)
+        self.generation += 1
+        self.pending = self.root.after(self.delay, self.run, term, self.generation)
+
+    def run(self, term, generation):
+        self.pending = None
+        if generation != self.generation or term == self.last_term:
+            return
+        results = self.search(term)
+        self.last_term = term
+        self.publish(term, results)
+
+    def reset(self):
+        # The collection changed, so the same term has to be searched again
+        if self.pending is not None:
+            self.root.after_cancel(self.pending)
+            self.pending = None
+        self.generation += 1
+        self.last_term = None
+
+
+class FacetBar(tk.Frame):
+    # Facet filters and a sort order for one collection's list; every facet
+    # value shows how many items picking it would leave, e.g. "Action (1,234)".
+    # Counts are worked out when a box is opened, so a window over a large
+    # collection doesn't index it before anyone asks for a facet
+    ALL = "All"
+    MAX_VALUES = 200
+
+    def __init__(self, master, collection_manager, collection, facets, sorts, on_change=None, **kwargs):
+        tk.Frame.__init__(self, master, **kwargs)
+        self.collection_manager = collection_manager
+        self.collection = collection
+        self.sorts = sorts
+        self.on_change = on_change
+        self.selected = {}
+        self.values = {}
+        self.boxes = {}
+        self.stale = set()  # fields whose counts are out of date
+        for row, (field, text) in enumerate(facets):
+            tk.Label(self, text=text).grid(row=row, column=0, sticky='w')
+            box = ttk.Combobox(self, state='readonly', width=24, values=[self.ALL],
+                               postcommand=lambda field=field: self.fill(field))
+            box.current(0)
+            box.grid(row=row, column=1, sticky='we')
+            box.bind('<<ComboboxSelected>>', self.changed)
+            self.boxes[field] = box
+            self.selected[field] = None
+            self.values[field] = [None]
+            self.stale.add(field)
+
+        tk.Label(self, text="Sort by").grid(row=len(facets), column=0, sticky='w')
+        self.sort_box = ttk.Combobox(self, state='readonly', width=24, values=[text for text, _ in sorts])
+        self.sort_box.current(0)
+        self.sort_box.grid(row=len(facets), column=1, sticky='we')
+        self.sort_box.bind('<<ComboboxSelected>>', self.changed)
+        self.descending = tk.BooleanVar(value=False)
+        tk.Checkbutton(self, text="Descending", variable=self.descending,
+                       command=self.changed).grid(row=len(facets) + 1, column=1, sticky='w')
+
+    def filters(self):
+        return {field: value for field, value in self.selected.items() if value is not None}
+
+    def sort(self):
+        return self.sorts[max(self.sort_box.current(), 0)][1]
+
+    def refresh_counts(self):
+        # The collection or the filters changed; boxes are filled again when opened
+        self.stale.update(self.boxes)
+
+    def fill(self, field):
+        if field not in self.stale:
+            return
+        self.stale.discard(field)
+        counts = self.collection_manager.facet_counts(self.collection, field, self.filters())[:self.MAX_VALUES]
+        values = [None] + [value for value, _ in counts]
+        labels = [self.ALL] + [f"{value} ({count:,})" for value, count in counts]
+        selected = self.selected[field]
+        if selected is not None and selected not in values:
+            values.append(selected)
+            labels.append(f"{selected} (0)")
+        self.values[field] = values
+        box = self.boxes[field]
+        box.configure(values=labels)
+        box.current(values.index(selected))
+
+    def changed(self, event=None):
+        for field, box in self.boxes.items():
+            position = box.current()
+            if position >= 0:
+                self.selected[field] = self.values[field][position]
+        self.refresh_counts()
+        if self.on_change:
+            self.on_change()
+
+
+class CollectionLoader:
+    # Streams collection files on a background thread and hands batches of
+    # items to the Tk thread, which owns the collections and their indexes.
+    # Each tick adds items in slices for at most `budget` seconds, and lists
+    # are refreshed at most once per `poll_interval`, so the window keeps
+    # responding however large the batches are
+    def __init__(self, root, collection_manager, on_batch=None, on_done=None, on_failed=None, batch_size=2000,
+                 poll_interval=50, budget=0.02, slice_size=200):
+        self.root = root
+        self.collection_manager = collection_manager
+        self.on_batch = on_batch
+        self.on_done = on_done
+        self.on_failed = on_failed
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.budget = budget
+        self.slice_size = slice_size
+        self.batches = queue.Queue(maxsize=8)
+        self.batch = None  # the batch being added, and how many of its items are in
+        self.applied = 0
+        self.progress = {}  # collection -> (bytes_read, total_bytes) of the last batch added, until reported
+        self.reported = 0
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        self.root.after(self.poll_interval, self.poll)
+
+    def run(self):
+        file_manager = self.collection_manager.file_manager
+        for collection in list(self.collection_manager.loading):
+            try:
+                for items, bytes_read, total_bytes in file_manager.stream_collection(collection, self.batch_size):
+                    self.batches.put((collection, items, bytes_read, total_bytes, None))
+            except Exception as e:
+                self.batches.put((collection, None, 0, 0, e))
+            else:
+                self.batches.put((collection, None, 0, 0, None))
+
+    def poll(self):
+        try:
+            self.apply_batches()
+        finally:
+            # Come back at once while batches are waiting
+            if self.collection_manager.loading:
+                busy = self.batch is not None or not self.batches.empty()
+                self.root.after(1 if busy else self.poll_interval, self.poll)
+
+    def apply_batches(self):
+        deadline = time.perf_counter() + self.budget
+        while time.perf_counter() < deadline:
+            if self.batch is None:
+                try:
+                    self.batch = self.batches.get_nowait()
+                except queue.Empty:
+                    break
+                self.applied = 0
+            collection, items, bytes_read, total_bytes, error = self.batch
+            if items is not None:
+                self.collection_manager.add_loaded(collection, items[self.applied:self.applied + self.slice_size])
+                self.applied += self.slice_size
+                if self.applied >= len(items):
+                    self.batch = None
+                    self.progress[collection] = (bytes_read, total_bytes)
+                continue
+            self.batch = None
+            self.progress.pop(collection, None)
+            self.finish(collection, error)
+        now = time.perf_counter()
+        if self.progress and now - self.reported >= self.poll_interval / 1000:
+            self.reported = now
+            for collection, (bytes_read, total_bytes) in self.progress.items():
+                if self.on_batch:
+                    self.on_batch(collection, bytes_read, total_bytes)
+            self.progress.clear()
+
+    def finish(self, collection, error):
+        if error is None:
+            try:
+                self.collection_manager.finish_loading(collection)
+            except Exception as e:
+                error = e
+        if error is not None:
+            self.collection_manager.fail_loading(collection, error)
+            if self.on_failed:
+                self.on_failed(collection, error)
+        elif self.on_done:
+            self.on_done(collection)
+
+
+class StallDetector:
+    # Ticks on the Tk main loop; a tick that arrives late means the loop was
+    # blocked for that long. A watchdog thread notes what the Tk thread was
+    # running while it was stuck, so the stall shows up with a stack.
+    def __init__(self, root, interval=50, threshold=0.2):
+        self.root = root
+        self.interval = interval
+        self.threshold = threshold
+        self.main_thread = threading.get_ident()
+        self.last_tick = time.perf_counter()
+        self.stack = None
+        self.closed = False
+        self.root.after(self.interval, self.tick)
+        threading.Thread(target=self.watch, daemon=True).start()
+
+    def tick(self):
+        if self.closed:
+            return
+        now = time.perf_counter()
+        stall = now - self.last_tick - self.interval / 1000
+        if stall > self.threshold:
+            count('main loop stalls')
+            METRICS.add_span('main loop stall', 'gui', now - stall, stall,
+                             {'stack': self.stack} if self.stack else None)
+        self.last_tick = now
+        self.stack = None
+        self.root.after(self.interval, self.tick)
+
+    def watch(self):
+        while not self.closed:
+            time.sleep(self.threshold / 2)
+            if self.stack is None and time.perf_counter() - self.last_tick > self.threshold + self.interval / 1000:
+                frame = sys._current_frames().get(self.main_thread)
+                if frame is not None:
+                    self.stack = ''.join(traceback.format_stack(frame)[-8:])
+
+    def close(self):
+        self.closed = True
+
+
+class PerformanceOverlay(tk.Toplevel):
+    # Recent span latencies and the counters, refreshed twice a second
+    def __init__(self, master, refresh_interval=500):
+        tk.Toplevel.__init__(self, master)
+        self.title("Performance")
+        self.attributes('-topmost', True)
+        self.refresh_interval = refresh_interval
+        self.text = tk.Label(self, justify='left', anchor='nw', font='TkFixedFont')
+        self.text.pack(fill='both', expand=True)
+        self.update_text()
+
+    def update_text(self):
+        if not self.winfo_exists():
+            return
+        summary = METRICS.summary()
+        lines = [f"{'span':<20}{'count':>8}{'p50 ms':>9}{'p90 ms':>9}{'max ms':>9}"]
+        for name, stats in sorted(summary['spans'].items()):
+            lines.append(f"{name[:20]:<20}{stats['count']:>8}{stats['p50_ms']:>9.1f}"
+                         f"{stats['p90_ms']:>9.1f}{stats['max_ms']:>9.1f}")
+        lines.append('')
+        for name, value in sorted(summary['counters'].items()):
+            lines.append(f"{name:<28}{value:>27,}")
+        self.text.configure(text='\n'.join(lines))
+        self.after(self.refresh_interval, self.update_text)
+
+
+class GUI(tk.Tk):
+    # How often edits other clients of a collection service made are shown
+    SYNC_INTERVAL = 250
+
+    def __init__(self, collection_manager, overlay=False):
+        tk.Tk.__init__(self)
+        self.collection_manager = collection_manager
+        self.title("GW Collections")
+        self.geometry("800x600")
+        self.image_loader = ImageLoader(self, thumbnail_cache=ThumbnailCache())
+        self.placeholder_image = tk.PhotoImage(width=IMAGE_SIZE[0], height=IMAGE_SIZE[1])
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.facet_bars = {}
+        self.prefetch_pending = None
+        self.stall_detector = StallDetector(self) if METRICS.enabled else None
+        self.overlay = None
+        self.bind_all('<F12>', self.toggle_overlay)
+        self.create_widgets()
+        self.load_collections()
+        self.selected_movie = None
+        self.selected_game = None
+        self.selected_book = None
+        if self.collection_manager.loading:
+            self.collection_loader = CollectionLoader(self, self.collection_manager,
+                                                      on_batch=self.collection_batch_loaded,
+                                                      on_done=self.collection_loaded,
+                                                      on_failed=self.collection_failed)
+        self.after(self.SYNC_INTERVAL, self.sync_collections)
+        if overlay:
+            self.toggle_overlay()
+
+    def create_widgets(self):
+        self.status_bar = tk.Label(self, anchor='w')
+        self.status_bar.pack(side=tk.BOTTOM, fill='x')
+
+        self.notebook = ttk.Notebook(self)
+        self.notebook.pack(side=tk.LEFT, fill='both', expand=True)
+
+        self.movie_container = ttk.Frame(self.notebook)
+        self.movies_frame = ttk.Frame(self.movie_container)
+        self.movies_frame.grid(row=0, column=0)
+        self.add_movie_button = tk.Button(self.movie_container, text="Add Movie", command=self.open_add_movie_modal)
+        self.add_movie_button.grid(row=1, column=0)
+
+        self.game_container = ttk.Frame(self.notebook)
+        self.games_frame = ttk.Frame(self.game_container)
+        self.games_frame.grid(row=0, column=0) 
+        self.add_movie_button = tk.Button(self.game_container, text="Add Game", command=self.open_add_game_modal)
+        self.add_movie_button.grid(row=1, column=0)
+
+        self.book_container = ttk.Frame(self.notebook)
+        self.books_frame = ttk.Frame(self.book_container)
+        self.books_frame.grid(row=0, column=0)
+        self.add_book_button = tk.Button(self.book_container, text="Add Book", command=self.open_add_book_modal)
+        self.add_book_button.grid(row=1, column=0)
+
+        self.notebook.add(self.movie_container, text='Movies')
+        self.notebook.add(self.game_container, text='Games')
+        self.notebook.add(self.book_container, text='Books')
+
+        self.right_frame = ttk.Frame(self)
+        self.right_frame.pack(side=tk.RIGHT, fill='both', expand=True)
+
+        self.add_movie_button = tk.Button(self.movie_container, text="Add Movie", command=self.open_add_movie_modal)
+        self.add_game_button = tk.Button(self.game_container, text="Add Game", command=self.open_add_game_modal)
+        self.add_book_button = tk.Button(self.book_container, text="Add Book", command=self.open_add_book_modal)
+        
+
+        # Bind the event to load collections when a new tab is selected
+        self.notebook.bind("<<NotebookTabChanged>>", self.tab_changed)
+
+
+    def tab_changed(self, event):
+        selection = self.notebook.tab(self.notebook.select(), "text")
+
+        if selection == 'Movies':
+            self.add_movie_button.grid(row=1, column=0)
+            self.add_game_button.pack_forget()
+            self.add_book_button.pack_forget()
+
+        elif selection == 'Games':
+            self.add_movie_button.pack_forget()
+            self.add_game_button.grid(row=1, column=0)
+            self.add_book_button.pack_forget()
+
+
+        elif selection == 'Books':
+            self.add_movie_button.pack_forget()
+            self.add_game_button.pack_forget()
+            self.add_book_button.grid(row=1, column=0)
+
+        self.image_loader.cancel('details')
+        for widget in self.right_frame.winfo_children():
+            widget.destroy()
+        listbox = getattr(self, {'Movies': 'movies_listbox', 'Games': 'games_listbox', 'Books': 'books_listbox'}[selection], None)
+        if listbox is not None:
+            self.schedule_prefetch(listbox)
+
+    def toggle_overlay(self, event=None):
+        # F12 shows or hides the performance overlay, turning metrics on if need be
+        if self.overlay is not None and self.overlay.winfo_exists():
+            self.overlay.destroy()
+            self.overlay = None
+            return
+        METRICS.enable()
+        if self.stall_detector is None:
+            self.stall_detector = StallDetector(self)
+        self.overlay = PerformanceOverlay(self)
+
+    def sync_collections(self):
+        for collection in self.collection_manager.sync():
+            self.refresh_loaded_list(collection)
+        self.after(self.SYNC_INTERVAL, self.sync_collections)
+
+    def report_callback_exception(self, exc_type, exc, tb):
+        # An edit the collection service refused because another client saved one first
+        if isinstance(exc, ConflictError):
+            messagebox.showwarning("Changed elsewhere", f"Your change was not saved: {exc}.\n"
+                                   "The list now shows the saved version.")
+            return
+        # Edits saved in the background are written out before a search or
+        # query that storage answers; they stay queued if that fails
+        if isinstance(exc, (OSError, sqlite3.Error)):
+            self.status_bar.configure(text=f"Your latest changes could not be saved: {exc}")
+            messagebox.showerror("Saving failed", f"Your latest changes could not be saved:\n{exc}")
+            return
+        tk.Tk.report_callback_exception(self, exc_type, exc, tb)
+
+    def on_close(self):
+        # Pending edits are written out first; if that fails the window can stay open
+        try:
+            self.collection_manager.close()
+        except (OSError, sqlite3.Error) as e:
+            if messagebox.askretrycancel("Saving failed", f"Your latest changes could not be saved:\n{e}"):
+                return
+        if self.stall_detector is not None:
+            self.stall_detector.close()
+        self.image_loader.close()
+        self.destroy()
+
+
+    def open_add_movie_modal(self):
+        self.add_movie_modal = tk.Toplevel(self)
+        self.add_movie_modal.grab_set()
+
+        tk.Label(self.add_movie_modal, text="Title").grid(row=0, column=0)
+        self.add_movie_title_entry = tk.Entry(self.add_movie_modal)
+        self.add_movie_title_entry.grid(row=0, column=1)
+
+        tk.Label(self.add_movie_modal, text="Director").grid(row=1, column=0)
+        self.add_movie_director_entry = tk.Entry(self.add_movie_modal)
+        self.add_movie_director_entry.grid(row=1, column=1)
+
+        tk.Label(self.add_movie_modal, text="Genre").grid(row=2, column=0)
+        self.add_movie_genre_entry = tk.Entry(self.add_movie_modal)
+        self.add_movie_genre_entry.grid(row=2, column=1)
+
+        tk.Label(self.add_movie_modal, text="Length").grid(row=3, column=0)
+        self.add_movie_length_entry = tk.Entry(self.add_movie_modal)
+        self.add_movie_length_entry.grid(row=3, column=1)
+
+        tk.Label(self.add_movie_modal, text="Description").grid(row=4, column=0)
+        self.add_movie_description_entry = tk.Entry(self.add_movie_modal)
+        self.add_movie_description_entry.grid(row=4, column=1)
+
+        tk.Label(self.add_movie_modal, text="Poster URL").grid(row=5, column=0)
+        self.add_movie_poster_url_entry = tk.Entry(self.add_movie_modal)
+        self.add_movie_poster_url_entry.grid(row=5, column=1)
+
+        self.add_movie_submit_button = tk.Button(self.add_movie_modal, text="Add Movie", command=self.add_movie)
+        self.add_movie_submit_button.grid(row=6, column=0, columnspan=2)
+    
+    def open_edit_movie_modal(self):
+        self.add_movie_modal = tk.Toplevel(self)
+        self.add_movie_modal.grab_set()
+
+        tk.Label(self.add_movie_modal, text="Title").grid(row=0, column=0)
+        self.add_movie_title_entry = tk.Entry(self.add_movie_modal)
+        self.add_movie_title_entry.insert(0, self.selected_movie.title)
+        self.add_movie_title_entry.grid(row=0, column=1)
+
+        tk.Label(self.add_movie_modal, text="Director").grid(row=1, column=0)
+        self.add_movie_director_entry = tk.Entry(self.add_movie_modal)
+        self.add_movie_director_entry.insert(0, self.selected_movie.director)
+        self.add_movie_director_entry.grid(row=1, column=1)
+
+        tk.Label(self.add_movie_modal, text="Genre").grid(row=2, column=0)
+        self.add_movie_genre_entry = tk.Entry(self.add_movie_modal)
+        self.add_movie_genre_entry.insert(0, self.selected_movie.genre)
+        self.add_movie_genre_entry.grid(row=2, column=1)
+
+        tk.Label(self.add_movie_modal, text="Length").grid(row=3, column=0)
+        self.add_movie_length_entry = tk.Entry(self.add_movie_modal)
+        self.add_movie_length_entry.insert(0, self.selected_movie.length)
+        self.add_movie_length_entry.grid(row=3, column=1)
+
+        tk.Label(self.add_movie_modal, text="Description").grid(row=4, column=0)
+        self.add_movie_description_entry = tk.Entry(self.add_movie_modal)
+        self.add_movie_description_entry.insert(0, self.selected_movie.description)
+        self.add_movie_description_entry.grid(row=4, column=1)
+
+        tk.Label(self.add_movie_modal, text="Image URL").grid(row=5, column=0)
+        self.add_movie_poster_url_entry = tk.Entry(self.add_movie_modal)
+        self.add_movie_poster_url_entry.insert(0, self.selected_movie.image_url)
+        self.add_movie_poster_url_entry.grid(row=5, column=1)
+
+        # Adding the "Cancel" and "Edit Movie" buttons at the bottom
+        edit_button = tk.Button(self.add_movie_modal, text="Cancel", command=self.close_edit_movie_modal)
+        edit_button.grid(row=6, column=0, pady=10, padx=10)  # update row value accordingly and add some padding 
+        
+        delete_button = tk.Button(self.add_movie_modal, text="Edit Movie", command=self.edit_movie)
+        delete_button.grid(row=6, column=1, pady=10, padx=10)  # update row and column value accordingly and add some padding
+
+    def close_edit_movie_modal(self):
+        self.add_movie_modal.destroy()
+
+    def edit_movie(self):
+        if not self.ensure_loaded('movies'):
+            return
+        # Extract the updated data from the entry fields
+        new_title = self.add_movie_title_entry.get()
+        new_director = self.add_movie_director_entry.get()
+        new_genre = self.add_movie_genre_entry.get()
+        new_length = self.add_movie_length_entry.get()
+        new_description = self.add_movie_description_entry.get()
+        new_image_url = self.add_movie_poster_url_entry.get()
+
+        # Create a new Movie object with the updated data
+        updated_movie = Movie(new_title, new_director, new_genre, new_length, new_description, new_image_url)
+
+        # Update the movie in the collections
+        self.collection_manager.update_item('movies', self.selected_movie, updated_movie)
+
+        # Close the edit modal
+        self.close_edit_movie_modal()
+
+        # Reload movie details
+        #self.display_movie_details()
+
+        self.selected_movie = None
+
+        # Clearing the right_frame 
+        for widget in self.right_frame.winfo_children():
+            widget.destroy()
+
+
+        self.refresh_movie_list(deployed=1)
+
+
+    def add_movie(self):
+        if not self.ensure_loaded('movies'):
+            return
+        title = self.add_movie_title_entry.get()
+        director = self.add_movie_director_entry.get()
+        genre = self.add_movie_genre_entry.get()
+        length = self.add_movie_length_entry.get()
+        description = self.add_movie_description_entry.get()
+        poster_url = self.add_movie_poster_url_entry.get()
+        movie = Movie(title, director, genre, length, description, poster_url)
+        duplicates = self.collection_manager.add_item('movies', movie)
+        self.add_movie_modal.destroy()
+        self.refresh_movie_list(deployed=1)
+        self.warn_duplicates(movie, duplicates)
+
+    def refresh_movie_list(self, search_term = None, deployed = None):
+        if not deployed:
+            self.search_box = tk.Entry(self.movies_frame)
+            self.search_box.pack()
+            self.search_box.bind("<KeyRelease>", self.search_movie)
+
+            self.facet_bars['movies'] = FacetBar(
+                self.movies_frame, self.collection_manager, 'movies',
+                facets=[('genre', "Genre"), ('creator', "Director")],
+                sorts=[("Default", None), ("Title", ('title',)), ("Director", ('creator', 'title')),
+                       ("Genre", ('genre', 'title')), ("Length", ('length', 'title'))],
+                on_change=lambda: self.facets_changed('movies'))
+            self.facet_bars['movies'].pack(fill='x')
+
+            label = tk.Label(self.movies_frame, text="Movies List")
+            label.pack()
+
+            self.movies_listbox = VirtualListbox(self.movies_frame, on_select=self.display_movie_details,
+                                                 on_render=self.schedule_prefetch)
+            self.movies_listbox.pack(fill='both', expand=True)
+
+            self.movie_search = SearchController(
+                self, lambda term: self.browse('movies', term),
+                lambda term, movies: self.movies_listbox.set_rows(movies, scroll_to_top=True))
+
+        self.movie_search.reset()
+        self.facet_bars['movies'].refresh_counts()
+
+        with span('refresh list', 'gui', collection='movies'):
+            movies = self.browse('movies', search_term or '')
+            self.movies_listbox.set_rows(movies, scroll_to_top=search_term is not None)
+
+    def search_movie(self, event):
+        self.movie_search.submit(self.search_box.get())
+        
+        
+
+    def display_movie_details(self, movie_id):
+        # Called by the list view with the id of the selected movie
+        movie = self.collection_manager.get_item('movies', movie_id)
+        if movie is not None:
+            self.selected_movie = movie  # Store the selected movie object
+
+            # Clearing the right_frame before adding new details
+            for widget in self.right_frame.winfo_children():
+                widget.destroy()
+
+            # Show movie image (loaded in the background)
+            self.show_image(movie.image_url)
+
+            # Displaying Movie Details
+            tk.Label(self.right_frame, text="\n\n\nTitle: " + movie.title).grid(row=0, column=0, columnspan=2)  # changed
+            tk.Label(self.right_frame, text="Director: " + movie.director).grid(row=1, column=0, columnspan=2)  # changed
+            tk.Label(self.right_frame, text="Genre: " + movie.genre).grid(row=2, column=0, columnspan=2)  # changed
+            tk.Label(self.right_frame, text="Length: " + str(movie.length)).grid(row=3, column=0, columnspan=2)  # changed
+            tk.Label(self.right_frame, text="Description: " + movie.description).grid(row=4, column=0, columnspan=2)  # changed
+
+            # Adding the "Edit Movie" and "Delete Movie" buttons at the bottom
+            edit_button = tk.Button(self.right_frame, text="Edit Movie", command=self.open_edit_movie_modal)
+            edit_button.grid(row=5, column=0, pady=10, padx=10)  # update row value accordingly and add some padding 
+
+            delete_button = tk.Button(self.right_frame, text="Delete Movie", command=self.delete_movie)
+            delete_button.grid(row=5, column=1, pady=10, padx=10)  # update row and column value accordingly and add some padding
+
+    def delete_movie(self):
+        if not self.ensure_loaded('movies'):
+            return
+
+        # Show confirmation dialog
+        confirm = messagebox.askokcancel("Delete Movie", f"Are you sure you want to delete '{self.selected_movie.title}'?")
+        
+        # If the user confirms the deletion
+        if confirm:
+            # Remove the movie from the collection
+            self.collection_manager.remove_item('movies', self.selected_movie)
+            # Update the ListBox to reflect the deletion
+            self.refresh_movie_list(deployed=1)
+            # Reset the selected movie to None after deletion
+            self.selected_movie = None
+
+            # Clearing the right_frame 
+            for widget in self.right_frame.winfo_children():
+                widget.destroy()
+
+        
+
+    def open_add_game_modal(self):
+        add_game_modal = tk.Toplevel(self)
+
+        tk.Label(add_game_modal, text="Title").grid(row=0, column=0)
+        tk.Label(add_game_modal, text="Developer").grid(row=1, column=0)
+        tk.Label(add_game_modal, text="Genre").grid(row=2, column=0)
+        tk.Label(add_game_modal, text="Platform").grid(row=3, column=0)
+        tk.Label(add_game_modal, text="Description").grid(row=4, column=0)
+        tk.Label(add_game_modal, text="Image URL").grid(row=5, column=0)
+
+        title_entry = tk.Entry(add_game_modal)
+        title_entry.grid(row=0, column=1)
+        developer_entry = tk.Entry(add_game_modal)
+        developer_entry.grid(row=1, column=1)
+        genre_entry = tk.Entry(add_game_modal)
+        genre_entry.grid(row=2, column=1)
+        platform_entry = tk.Entry(add_game_modal)
+        platform_entry.grid(row=3, column=1)
+        description_entry = tk.Entry(add_game_modal)
+        description_entry.grid(row=4, column=1)
+        image_url_entry = tk.Entry(add_game_modal)
+        image_url_entry.grid(row=5, column=1)
+
+        add_button = tk.Button(add_game_modal, text="Add Game", command=lambda: self.add_game(
+            title_entry.get(),
+            developer_entry.get(),
+            genre_entry.get(),
+            platform_entry.get(),
+            description_entry.get(),
+            image_url_entry.get(),
+            add_game_modal
+        ))
+        add_button.grid(row=6, column=0, columnspan=2)
+
+    def add_game(self, title, developer, genre, platform, description, image_url, add_game_modal):
+        if not self.ensure_loaded('games'):
+            return
+        game = Game(title, developer, genre, platform, description, image_url)
+        duplicates = self.collection_manager.add_item('games', game)
+        add_game_modal.destroy()
+        self.refresh_game_list(deployed=1)
+        self.warn_duplicates(game, duplicates)
+
+    def open_edit_game_modal(self):
+        self.add_game_modal = tk.Toplevel(self)
+        self.add_game_modal.grab_set()
+
+        tk.Label(self.add_game_modal, text="Title").grid(row=0, column=0)
+        self.add_game_title_entry = tk.Entry(self.add_game_modal)
+        self.add_game_title_entry.insert(0, self.selected_game.title)
+        self.add_game_title_entry.grid(row=0, column=1)
+
+        tk.Label(self.add_game_modal, text="Developer").grid(row=1, column=0)
+        self.add_game_developer_entry = tk.Entry(self.add_game_modal)
+        self.add_game_developer_entry.insert(0, self.selected_game.developer)
+        self.add_game_developer_entry.grid(row=1, column=1)
+
+        tk.Label(self.add_game_modal, text="Genre").grid(row=2, column=0)
+        self.add_game_genre_entry = tk.Entry(self.add_game_modal)
+        self.add_game_genre_entry.insert(0, self.selected_game.genre)
+        self.add_game_genre_entry.grid(row=2, column=1)
+
+        tk.Label(self.add_game_modal, text="Platform").grid(row=3, column=0)
+        self.add_game_platform_entry = tk.Entry(self.add_game_modal)
+        self.add_game_platform_entry.insert(0, self.selected_game.platform)
+        self.add_game_platform_entry.grid(row=3, column=1)
+
+        tk.Label(self.add_game_modal, text="Description").grid(row=4, column=0)
+        self.add_game_description_entry = tk.Entry(self.add_game_modal)
+        self.add_game_description_entry.insert(0, self.selected_game.description)
+        self.add_game_description_entry.grid(row=4, column=1)
+
+        tk.Label(self.add_game_modal, text="Image URL").grid(row=5, column=0)
+        self.add_game_image_url_entry = tk.Entry(self.add_game_modal)
+        self.add_game_image_url_entry.insert(0, self.selected_game.image_url)
+        self.add_game_image_url_entry.grid(row=5, column=1)
+
+        # Adding the "Cancel" and "Edit Game" buttons at the bottom
+        edit_button = tk.Button(self.add_game_modal, text="Cancel", command=self.close_edit_game_modal)
+        edit_button.grid(row=6, column=0, pady=10, padx=10)  # update row value accordingly and add some padding 
+        
+        delete_button = tk.Button(self.add_game_modal, text="Edit Game", command=self.edit_game)
+        delete_button.grid(row=6, column=1, pady=10, padx=10)  # update row and column value accordingly and add some padding
+
+    def close_edit_game_modal(self):
+        self.add_game_modal.destroy()
+
+    def edit_game(self):
+        if not self.ensure_loaded('games'):
+            return
+        # Extract the updated data from the entry fields
+        new_title = self.add_game_title_entry.get()
+        new_developer = self.add_game_developer_entry.get()
+        new_genre = self.add_game_genre_entry.get()
+        new_platform = self.add_game_platform_entry.get()
+        new_description = self.add_game_description_entry.get()
+        new_image_url = self.add_game_image_url_entry.get()
+
+        # Create a new Game object with the updated data
+        updated_game = Game(new_title, new_developer, new_genre, new_platform, new_description, new_image_url)
+
+        # Update the game in the collections
+        self.collection_manager.update_item('games', self.selected_game, updated_game)
+
+        # Close the edit modal
+        self.close_edit_game_modal()
+
+        # Reload movie details
+        #self.display_movie_details()
+
+        self.selected_game = None
+
+        # Clearing the right_frame 
+        for widget in self.right_frame.winfo_children():
+            widget.destroy()
+
+
+        self.refresh_game_list(deployed=1)
+
+
+    def refresh_game_list(self, game_search_term = None, deployed = None):
+        if not deployed:
+            self.game_search_box = tk.Entry(self.games_frame)
+            self.game_search_box.pack()
+            self.game_search_box.bind("<KeyRelease>", self.search_game)
+
+            self.facet_bars['games'] = FacetBar(
+                self.games_frame, self.collection_manager, 'games',
+                facets=[('genre', "Genre"), ('platform', "Platform"), ('creator', "Developer")],
+                sorts=[("Default", None), ("Title", ('title',)), ("Developer", ('creator', 'title')),
+                       ("Genre", ('genre', 'title')), ("Platform", ('platform', 'title'))],
+                on_change=lambda: self.facets_changed('games'))
+            self.facet_bars['games'].pack(fill='x')
+
+            label = tk.Label(self.games_frame, text="Games List")
+            label.pack()
+
+            self.games_listbox = VirtualListbox(self.games_frame, on_select=self.display_game_details,
+                                                on_render=self.schedule_prefetch)
+            self.games_listbox.pack(fill='both', expand=True)
+
+            self.game_search = SearchController(
+                self, lambda term: self.browse('games', term),
+                lambda term, games: self.games_listbox.set_rows(games, scroll_to_top=True))
+
+        self.game_search.reset()
+        self.facet_bars['games'].refresh_counts()
+
+        with span('refresh list', 'gui', collection='games'):
+            games = self.browse('games', game_search_term or '')
+            self.games_listbox.set_rows(games, scroll_to_top=game_search_term is not None)
+
+    def search_game(self, event):
+        self.game_search.submit(self.game_search_box.get())
+
+    def display_game_details(self, game_id):
+        # Called by the list view with the id of the selected game
+        game = self.collection_manager.get_item('games', game_id)
+        if game is not None:
+            self.selected_game = game  # Store the selected game object
+
+            # Clearing the right_frame before adding new details
+            for widget in self.right_frame.winfo_children():
+                widget.destroy()
+            
+            # Show game image (loaded in the background)
+            self.show_image(game.image_url)
+
+            # Displaying Game Details
+            tk.Label(self.right_frame, text="\n\nTitle: " + game.title).grid(row=0, column=0, columnspan=2)
+            tk.Label(self.right_frame, text="Developer: " + game.developer).grid(row=1, column=0, columnspan=2)
+            tk.Label(self.right_frame, text="Genre: " + game.genre).grid(row=2, column=0, columnspan=2)
+            tk.Label(self.right_frame, text="Platform: " + str(game.platform)).grid(row=3, column=0, columnspan=2)
+            tk.Label(self.right_frame, text="Description: " + game.description).grid(row=4, column=0, columnspan=2)
+
+            # Adding the "Edit Game" and "Delete Game" buttons at the bottom
+            edit_button = tk.Button(self.right_frame, text="Edit Game", command=self.open_edit_game_modal)
+            edit_button.grid(row=5, column=0, pady=10, padx=10)  # update row value accordingly and add some padding 
+
+            delete_button = tk.Button(self.right_frame, text="Delete Game", command=self.delete_game)
+            delete_button.grid(row=5, column=1, pady=10, padx=10)  # update row and column value accordingly and add some padding
+
+
+    def delete_game(self):
+        if not self.ensure_loaded('games'):
+            return
+
+        # Show confirmation dialog
+        confirm = messagebox.askokcancel("Delete Game", f"Are you sure you want to delete '{self.selected_game.title}'?")
+        
+        # If the user confirms the deletion
+        if confirm:
+            # Remove the game from the collection
+            self.collection_manager.remove_item('games', self.selected_game)
+            # Update the ListBox to reflect the deletion
+            self.refresh_game_list(deployed=1)
+            # Reset the selected movie to None after deletion
+            self.selected_game = None
+
+            # Clearing the right_frame 
+            for widget in self.right_frame.winfo_children():
+                widget.destroy()
+
+
+    def open_add_book_modal(self):
+        add_book_modal = tk.Toplevel(self)
+
+        tk.Label(add_book_modal, text="Title").grid(row=0, column=0)
+        tk.Label(add_book_modal, text="Author").grid(row=1, column=0)
+        tk.Label(add_book_modal, text="Genre").grid(row=2, column=0)
+        tk.Label(add_book_modal, text="Pages").grid(row=3, column=0)
+        tk.Label(add_book_modal, text="Description").grid(row=4, column=0)
+        tk.Label(add_book_modal, text="Image URL").grid(row=5, column=0)
+
+        title_entry = tk.Entry(add_book_modal)
+        title_entry.grid(row=0, column=1)
+        author_entry = tk.Entry(add_book_modal)
+        author_entry.grid(row=1, column=1)
+        genre_entry = tk.Entry(add_book_modal)
+        genre_entry.grid(row=2, column=1)
+        pages_entry = tk.Entry(add_book_modal)
+        pages_entry.grid(row=3, column=1)
+        description_entry = tk.Entry(add_book_modal)
+        description_entry.grid(row=4, column=1)
+        image_url_entry = tk.Entry(add_book_modal)
+        image_url_entry.grid(row=5, column=1)
+
+        add_button = tk.Button(add_book_modal, text="Add Book", command=lambda: self.add_book(
+            title_entry.get(),
+            author_entry.get(),
+            genre_entry.get(),
+            pages_entry.get(),
+            description_entry.get(),
+            image_url_entry.get(),
+            add_book_modal
+        ))
+        add_button.grid(row=6, column=0, columnspan=2)
+
+    def add_book(self, title, author, genre, pages, description, image_url, add_book_modal):
+        if not self.ensure_loaded('books'):
+            return
+        book = Book(title, author, genre, pages, description, image_url)
+        duplicates = self.collection_manager.add_item('books', book)
+        add_book_modal.destroy()
+        self.refresh_book_list(deployed=1)
+        self.warn_duplicates(book, duplicates)
+
+    def open_edit_book_modal(self):
+        self.add_book_modal = tk.Toplevel(self)
+        self.add_book_modal.grab_set()
+
+        tk.Label(self.add_book_modal, text="Title").grid(row=0, column=0)
+        self.add_book_title_entry = tk.Entry(self.add_book_modal)
+        self.add_book_title_entry.insert(0, self.selected_book.title)
+        self.add_book_title_entry.grid(row=0, column=1)
+
+        tk.Label(self.add_book_modal, text="Author").grid(row=1, column=0)
+        self.add_book_author_entry = tk.Entry(self.add_book_modal)
+        self.add_book_author_entry.insert(0, self.selected_book.author)
+        self.add_book_author_entry.grid(row=1, column=1)
+
+        tk.Label(self.add_book_modal, text="Genre").grid(row=2, column=0)
+        self.add_book_genre_entry = tk.Entry(self.add_book_modal)
+        self.add_book_genre_entry.insert(0, self.selected_book.genre)
+        self.add_book_genre_entry.grid(row=2, column=1)
+
+        tk.Label(self.add_book_modal, text="Pages").grid(row=3, column=0)
+        self.add_book_pages_entry = tk.Entry(self.add_book_modal)
+        self.add_book_pages_entry.insert(0, self.selected_book.pages)
+        self.add_book_pages_entry.grid(row=3, column=1)
+
+        tk.Label(self.add_book_modal, text="Description").grid(row=4, column=0)
+        self.add_book_description_entry = tk.Entry(self.add_book_modal)
+        self.add_book_description_entry.insert(0, self.selected_book.description)
+        self.add_book_description_entry.grid(row=4, column=1)
+
+        tk.Label(self.add_book_modal, text="Image URL").grid(row=5, column=0)
+        self.add_book_image_url_entry = tk.Entry(self.add_book_modal)
+        self.add_book_image_url_entry.insert(0, self.selected_book.image_url)
+        self.add_book_image_url_entry.grid(row=5, column=1)
+
+        # Adding the "Cancel" and "Edit Book" buttons at the bottom
+        edit_button = tk.Button(self.add_book_modal, text="Cancel", command=self.close_edit_book_modal)
+        edit_button.grid(row=6, column=0, pady=10, padx=10)  # update row value accordingly and add some padding 
+        
+        delete_button = tk.Button(self.add_book_modal, text="Edit Book", command=self.edit_book)
+        delete_button.grid(row=6, column=1, pady=10, padx=10)  # update row and column value accordingly and add some padding
+
+    def close_edit_book_modal(self):
+        self.add_book_modal.destroy()
+
+    def edit_book(self):
+        if not self.ensure_loaded('books'):
+            return
+        # Extract the updated data from the entry fields
+        new_title = self.add_book_title_entry.get()
+        new_author = self.add_book_author_entry.get()
+        new_genre = self.add_book_genre_entry.get()
+        new_pages = self.add_book_pages_entry.get()
+        new_description = self.add_book_description_entry.get()
+        new_image_url = self.add_book_image_url_entry.get()
+
+        # Create a new Game object with the updated data
+        updated_book = Book(new_title, new_author, new_genre, new_pages, new_description, new_image_url)
+
+        # Update the game in the collections
+        self.collection_manager.update_item('books', self.selected_book, updated_book)
+
+        # Close the edit modal
+        self.close_edit_book_modal()
+
+        # Reload movie details
+        #self.display_movie_details()
+
+        self.selected_book = None
+
+        # Clearing the right_frame 
+        for widget in self.right_frame.winfo_children():
+            widget.destroy()
+
+
+        self.refresh_book_list(deployed=1)
+
+    def refresh_book_list(self, deployed = None):
+        if not deployed:
+            self.facet_bars['books'] = FacetBar(
+                self.books_frame, self.collection_manager, 'books',
+                facets=[('genre', "Genre"), ('creator', "Author")],
+                sorts=[("Default", None), ("Title", ('title',)), ("Author", ('creator', 'title')),
+                       ("Genre", ('genre', 'title')), ("Pages", ('pages', 'title'))],
+                on_change=lambda: self.facets_changed('books'))
+            self.facet_bars['books'].pack(fill='x')
+
+            label = tk.Label(self.books_frame, text="Book List")
+            label.pack()
+            self.books_listbox = VirtualListbox(self.books_frame, on_select=self.display_book_details,
+                                                on_render=self.schedule_prefetch)
+            self.books_listbox.pack(fill='both', expand=True)
+        self.facet_bars['books'].refresh_counts()
+        with span('refresh list', 'gui', collection='books'):
+            self.books_listbox.set_rows(self.browse('books'))
+
+    def browse(self, collection, term=''):
+        # The list's search term narrowed by the collection's facet bar, with
+        # near-miss titles after the matches to forgive typos
+        facets = self.facet_bars[collection]
+        return self.collection_manager.browse(collection, term, facets.filters(), facets.sort(),
+                                              facets.descending.get(), fuzzy=True)
+
+    def facets_changed(self, collection):
+        # Earlier results were filtered differently, so searches start over
+        if collection == 'movies':
+            self.movie_search.reset()
+            self.movies_listbox.set_rows(self.browse('movies', self.search_box.get()), scroll_to_top=True)
+        elif collection == 'games':
+            self.game_search.reset()
+            self.games_listbox.set_rows(self.browse('games', self.game_search_box.get()), scroll_to_top=True)
+        elif collection == 'books':
+            self.books_listbox.set_rows(self.browse('books'), scroll_to_top=True)
+
+    def display_book_details(self, book_id):
+        # Called by the list view with the id of the selected book
+        book = self.collection_manager.get_item('books', book_id)
+        if book is not None:
+            self.selected_book = book  # Store the selected book object
+
+            # Clearing the right_frame before adding new details
+            for widget in self.right_frame.winfo_children():
+                widget.destroy()
+
+            # Show book image (loaded in the background)
+            self.show_image(book.image_url)
+
+
+            # Displaying Book Details
+            tk.Label(self.right_frame, text="\n\nTitle: " + book.title).grid(row=0, column=0, columnspan=2)
+            tk.Label(self.right_frame, text="Author: " + book.author).grid(row=1, column=0, columnspan=2)
+            tk.Label(self.right_frame, text="Genre: " + book.genre).grid(row=2, column=0, columnspan=2)
+            tk.Label(self.right_frame, text="Pages: " + str(book.pages)).grid(row=3, column=0, columnspan=2)
+            tk.Label(self.right_frame, text="Description: " + book.description).grid(row=4, column=0, columnspan=2)
+
+            # Adding the "Edit Book" and "Delete Book" buttons at the bottom
+            edit_button = tk.Button(self.right_frame, text="Edit Book", command=self.open_edit_book_modal)
+            edit_button.grid(row=5, column=0, pady=10, padx=10)  # update row value accordingly and add some padding 
+
+            delete_button = tk.Button(self.right_frame, text="Delete Book", command=self.delete_book)
+            delete_button.grid(row=5, column=1, pady=10, padx=10)  # update row and column value accordingly and add some padding
+
+
+
+    def delete_book(self):
+        if not self.ensure_loaded('books'):
+            return
+
+        # Show confirmation dialog
+        confirm = messagebox.askokcancel("Delete Book", f"Are you sure you want to delete '{self.selected_book.title}'?")
+        
+        # If the user confirms the deletion
+        if confirm:
+            # Remove the movie from the collection
+            self.collection_manager.remove_item('books', self.selected_book)
+            # Update the ListBox to reflect the deletion
+            self.refresh_book_list(deployed=1)
+            # Reset the selected movie to None after deletion
+            self.selected_book = None
+
+            # Clearing the right_frame 
+            for widget in self.right_frame.winfo_children():
+                widget.destroy()
+
+    def show_image(self, image_url):
+        # Show a placeholder right away and swap the poster in once it is ready
+        image_label = tk.Label(self.right_frame, image=self.placeholder_image, text="Loading image...", compound='center')
+        image_label.grid(row=0, column=2, rowspan=48)
+
+        def on_loaded(photo, error):
+            if not image_label.winfo_exists():
+                return
+            if error is not None:
+                # Where the poster would be, with the reason
+                image_label.configure(text=f"No image\n{error}", wraplength=200)
+                self.status_bar.configure(text=f"Failed to load image: {error}")
+                return
+            image_label.configure(image=photo, text="")
+            image_label.image = photo  # keep a reference to the image
+
+        self.image_loader.request('details', image_url, on_loaded)
+    
+    
+    def schedule_prefetch(self, listbox):
+        # Warm the posters around the selection and in view once scrolling settles
+        if self.prefetch_pending is not None:
+            self.after_cancel(self.prefetch_pending)
+        self.prefetch_pending = self.after(100, self.prefetch_posters, listbox)
+
+    def prefetch_posters(self, listbox):
+        self.prefetch_pending = None
+        if not listbox.winfo_ismapped():
+            return
+        image_urls = [(row.image_url, NEIGHBOUR_PRIORITY) for row in listbox.neighbour_rows()]
+        image_urls += [(row.image_url, VISIBLE_PRIORITY) for row in listbox.visible_rows()]
+        self.image_loader.prefetch(image_urls)
+
+    def load_collections(self):
+        self.refresh_movie_list()
+        self.refresh_game_list()
+        self.refresh_book_list()
+
+    def collection_batch_loaded(self, collection, bytes_read, total_bytes):
+        percent = 100 * bytes_read // total_bytes if total_bytes else 100
+        count = len(self.collection_manager.collections[collection])
+        self.status_bar.configure(text=f"Loading {collection}... {percent}% ({count} items)")
+        self.refresh_loaded_list(collection)
+
+    def collection_loaded(self, collection):
+        self.refresh_loaded_list(collection)
+        if self.collection_manager.loading:
+            return
+        failed = ', '.join(sorted(self.collection_manager.failed))
+        self.status_bar.configure(text=f"Read-only after a loading error: {failed}" if failed else "")
+
+    def collection_failed(self, collection, error):
+        # What was read is shown, but edits are refused so it never replaces the source
+        self.collection_loaded(collection)
+        messagebox.showerror("Loading failed", f"The {collection} collection could not be loaded in full:\n{error}\n\n"
+                             "The items read so far are shown, but it can't be changed until this is fixed.")
+
+    def refresh_loaded_list(self, collection):
+        # An active search is re-run in full so it picks up the new items
+        if collection == 'movies':
+            if self.search_box.get():
+                self.movie_search.reset()
+                self.movie_search.submit(self.search_box.get())
+            else:
+                self.refresh_movie_list(deployed=1)
+        elif collection == 'games':
+            if self.game_search_box.get():
+                self.game_search.reset()
+                self.game_search.submit(self.game_search_box.get())
+            else:
+                self.refresh_game_list(deployed=1)
+        elif collection == 'books':
+            self.refresh_book_list(deployed=1)
+
+    def warn_duplicates(self, item, duplicates):
+        # The item was added; the user decides whether it should stay
+        if not duplicates:
+            return
+        lines = [f"{other.title} ({kind}, {score:.0%} alike)" for other, kind, score in duplicates[:5]]
+        messagebox.showwarning("Possible duplicate", f"{item.title} looks like an item already in the collection:\n\n"
+                               + "\n".join(lines))
+
+    def ensure_loaded(self, collection):
+        if collection in self.collection_manager.loading:
+            messagebox.showinfo("Still loading", f"The {collection} collection is still loading, please try again in a moment.")
+            return False
+        if collection in self.collection_manager.failed:
+            messagebox.showerror("Read-only", f"The {collection} collection failed to load, so it can't be changed:\n"
+                                 f"{self.collection_manager.failed[collection]}")
+            return False
+        return True
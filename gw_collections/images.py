@@ -0,0 +1,381 @@
+import hashlib
+import heapq
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlsplit
+
+from PIL import Image, ImageTk
+
+from .fetch import ConnectionPool
+from .metrics import count, span
+from .thumbnails import decode_thumbnail
+
+IMAGE_SIZE = (300, 300)
+THUMBNAIL_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'gw_collections', 'thumbnails')
+
+# Lower runs first: what the user clicked, then the rows next to the
+# selection, then the rest of the rows in view
+USER_PRIORITY = 0
+NEIGHBOUR_PRIORITY = 1
+VISIBLE_PRIORITY = 2
+
+
+class ThumbnailCache:
+    # Resized posters on disk, keyed by URL and target size, evicted least recently used first
+    def __init__(self, directory=THUMBNAIL_DIR, max_bytes=200 * 1024 * 1024, max_age=24 * 60 * 60):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> bytes on disk
+        self.total_bytes = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self.scan()
+
+    def key(self, image_url, size):
+        # "fit": thumbnails keep their aspect ratio, unlike older stretched ones
+        return hashlib.sha256(f"{image_url}|{size[0]}x{size[1]}|fit".encode('utf-8')).hexdigest()
+
+    def paths(self, key):
+        return os.path.join(self.directory, key + '.png'), os.path.join(self.directory, key + '.json')
+
+    def scan(self):
+        # Rebuild the LRU order from the modification times left by earlier runs
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.png'):
+                continue
+            key = name[:-len('.png')]
+            image_path, meta_path = self.paths(key)
+            try:
+                stat = os.stat(image_path)
+                meta_bytes = os.path.getsize(meta_path)
+            except OSError:
+                continue
+            found.append((stat.st_mtime, key, stat.st_size + meta_bytes))
+        with self.lock:
+            for _, key, size_on_disk in sorted(found):
+                self.entries[key] = size_on_disk
+                self.total_bytes += size_on_disk
+            self.evict()
+
+    def get(self, image_url, size):
+        key = self.key(image_url, size)
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+        image_path, meta_path = self.paths(key)
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            os.utime(image_path)
+        except (OSError, ValueError):
+            with self.lock:
+                self.remove(key)
+            return None
+        return image_path, meta
+
+    def is_fresh(self, meta):
+        return time.time() - meta.get('checked', 0) < self.max_age
+
+    def put(self, image_url, size, image, etag=None, last_modified=None):
+        key = self.key(image_url, size)
+        image_path, meta_path = self.paths(key)
+        meta = {'url': image_url, 'size': list(size), 'etag': etag,
+                'last_modified': last_modified, 'checked': time.time()}
+        if image.mode not in ('RGB', 'RGBA', 'L', 'P'):
+            image = image.convert('RGB')
+        self.write_file(image_path, lambda f: image.save(f, format='PNG'))
+        self.write_file(meta_path, lambda f: f.write(json.dumps(meta).encode('utf-8')))
+        size_on_disk = os.path.getsize(image_path) + os.path.getsize(meta_path)
+        with self.lock:
+            self.total_bytes += size_on_disk - self.entries.pop(key, 0)
+            self.entries[key] = size_on_disk
+            self.evict()
+
+    def touch(self, image_url, size, meta):
+        # The server confirmed our copy is still current (304 Not Modified)
+        meta = dict(meta, checked=time.time())
+        _, meta_path = self.paths(self.key(image_url, size))
+        self.write_file(meta_path, lambda f: f.write(json.dumps(meta).encode('utf-8')))
+
+    def write_file(self, path, write):
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            write(f)
+        os.replace(temp_path, path)
+
+    def evict(self):
+        while self.total_bytes > self.max_bytes and self.entries:
+            self.remove(next(iter(self.entries)))
+
+    def remove(self, key):
+        self.total_bytes -= self.entries.pop(key, 0)
+        for path in self.paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def open_thumbnail(image_path):
+    image = Image.open(image_path)
+    image.load()
+    return image
+
+
+def fetch_image(image_url, size=IMAGE_SIZE, thumbnail_cache=None, connection_pool=None, decode=decode_thumbnail):
+    # Runs on a worker thread: serve the cached thumbnail or download the
+    # poster and hand it to `decode`, e.g. a process pool
+    if connection_pool is None:
+        connection_pool = ConnectionPool()
+    cached = thumbnail_cache.get(image_url, size) if thumbnail_cache else None
+    headers = {}
+    if cached:
+        image_path, meta = cached
+        if thumbnail_cache.is_fresh(meta):
+            try:
+                with span('open thumbnail', 'images'):
+                    image = open_thumbnail(image_path)
+                count('thumbnail cache hits')
+                return image
+            except OSError:
+                cached = None
+        else:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+    with span('download', 'images', url=image_url):
+        response = connection_pool.get(image_url, headers)
+    count('bytes fetched', len(response.body))
+    if response.status == 304 and cached:
+        count('not modified')
+        thumbnail_cache.touch(image_url, size, cached[1])
+        return open_thumbnail(cached[0])
+    count('thumbnail cache misses')
+    with span('decode', 'images'):
+        image = decode(response.body, size)
+    if thumbnail_cache:
+        with span('store thumbnail', 'images'):
+            thumbnail_cache.put(image_url, size, image,
+                                etag=response.headers.get('ETag'),
+                                last_modified=response.headers.get('Last-Modified'))
+    return image
+
+
+class ImageJob:
+    __slots__ = ('image_url', 'host', 'priority', 'generation', 'waiters', 'started')
+
+    def __init__(self, image_url):
+        self.image_url = image_url
+        self.host = urlsplit(image_url).hostname
+        self.priority = float('inf')
+        self.generation = None  # prefetch round that wants it, if any
+        self.waiters = {}  # target -> (token, callback)
+        self.started = False
+
+
+class ImageLoader:
+    # Fetches posters on a small pool of worker threads. Requests for what the
+    # user clicked go ahead of speculative prefetches, and each host only gets
+    # a few fetches at a time.
+    def __init__(self, root, size=IMAGE_SIZE, thumbnail_cache=None, max_workers=4, max_per_host=2,
+                 decode_workers=2, cache_size=128, poll_interval=30):
+        self.root = root
+        self.size = size
+        self.thumbnail_cache = thumbnail_cache
+        self.max_per_host = max_per_host
+        self.connection_pool = ConnectionPool(max_idle_per_host=max_per_host)
+        # Decoding runs in other processes so it never holds the GIL the Tk
+        # thread needs; the pool is started on the first download
+        self.decode_workers = decode_workers
+        self.decoder = None
+        self.decoder_lock = threading.Lock()
+        self.results = queue.Queue()
+        self.cache = OrderedDict()  # image_url -> PhotoImage
+        self.cache_size = cache_size
+        self.poll_interval = poll_interval
+        # target -> (token, job) of the request currently wanted for that target
+        self.pending = {}
+        self.tokens = itertools.count()
+        self.closed = False
+
+        # Shared with the workers, guarded by the condition
+        self.condition = threading.Condition()
+        self.queue = []  # heap of (priority, sequence, job)
+        self.jobs = {}  # image_url -> job not yet handed back to the Tk thread
+        self.host_active = Counter()
+        self.sequence = itertools.count()
+        self.generation = 0
+        for _ in range(max_workers):
+            threading.Thread(target=self.work, daemon=True).start()
+        self.root.after(self.poll_interval, self.poll)
+
+    def request(self, target, image_url, callback):
+        # A new request for the same target supersedes the previous one
+        self.cancel(target)
+        token = next(self.tokens)
+
+        photo = self.cache.get(image_url)
+        if photo is not None:
+            count('photo cache hits')
+            self.cache.move_to_end(image_url)
+            callback(photo, None)
+            return token
+        count('photo cache misses')
+
+        with self.condition:
+            # Joins a prefetch of the same image if one is already queued or running
+            job = self.schedule(image_url, USER_PRIORITY)
+            job.waiters[target] = (token, callback)
+        self.pending[target] = (token, job)
+        return token
+
+    def prefetch(self, image_urls):
+        # `image_urls` is a list of (image_url, priority). It replaces the
+        # previous prefetch: jobs of that one that have not started are dropped
+        # unless a request is waiting for them.
+        with self.condition:
+            self.generation += 1
+            for image_url, priority in image_urls:
+                if image_url and image_url not in self.cache:
+                    self.schedule(image_url, priority).generation = self.generation
+
+    def schedule(self, image_url, priority):
+        # Called with the condition held
+        job = self.jobs.get(image_url)
+        if job is None:
+            job = ImageJob(image_url)
+            self.jobs[image_url] = job
+        if not job.started and priority < job.priority:
+            job.priority = priority
+            heapq.heappush(self.queue, (priority, next(self.sequence), job))
+            self.condition.notify()
+        return job
+
+    def cancel(self, target):
+        pending = self.pending.pop(target, None)
+        if pending:
+            with self.condition:
+                pending[1].waiters.pop(target, None)
+
+    def next_job(self):
+        # The most urgent job whose host has a free slot; called with the condition held
+        if self.closed:
+            return None
+        deferred = []
+        job = None
+        while self.queue:
+            priority, sequence, candidate = heapq.heappop(self.queue)
+            if candidate.started or priority != candidate.priority or self.jobs.get(candidate.image_url) is not candidate:
+                continue  # an entry left behind when the job was moved up or dropped
+            if not candidate.waiters and candidate.generation != self.generation:
+                del self.jobs[candidate.image_url]
+                continue
+            if self.host_active[candidate.host] >= self.max_per_host:
+                deferred.append((priority, sequence, candidate))
+                continue
+            job = candidate
+            break
+        for entry in deferred:
+            heapq.heappush(self.queue, entry)
+        return job
+
+    def work(self):
+        while True:
+            with self.condition:
+                job = self.next_job()
+                while job is None:
+                    if self.closed:
+                        return
+                    self.condition.wait()
+                    job = self.next_job()
+                job.started = True
+                self.host_active[job.host] += 1
+            try:
+                image, error = fetch_image(job.image_url, self.size, self.thumbnail_cache,
+                                           self.connection_pool, self.decode), None
+            except Exception as e:
+                image, error = None, e
+            with self.condition:
+                self.host_active[job.host] -= 1
+                # A host slot is free again, so deferred jobs may be runnable
+                self.condition.notify_all()
+            self.results.put((job, image, error))
+
+    def decode(self, data, size):
+        with self.decoder_lock:
+            if self.closed:
+                raise RuntimeError("The image loader is closed")
+            if self.decoder is None:
+                # Spawned rather than forked: forking a process that runs Tk and threads is unsafe
+                self.decoder = ProcessPoolExecutor(self.decode_workers, mp_context=multiprocessing.get_context('spawn'))
+            decoder = self.decoder
+        try:
+            return decoder.submit(decode_thumbnail, data, size).result()
+        except BrokenProcessPool:
+            with self.decoder_lock:
+                if self.decoder is decoder:
+                    self.decoder = None
+            return decode_thumbnail(data, size)
+
+    def poll(self):
+        if self.closed:
+            return
+        while True:
+            try:
+                job, image, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            with self.condition:
+                if self.jobs.get(job.image_url) is job:
+                    del self.jobs[job.image_url]
+                waiters = list(job.waiters.items())
+            photo = None
+            if error is None:
+                # PhotoImage must be created on the Tk thread
+                photo = self.remember(job.image_url, image)
+            # Failed prefetches are retried when the item is actually shown
+            for target, (token, callback) in waiters:
+                current = self.pending.get(target)
+                # Ignore results of requests that were superseded in the meantime
+                if current is None or current[0] != token:
+                    continue
+                del self.pending[target]
+                callback(photo, error)
+        self.root.after(self.poll_interval, self.poll)
+
+    def remember(self, image_url, image):
+        photo = self.cache.get(image_url)
+        if photo is None:
+            with span('photo image', 'images'):
+                photo = ImageTk.PhotoImage(image)
+            self.cache[image_url] = photo
+        self.cache.move_to_end(image_url)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return photo
+
+    def close(self):
+        self.closed = True
+        self.pending.clear()
+        with self.condition:
+            self.queue.clear()
+            self.jobs.clear()
+            self.condition.notify_all()
+        self.connection_pool.close()
+        with self.decoder_lock:
+            if self.decoder is not None:
+                self.decoder.shutdown(wait=False, cancel_futures=True)
+                self.decoder = None
@@ -0,0 +1,374 @@
+import threading
+from contextlib import nullcontext
+
+from .collection import ItemCollection, PagedCollection
+from .dedup import DuplicateFinder
+from .metrics import span
+from .models import new_item_id, validate_items
+from .persist import WriteBehind
+from .query import QueryEngine, QueryResult, sort_items
+from .search import FuzzyIndex, SearchIndex, SearchResult
+from .transfer import read_items, write_items
+
+
+class CollectionManager:
+    def __init__(self, file_manager, load=True, write_delay=None, cache_size=None, check_duplicates=False):
+        self.file_manager = file_manager
+        # With check_duplicates, added items are checked against their
+        # collection (its duplicate finder is built before the first add) and
+        # add_items reports the ones that look like duplicates
+        self.check_duplicates = check_duplicates
+        # With load=False the collections start empty and are filled in
+        # batches through add_loaded, e.g. by a CollectionLoader. With a
+        # cache_size, collections the storage can page are opened at once as
+        # PagedCollections that build items on demand and keep that many
+        self.loading = set()
+        self.failed = {}  # collection -> error for collections that couldn't be read in full
+        if load:
+            self.collections = self.file_manager.load_data(cache_size)
+        else:
+            self.collections = {}
+            for collection in self.file_manager.file_names:
+                items = self.file_manager.page_collection(collection, cache_size) if cache_size else None
+                if items is None:
+                    self.collections[collection] = ItemCollection()
+                    self.loading.add(collection)
+                else:
+                    self.file_manager.finish_loading(collection, items)
+                    self.collections[collection] = items
+        # Search and query indexes of paged collections are built the first
+        # time they are needed; the others are kept up to date while loading.
+        # A storage that answers searches and queries itself (SQLite) is asked
+        # instead, until something only an in-memory index can do needs one
+        self.indexes = {}
+        self.queries = {}
+        self.fuzzy = {}  # title trigram indexes, built on the first fuzzy search
+        self.duplicates = {}  # duplicate finders, built on the first duplicate check
+        for collection, items in self.collections.items():
+            if isinstance(items, ItemCollection) and not self.file_manager.answers_queries:
+                self.indexes[collection] = SearchIndex(items)
+                self.queries[collection] = QueryEngine(items)
+        paged = [(collection, items) for collection, items in self.collections.items()
+                 if isinstance(items, PagedCollection)]
+        if paged:
+            threading.Thread(target=self.verify_paged, args=(paged,), daemon=True).start()
+        # With a write_delay, edits return at once and a WriteBehind saves them
+        # after that many seconds without further edits; without one, each
+        # edit is saved before it returns
+        self.writer = None
+        if write_delay is not None:
+            self.writer = WriteBehind(self.file_manager, self.collections, write_delay)
+
+    def add_loaded(self, collection, items):
+        current = self.collections[collection]
+        for item in items:
+            if current.has_id(item.id):
+                item.id = new_item_id()
+            current.add(item)
+            self.index_item(collection, item)
+
+    def finish_loading(self, collection):
+        if self.file_manager.finish_loading(collection, self.collections[collection]):
+            self.drop_indexes(collection)
+        self.loading.discard(collection)
+
+    def fail_loading(self, collection, error):
+        # The items read so far stay visible, but the collection is never
+        # edited, journaled or compacted, so they are never saved over the source
+        self.loading.discard(collection)
+        self.failed[collection] = error
+        self.drop_indexes(collection)
+
+    def verify_paged(self, paged):
+        # Paged collections open without reading their snapshots, so the
+        # checksums are checked in the background. A damaged snapshot leaves
+        # its collection read-only, so it is never compacted over the JSON
+        # files, and is discarded so the next start reads those instead
+        for collection, items in paged:
+            try:
+                items.verify()
+            except ValueError as e:
+                self.failed[collection] = e
+                self.file_manager.discard_snapshot(collection)
+
+    def drop_indexes(self, collection):
+        # Rebuilt on first use
+        self.indexes.pop(collection, None)
+        self.queries.pop(collection, None)
+        self.fuzzy.pop(collection, None)
+        self.duplicates.pop(collection, None)
+
+    def search_index(self, collection):
+        index = self.indexes.get(collection)
+        if index is None:
+            with span('build search index', 'search', collection=collection):
+                index = self.indexes[collection] = SearchIndex(self.collections[collection])
+        return index
+
+    def query_engine(self, collection):
+        queries = self.queries.get(collection)
+        if queries is None:
+            with span('build query index', 'search', collection=collection):
+                queries = self.queries[collection] = QueryEngine(self.collections[collection])
+        return queries
+
+    def fuzzy_index(self, collection):
+        index = self.fuzzy.get(collection)
+        if index is None:
+            with span('build fuzzy index', 'search', collection=collection):
+                index = self.fuzzy[collection] = FuzzyIndex(self.collections[collection])
+        return index
+
+    def duplicate_finder(self, collection):
+        finder = self.duplicates.get(collection)
+        if finder is None:
+            with span('find duplicates', 'search', collection=collection):
+                finder = self.duplicates[collection] = DuplicateFinder(self.collections[collection])
+        return finder
+
+    def built_indexes(self, collection):
+        # Indexes that aren't built yet will see the collection as it is when they are
+        indexes = (self.indexes.get(collection), self.queries.get(collection), self.fuzzy.get(collection),
+                   self.duplicates.get(collection))
+        return [index for index in indexes if index is not None]
+
+    def index_item(self, collection, item):
+        for index in self.built_indexes(collection):
+            index.add(item)
+
+    def unindex_item(self, collection, item):
+        for index in self.built_indexes(collection):
+            index.remove(item)
+
+    def editing(self):
+        # Held while a collection changes, so a background write never copies one halfway
+        return self.writer.lock if self.writer is not None else nullcontext()
+
+    def record(self, collection, changes):
+        if self.writer is not None:
+            self.writer.record(collection, changes)
+        else:
+            self.file_manager.record_batch(collection, self.collections[collection], changes)
+
+    def flush(self, collection=None):
+        # Returns once every edit made so far, or every edit of `collection`, is saved
+        if self.writer is not None:
+            self.writer.flush(collection)
+
+    def check_loaded(self, collection):
+        # Edits are only recorded against a complete collection
+        if collection in self.loading:
+            raise RuntimeError(f"The {collection} collection is still loading")
+        if collection in self.failed:
+            raise RuntimeError(f"The {collection} collection failed to load: {self.failed[collection]}")
+
+    def add_item(self, collection, item):
+        # [(other item, 'exact' or 'near', similarity)] the item may duplicate
+        return self.add_items(collection, [item]).get(item.id, [])
+
+    def add_items(self, collection, items):
+        # Returns {item id: [(other item, 'exact' or 'near', similarity)]} for
+        # the added items that look like duplicates, once duplicates are
+        # checked in the collection
+        self.check_loaded(collection)
+        items = list(items)
+        validate_items(items)
+        current = self.collections[collection]
+        ids = {item.id for item in items}
+        if len(ids) != len(items) or any(current.has_id(item_id) for item_id in ids):
+            raise ValueError(f"Items added to {collection} must have ids not already in use")
+        if self.check_duplicates:
+            self.duplicate_finder(collection)
+        with self.editing():
+            current.extend(items)
+            for item in items:
+                self.index_item(collection, item)
+            self.record(collection, [('add', item, None) for item in items])
+        finder = self.duplicates.get(collection)
+        if finder is None:
+            return {}
+        duplicates = {}
+        for item in items:
+            matches = finder.matches(item)
+            if matches:
+                duplicates[item.id] = matches
+        return duplicates
+
+    def remove_item(self, collection, item):
+        self.remove_items(collection, [item])
+
+    def remove_items(self, collection, items):
+        self.check_loaded(collection)
+        current = self.collections[collection]
+        ids = list(dict.fromkeys(item.id for item in items))
+        missing = [item_id for item_id in ids if not current.has_id(item_id)]
+        if missing:
+            raise ValueError(f"{len(missing)} of the items are not in {collection}")
+        changes = []
+        with self.editing():
+            for item_id in ids:
+                item = current.remove(item_id)
+                self.unindex_item(collection, item)
+                changes.append(('remove', None, item))
+            self.record(collection, changes)
+
+    def sync(self):
+        # Applies the edits other clients of a shared storage saved since the
+        # last call, which are already stored, and returns the collections
+        # they touched. They wait until every collection is loaded
+        if self.loading:
+            return set()
+        changed = set()
+        for collection, changes in self.file_manager.remote_changes():
+            if collection in self.failed:
+                continue
+            current = self.collections[collection]
+            with self.editing():
+                for op, item in changes:
+                    old_item = current.get(item.id)
+                    if old_item is not None:
+                        self.unindex_item(collection, old_item)
+                        if op == 'remove':
+                            current.remove(item.id)
+                            continue
+                        current.replace(item)
+                    elif op == 'remove':
+                        continue
+                    else:
+                        current.add(item)
+                    self.index_item(collection, item)
+            changed.add(collection)
+        return changed
+
+    def get_item(self, collection, item_id):
+        return self.collections[collection].get(item_id)
+
+    def search(self, term):
+        results = {}
+        for key in self.collections:
+            results[key] = self.search_collection(key, term)
+        return results
+
+    def search_collection(self, collection, term, fuzzy=False):
+        # Ranked matches on title, creator, genre and description, looked up
+        # as rows are shown. With fuzzy, titles that are only similar to the
+        # term follow the matches, once it is long enough to hold a typo
+        if not term.strip():
+            return list(self.collections[collection])
+        with span('search', 'search', collection=collection, term=term):
+            ids = self.storage_answer(collection, self.indexes, self.file_manager.search, term)
+            if ids is not None:
+                results = SearchResult(self.collections[collection], [ids])
+            else:
+                results = self.search_index(collection).search(term)
+        if fuzzy and len(term.strip()) >= 3:
+            found = results.ids()
+            results.extend([item for item in self.fuzzy_search(collection, term) if item.id not in found])
+        return results
+
+    def fuzzy_search(self, collection, term, limit=50):
+        # Titles most similar to `term`, e.g. "Harry Potter" for "harry poter"
+        with span('fuzzy search', 'search', collection=collection, term=term):
+            return self.fuzzy_index(collection).search(term, limit)
+
+    def find_duplicates(self, collection):
+        # Groups of items that look like the same entry, largest first. The
+        # first call checks the whole collection; after that every added or
+        # edited item is checked as it comes in
+        return self.duplicate_finder(collection).groups()
+
+    def duplicates_of(self, collection, item):
+        # [(other item, 'exact' or 'near', similarity)] for an item in the collection
+        return self.duplicate_finder(collection).matches(item)
+
+    def query(self, collection, filters=None, sort=('title',), descending=False):
+        # Items matching the facet `filters` (field -> value or list of values),
+        # ordered by the fields in `sort`; pages are looked up on demand.
+        # Without either it is the collection itself, which needs no index
+        if not filters and not sort:
+            return self.collections[collection]
+        with span('query', 'search', collection=collection):
+            ids = self.storage_answer(collection, self.queries, self.file_manager.query, filters or {}, sort)
+            if ids is not None:
+                return QueryResult(self.collections[collection], ids=ids[::-1] if descending else ids)
+            return self.query_engine(collection).query(filters, sort, descending)
+
+    def storage_answer(self, collection, built, ask, *args):
+        # Ids from the storage for a search or query, or None if it can't
+        # answer or an in-memory index in `built` is already current
+        if collection in built or collection in self.loading or collection in self.failed:
+            return None
+        # The storage only knows about edits once they are written; those of
+        # the other collections can wait, and a failed write is raised
+        self.flush(collection)
+        ids = ask(collection, *args)
+        if ids is None:
+            return None
+        current = self.collections[collection]
+        return [item_id for item_id in ids if current.has_id(item_id)]
+
+    def facet_counts(self, collection, field, filters=None):
+        return self.query_engine(collection).facet_counts(field, filters)
+
+    def browse(self, collection, term='', filters=None, sort=None, descending=False, fuzzy=False):
+        # A search narrowed by facets; without a sort order matches stay ranked
+        if not term.strip():
+            return self.query(collection, filters, sort, descending)
+        results = self.search_collection(collection, term, fuzzy)
+        if filters:
+            # The storage is asked first, so a search it answered needs no in-memory index at all
+            ids = self.storage_answer(collection, self.queries, self.file_manager.query, filters, None)
+            ids = set(ids) if ids is not None else self.query_engine(collection).filter_ids(filters)
+            results = results.within(ids)
+        if sort:
+            results = sort_items(results, sort, descending)
+        return results
+
+    def update_item(self, collection, old_item, new_item):
+        self.update_items(collection, [(old_item, new_item)])
+
+    def update_items(self, collection, replacements):
+        # `replacements` is a list of (old_item, new_item) pairs; the new item
+        # takes over the old one's id and place
+        self.check_loaded(collection)
+        replacements = list(replacements)
+        current = self.collections[collection]
+        missing = [old_item for old_item, _ in replacements if not current.has_id(old_item.id)]
+        if missing:
+            raise ValueError(f"{len(missing)} of the items are not in {collection}")
+        for old_item, new_item in replacements:
+            new_item.id = old_item.id
+        validate_items([new_item for _, new_item in replacements])
+        changes = []
+        with self.editing():
+            for _, new_item in replacements:
+                old_item = current.replace(new_item)
+                self.unindex_item(collection, old_item)
+                self.index_item(collection, new_item)
+                changes.append(('update', new_item, old_item))
+            self.record(collection, changes)
+
+    def import_items(self, collection, file_name, item_class=None):
+        # Adds every item of a .csv or .jsonl file in one batch; rows without a
+        # 'class' column are read as `item_class`. Returns the items and, as
+        # add_items does, the ones that look like duplicates
+        items = read_items(file_name, item_class)
+        # Rows whose id is already taken (e.g. a re-import) are added as new items
+        seen = set()
+        for item in items:
+            if item.id in seen or self.collections[collection].has_id(item.id):
+                item.id = new_item_id()
+            seen.add(item.id)
+        duplicates = self.add_items(collection, items)
+        return items, duplicates
+
+    def export_items(self, collection, file_name):
+        write_items(file_name, self.collections[collection])
+
+    def close(self):
+        # Save pending edits, then let the storage finish up on a clean exit,
+        # e.g. fold journals into the JSON files
+        if self.writer is not None:
+            self.writer.close()
+        self.file_manager.close({collection: items for collection, items in self.collections.items()
+                                 if collection not in self.failed})
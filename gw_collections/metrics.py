@@ -0,0 +1,127 @@
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    __slots__ = ('metrics', 'name', 'category', 'args', 'start')
+
+    def __init__(self, metrics, name, category, args):
+        self.metrics = metrics
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.add_span(self.name, self.category, self.start, time.perf_counter() - self.start, self.args)
+        return False
+
+
+class Metrics:
+    # Spans (timed sections) and counters for the hot paths. While disabled,
+    # span() hands back a shared no-op and count() returns right away, so the
+    # instrumentation can stay in place in production.
+    def __init__(self, max_events=20000, recent=200):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+        self.events = deque(maxlen=max_events)  # (name, category, start, duration, thread id, args)
+        self.recent = defaultdict(lambda: deque(maxlen=recent))  # name -> recent durations
+        self.totals = defaultdict(lambda: [0, 0.0])  # name -> [count, seconds]
+        self.counters = Counter()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def span(self, name, category='app', **args):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, category, args or None)
+
+    def add_span(self, name, category, start, duration, args=None):
+        with self.lock:
+            self.events.append((name, category, start, duration, threading.get_ident(), args))
+            self.recent[name].append(duration)
+            total = self.totals[name]
+            total[0] += 1
+            total[1] += duration
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            with self.lock:
+                self.counters[name] += amount
+
+    def summary(self):
+        # {'spans': {name: {...ms}}, 'counters': {...}} over the recent window
+        with self.lock:
+            recent = {name: sorted(durations) for name, durations in self.recent.items()}
+            totals = {name: list(total) for name, total in self.totals.items()}
+            counters = dict(self.counters)
+        spans = {}
+        for name, durations in recent.items():
+            if not durations:
+                continue
+            spans[name] = {
+                'count': totals[name][0],
+                'total_ms': totals[name][1] * 1000,
+                'p50_ms': durations[len(durations) // 2] * 1000,
+                'p90_ms': durations[min(len(durations) - 1, len(durations) * 9 // 10)] * 1000,
+                'max_ms': durations[-1] * 1000,
+            }
+        return {'spans': spans, 'counters': counters}
+
+    def export_json(self, file_name):
+        with self.lock:
+            events = list(self.events)
+        data = dict(self.summary(), events=[
+            {'name': name, 'category': category, 'start_ms': (start - self.origin) * 1000,
+             'duration_ms': duration * 1000, 'thread': thread, 'args': args}
+            for name, category, start, duration, thread, args in events])
+        self.write(file_name, data)
+
+    def export_chrome_trace(self, file_name):
+        # Loadable in chrome://tracing or https://ui.perfetto.dev
+        with self.lock:
+            events = list(self.events)
+            counters = dict(self.counters)
+        pid = os.getpid()
+        trace = []
+        for name, category, start, duration, thread, args in events:
+            event = {'name': name, 'cat': category, 'ph': 'X', 'pid': pid, 'tid': thread,
+                     'ts': (start - self.origin) * 1e6, 'dur': duration * 1e6}
+            if args:
+                event['args'] = args
+            trace.append(event)
+        now = (time.perf_counter() - self.origin) * 1e6
+        for name, value in counters.items():
+            trace.append({'name': name, 'ph': 'C', 'pid': pid, 'tid': 0, 'ts': now, 'args': {name: value}})
+        self.write(file_name, {'traceEvents': trace, 'displayTimeUnit': 'ms'})
+
+    def write(self, file_name, data):
+        temp_name = file_name + '.tmp'
+        with open(temp_name, 'w') as f:
+            json.dump(data, f)
+        os.replace(temp_name, file_name)
+
+
+# The process-wide instance the hot paths report to
+METRICS = Metrics()
+span = METRICS.span
+count = METRICS.count
@@ -0,0 +1,105 @@
+import sys
+import uuid
+
+
+def new_item_id():
+    return uuid.uuid4().hex
+
+
+def intern_value(value):
+    # Genres, creators and platforms repeat across thousands of items, so
+    # share one string object per distinct value
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Item:
+    __slots__ = ('id', 'title', 'genre', 'description', 'image_url')
+    FIELDS = __slots__
+
+    def __init__(self, title, genre, description, image_url, item_id=None):
+        # The id stays with an item across edits and is saved with it
+        self.id = item_id or new_item_id()
+        self.title = title
+        self.genre = intern_value(genre)
+        self.description = description
+        self.image_url = image_url
+
+    def to_dict(self):
+        item_data = {name: getattr(self, name) for name in self.FIELDS}
+        item_data['class'] = self.__class__.__name__
+        return item_data
+
+
+class Movie(Item):
+    __slots__ = ('director', 'length')
+    FIELDS = Item.FIELDS + __slots__
+
+    def __init__(self, title, director, genre, length, description, image_url, item_id=None):
+        super().__init__(title, genre, description, image_url, item_id)
+        self.director = intern_value(director)
+        self.length = length
+
+
+class Game(Item):
+    __slots__ = ('developer', 'platform')
+    FIELDS = Item.FIELDS + __slots__
+
+    def __init__(self, title, developer, genre, platform, description, image_url, item_id=None):
+        super().__init__(title, genre, description, image_url, item_id)
+        self.developer = intern_value(developer)
+        self.platform = intern_value(platform)
+
+class Book(Item):
+    __slots__ = ('author', 'pages')
+    FIELDS = Item.FIELDS + __slots__
+
+    def __init__(self, title, author, genre, pages, description, image_url, item_id=None):
+        super().__init__(title, genre, description, image_url, item_id)
+        self.author = intern_value(author)
+        self.pages = pages
+
+
+ITEM_CLASSES = {'Movie': Movie, 'Game': Game, 'Book': Book}
+
+
+def item_creator(item):
+    # Director, developer or author depending on the kind of item
+    for name in ('director', 'developer', 'author'):
+        if hasattr(item, name):
+            return getattr(item, name)
+    return ''
+
+
+def item_from_dict(item_data):
+    item_class = ITEM_CLASSES.get(item_data.pop('class'))
+    item_id = item_data.pop('id', None)
+    if item_class == Movie:
+        item = item_class(item_data.pop('title'), item_data.pop('director'), item_data.pop('genre'),
+                          item_data.pop('length'), item_data.pop('description'), item_data.pop('image_url'), item_id)
+    elif item_class == Game:
+        item = item_class(item_data.pop('title'), item_data.pop('developer'), item_data.pop('genre'),
+                          item_data.pop('platform'), item_data.pop('description'), item_data.pop('image_url'), item_id)
+    elif item_class == Book:
+        item = item_class(item_data.pop('title'), item_data.pop('author'), item_data.pop('genre'),
+                          item_data.pop('pages'), item_data.pop('description'), item_data.pop('image_url'), item_id)
+    else:
+        return None
+
+    if 'image_url' in item_data:
+        item.image_url = item_data['image_url']
+
+    return item
+
+
+def validate_items(items):
+    # Checks a whole batch up front so nothing is applied if any item is bad
+    errors = []
+    for i, item in enumerate(items):
+        if not isinstance(item, Item):
+            errors.append(f"item {i}: expected a Movie, Game or Book, got {type(item).__name__}")
+        elif not isinstance(item.title, str):
+            errors.append(f"item {i}: title must be a string, got {type(item.title).__name__}")
+        elif not isinstance(item.id, str) or not item.id:
+            errors.append(f"item {i}: missing id")
+    if errors:
+        raise ValueError(f"{len(errors)} invalid items:\n" + "\n".join(errors))
@@ -0,0 +1,134 @@
+import threading
+import time
+
+from .metrics import count, span
+
+
+def merge_change(dirty, change):
+    # Folds one (op, item, old_item) change into `dirty` (item id -> change,
+    # in edit order), so an item edited many times is written once
+    op, item, old_item = change
+    item_id = (item or old_item).id
+    previous = dirty.get(item_id)
+    if previous is None:
+        dirty[item_id] = change
+        return
+    previous_op, _, previous_old_item = previous
+    if previous_op == 'add':
+        if op == 'remove':
+            del dirty[item_id]
+        else:
+            dirty[item_id] = ('add', item, None)
+    elif previous_op == 'update':
+        dirty[item_id] = (op, item, previous_old_item)
+    else:
+        # Removed and added back: the removal goes first under a key of its
+        # own, and the item is re-added at the end as it was in memory
+        del dirty[item_id]
+        dirty[object()] = previous
+        dirty[item_id] = change
+
+
+class WriteBehind:
+    # Records edits on a background thread. Changes wait in a per-collection
+    # dirty map until `delay` seconds pass without an edit, so a burst of edits
+    # costs one write; flush() is the durability barrier and close() writes
+    # whatever is left.
+    def __init__(self, storage, collections, delay=0.5):
+        self.storage = storage
+        self.collections = collections
+        self.delay = delay
+        # Held while the collections change and while a write copies them
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.writing = threading.Lock()
+        self.pending = {}  # collection -> {item id: (op, item, old_item)}
+        self.last_edit = 0.0
+        self.error = None  # the last failed write, kept for flush() and close()
+        self.retry_on_edit = False
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def record(self, collection, changes):
+        # Called with self.lock held, right after `changes` were applied
+        dirty = self.pending.setdefault(collection, {})
+        for change in changes:
+            merge_change(dirty, change)
+        count('edits queued', len(changes))
+        self.last_edit = time.monotonic()
+        self.retry_on_edit = False
+        self.changed.notify()
+
+    def run(self):
+        with self.lock:
+            while not self.closed:
+                if not any(self.pending.values()) or self.retry_on_edit:
+                    self.changed.wait()
+                    continue
+                wait = self.last_edit + self.delay - time.monotonic()
+                if wait > 0:
+                    self.changed.wait(wait)
+                    continue
+                self.lock.release()
+                try:
+                    self.write()
+                except Exception:
+                    pass  # kept in self.error; flush() and close() raise it
+                finally:
+                    self.lock.acquire()
+                # After a failed write, wait for the next edit before trying again
+                self.retry_on_edit = self.error is not None
+
+    def write(self, only=None):
+        # Writes every pending change, one batch per collection, or only the
+        # changes of the collection `only`
+        with self.writing:
+            with self.lock:
+                batches = []
+                for collection, dirty in self.pending.items():
+                    if not dirty or only not in (None, collection):
+                        continue
+                    items = self.collections[collection]
+                    changes = list(dirty.values())
+                    # Only a rewrite of the whole collection needs a copy that
+                    # holds still while the edits go on; a journal or database
+                    # write only reads the changes
+                    compact = self.storage.compacts(collection, len(items), changes)
+                    batches.append((collection, items.copy() if compact else items, changes, compact))
+                for collection, _, _, _ in batches:
+                    del self.pending[collection]
+            for i, (collection, items, changes, compact) in enumerate(batches):
+                try:
+                    with span('write behind', 'storage', collection=collection, changes=len(changes)):
+                        self.storage.record_batch(collection, items, changes, compact)
+                except Exception as e:
+                    with self.lock:
+                        self.requeue(batches[i:])
+                        self.error = e
+                    raise
+                count('batches written')
+            if only is None:
+                self.error = None
+
+    def requeue(self, batches):
+        # Puts the changes of a failed write back ahead of newer edits
+        for collection, _, changes, _ in batches:
+            dirty = {}
+            for change in changes:
+                merge_change(dirty, change)
+            for change in self.pending.get(collection, {}).values():
+                merge_change(dirty, change)
+            self.pending[collection] = dirty
+
+    def flush(self, collection=None):
+        # Returns once every edit made so far, or every edit of `collection`,
+        # is saved; raises if writing fails
+        self.write(collection)
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.changed.notify()
+        self.thread.join()
+        self.write()
@@ -0,0 +1,232 @@
+import bisect
+import re
+from collections import defaultdict
+
+from .models import item_creator
+
+FACET_FIELDS = ('genre', 'creator', 'platform', 'length', 'pages')
+DURATION_PATTERN = re.compile(r'(\d+):(\d{1,2})')
+
+
+def field_value(item, field):
+    if field == 'creator':
+        return item_creator(item)
+    return getattr(item, field, None)
+
+
+def facet_value(value):
+    return str(value).strip()
+
+
+def sort_key(value):
+    # Numbers and h:mm lengths sort by value, everything else alphabetically
+    text = str(value).strip().lower()
+    try:
+        return (0, float(text), text)
+    except ValueError:
+        pass
+    match = DURATION_PATTERN.fullmatch(text)
+    if match:
+        return (0, int(match.group(1)) * 60 + int(match.group(2)), text)
+    return (1, 0, text)
+
+
+def sort_items(items, sort, descending=False):
+    # Orders already matched items (e.g. search results) by the fields in
+    # `sort`, as a sorted index would, without building one
+    fields = tuple(sort)
+    return sorted(items, key=lambda item: tuple(sort_key(field_value(item, field)) for field in fields),
+                  reverse=descending)
+
+
+class QueryResult:
+    # The items of a query in order; only the rows that are asked for are
+    # looked up, so a list view can page through it cheaply
+    def __init__(self, items, ids=None, index=None, descending=False, within=None):
+        self.items = items
+        self.ids = ids  # ordered ids, or None to page straight through a sorted index
+        self.index = index
+        self.descending = descending
+        # With `within`, only those ids of the index; it is walked as far as
+        # the rows asked for, the ids found so far kept in order
+        self.within = within
+        self.found = []
+        self.walked = 0
+
+    def __len__(self):
+        if self.ids is not None:
+            return len(self.ids)
+        return len(self.within) if self.within is not None else len(self.index)
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self.item_at(position)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self.item_at(i) for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("query result index out of range")
+        return self.item_at(position)
+
+    def item_at(self, position):
+        return self.items.get(self.id_at(position))
+
+    def id_at(self, position):
+        if self.ids is not None:
+            return self.ids[position]
+        if self.within is not None:
+            index = self.index
+            while len(self.found) <= position:
+                _, item_id = index[-1 - self.walked] if self.descending else index[self.walked]
+                self.walked += 1
+                if item_id in self.within:
+                    self.found.append(item_id)
+            return self.found[position]
+        if self.descending:
+            position = len(self.index) - 1 - position
+        return self.index[position][1]
+
+    def index_of(self, item_id):
+        # Row of an item, or None if it isn't in the result
+        if self.ids is not None:
+            try:
+                return self.ids.index(item_id)
+            except ValueError:
+                return None
+        if self.within is not None:
+            if item_id not in self.within:
+                return None
+            if item_id in self.found:
+                return self.found.index(item_id)
+            while self.id_at(len(self.found)) != item_id:
+                pass
+            return len(self.found) - 1
+        for position, (_, candidate) in enumerate(self.index):
+            if candidate == item_id:
+                return len(self.index) - 1 - position if self.descending else position
+        return None
+
+
+class QueryEngine:
+    # Facet postings and sorted indexes for one collection. Both are kept up
+    # to date on every add/update/remove, so filtering, sorting and facet
+    # counts never rescan the collection. A sorted index is built the first
+    # time its sort order is asked for.
+    def __init__(self, items):
+        self.items = items
+        self.facets = {field: defaultdict(set) for field in FACET_FIELDS}  # field -> value -> ids
+        self.sorted = {}  # tuple of fields -> sorted list of (key, id)
+        self.count_cache = {}
+        for item_id, values in self.field_rows(FACET_FIELDS):
+            for field, value in zip(FACET_FIELDS, values):
+                if value is not None:
+                    self.facets[field][facet_value(value)].add(item_id)
+
+    def field_rows(self, fields):
+        # (id, [value of each field]) for every item; a paged collection reads
+        # them from its columns instead of building every item
+        if hasattr(self.items, 'field_rows'):
+            return self.items.field_rows(fields)
+        return ((item.id, [field_value(item, field) for field in fields]) for item in self.items)
+
+    def sort_key(self, item, fields):
+        return tuple(sort_key(field_value(item, field)) for field in fields)
+
+    def add(self, item):
+        for field in FACET_FIELDS:
+            value = field_value(item, field)
+            if value is not None:
+                self.facets[field][facet_value(value)].add(item.id)
+        for fields, index in self.sorted.items():
+            bisect.insort(index, (self.sort_key(item, fields), item.id))
+        self.count_cache.clear()
+
+    def remove(self, item):
+        for field in FACET_FIELDS:
+            value = field_value(item, field)
+            if value is None:
+                continue
+            postings = self.facets[field]
+            ids = postings.get(facet_value(value))
+            if ids is not None:
+                ids.discard(item.id)
+                if not ids:
+                    del postings[facet_value(value)]
+        for fields, index in self.sorted.items():
+            entry = (self.sort_key(item, fields), item.id)
+            position = bisect.bisect_left(index, entry)
+            if position < len(index) and index[position] == entry:
+                del index[position]
+        self.count_cache.clear()
+
+    def sorted_index(self, fields):
+        index = self.sorted.get(fields)
+        if index is None:
+            index = sorted((tuple(map(sort_key, values)), item_id) for item_id, values in self.field_rows(fields))
+            self.sorted[fields] = index
+        return index
+
+    def filter_ids(self, filters):
+        # `filters` maps a facet field to a value or a list of values: values
+        # of one field are OR-ed, fields are AND-ed. None means no filtering.
+        result = None
+        for field, values in filters.items():
+            if isinstance(values, (str, int, float)):
+                values = [values]
+            postings = self.facets[field]
+            matched = set()
+            for value in values:
+                matched |= postings.get(facet_value(value), set())
+            result = matched if result is None else result & matched
+            if not result:
+                break
+        return result
+
+    def query(self, filters=None, sort=('title',), descending=False):
+        ids = self.filter_ids(filters) if filters else None
+        if not sort:
+            if ids is None:
+                return self.items
+            # Keep collection order: look up the rows of a few matches, walk
+            # the collection for many
+            if len(ids) * 8 < len(self.items):
+                ordered = sorted(ids, key=self.items.index_of)
+            else:
+                ordered = [item_id for item_id in self.items.ids() if item_id in ids]
+            return QueryResult(self.items, ids=ordered[::-1] if descending else ordered)
+
+        fields = tuple(sort)
+        if ids is None:
+            return QueryResult(self.items, index=self.sorted_index(fields), descending=descending)
+        if fields not in self.sorted and len(ids) * 8 < len(self.items):
+            # A narrow filter: sorting the matches beats building an index
+            ordered = [item_id for _, item_id in sorted(
+                (self.sort_key(self.items.get(item_id), fields), item_id) for item_id in ids)]
+            return QueryResult(self.items, ids=ordered[::-1] if descending else ordered)
+        # A copy, so later edits don't shift the part not walked yet
+        return QueryResult(self.items, index=list(self.sorted_index(fields)), descending=descending, within=ids)
+
+    def filter_items(self, items, filters):
+        # Narrow an already ordered list (e.g. ranked search results)
+        ids = self.filter_ids(filters)
+        return [item for item in items if item.id in ids]
+
+    def facet_counts(self, field, filters=None):
+        # [(value, count)] for `field`, most common first, counted under the
+        # filters on the other fields so the alternatives stay visible
+        others = {name: values for name, values in (filters or {}).items() if name != field}
+        cache_key = (field, repr(sorted(others.items())))
+        counts = self.count_cache.get(cache_key)
+        if counts is None:
+            if not others:
+                counts = {value: len(ids) for value, ids in self.facets[field].items()}
+            else:
+                matched = self.filter_ids(others)
+                counts = {value: len(ids & matched) for value, ids in self.facets[field].items()}
+                counts = {value: count for value, count in counts.items() if count}
+            counts = sorted(counts.items(), key=lambda entry: (-entry[1], entry[0]))
+            self.count_cache[cache_key] = counts
+        return counts
@@ -0,0 +1,391 @@
+import bisect
+import heapq
+import itertools
+import math
+import re
+import sys
+from collections import Counter, defaultdict
+
+from .collection import ItemCollection
+from .models import item_creator
+
+TOKEN_PATTERN = re.compile(r'\w+')
+FIELDS = ('title', 'creator', 'genre', 'description')
+WEIGHTS = (8, 4, 2, 1)
+EMPTY = frozenset()
+
+
+def intersect(sets):
+    sets = sorted(sets, key=len)
+    if not sets:
+        return set()
+    result = set(sets[0])
+    for other in sets[1:]:
+        if not result:
+            break
+        result &= other
+    return result
+
+
+def text_grams(text):
+    if len(text) >= 3:
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+    return {text} if text else set()
+
+
+class SearchResult:
+    # The matches of a search, best first, as a few segments: ids ranked one
+    # by one, then sets of equally scored ids. A set is put in title order
+    # the first time a row in it is asked for, so a list view showing the top
+    # of a large result never pays for ordering all of it.
+    def __init__(self, items, segments=(), title=None):
+        self.items = items
+        self.segments = [segment for segment in segments if segment]
+        self.title = title  # id -> lowercased title
+        self.length = sum(map(len, self.segments))
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        for position in range(self.length):
+            yield self.item_at(position)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self.item_at(i) for i in range(*position.indices(self.length))]
+        if position < 0:
+            position += self.length
+        if not 0 <= position < self.length:
+            raise IndexError("search result index out of range")
+        return self.item_at(position)
+
+    def item_at(self, position):
+        return self.items.get(self.id_at(position))
+
+    def id_at(self, position):
+        for i, segment in enumerate(self.segments):
+            if position < len(segment):
+                return self.ordered(i)[position]
+            position -= len(segment)
+        raise IndexError("search result index out of range")
+
+    def ordered(self, i):
+        segment = self.segments[i]
+        if not isinstance(segment, list):
+            segment = self.segments[i] = sorted(segment, key=lambda item_id: (self.title(item_id), item_id))
+        return segment
+
+    def index_of(self, item_id):
+        # Row of an item, or None if it isn't among the matches
+        offset = 0
+        for i, segment in enumerate(self.segments):
+            if item_id in segment:
+                return offset + self.ordered(i).index(item_id)
+            offset += len(segment)
+        return None
+
+    def within(self, ids):
+        # The matches that are also in `ids`, in the same order
+        segments = [[item_id for item_id in segment if item_id in ids] if isinstance(segment, list) else segment & ids
+                    for segment in self.segments]
+        return SearchResult(self.items, segments, self.title)
+
+    def ids(self):
+        return set().union(*self.segments)
+
+    def extend(self, items):
+        # Appends items after the matches, e.g. near misses
+        ids = [item.id for item in items]
+        if ids:
+            self.segments.append(ids)
+            self.length += len(ids)
+
+
+class SearchIndex:
+    # Inverted indexes over title, creator, genre and description, kept per
+    # field so a search only ranks what it has to:
+    # - titles are matched by substring through a trigram index and by word;
+    #   only items whose title matches are scored one by one
+    # - creators and genres repeat, so their distinct values are indexed by
+    #   trigram and word, and the items of a matching value are scored as a
+    #   group through its postings
+    # - descriptions are matched by word, the query's last word also as a
+    #   prefix, and rank last
+    # Groups of equally scored items are ordered by title only when shown.
+    # Queries of one or two characters look up title and title word
+    # prefixes. The postings hold ids, so the index doesn't keep a paged
+    # collection's items in memory.
+    FIELD_WEIGHTS = dict(zip(FIELDS, WEIGHTS))
+
+    def __init__(self, items=None):
+        self.items = items if items is not None else ItemCollection()
+        self.texts = {}  # id -> (title, creator, genre), lowercased
+        self.grams = defaultdict(set)  # title trigram -> ids
+        self.words = [defaultdict(set) for _ in FIELDS]  # per field: word -> ids, only kept for titles and descriptions
+        self.values = [defaultdict(set) for _ in FIELDS]  # per field: value -> ids, only kept for creators and genres
+        self.value_grams = [defaultdict(set) for _ in FIELDS]  # per field: trigram -> values
+        self.value_words = [defaultdict(set) for _ in FIELDS]  # per field: word -> values
+        self.vocabularies = [None for _ in FIELDS]  # sorted words of a field, for prefix lookups
+        self.titles = None  # sorted (title, id), built for the first short query
+        # A paged collection hands over its columns instead of items
+        if hasattr(self.items, 'field_rows'):
+            rows = self.items.field_rows(FIELDS)
+        else:
+            rows = ((item.id, [item.title, item_creator(item), item.genre, item.description]) for item in self.items)
+        for item_id, values in rows:
+            self.add_values(item_id, values)
+
+    def add(self, item):
+        self.add_values(item.id, [item.title, item_creator(item), item.genre, item.description])
+
+    def add_values(self, item_id, values):
+        title, creator, genre, description = ['' if value is None else str(value).lower() for value in values]
+        creator = sys.intern(creator)
+        genre = sys.intern(genre)
+        self.texts[item_id] = (title, creator, genre)
+        grams = self.grams
+        for gram in text_grams(title):
+            grams[gram].add(item_id)
+        for field, text in ((0, title), (3, description)):
+            words = self.words[field]
+            for word in set(TOKEN_PATTERN.findall(text)):
+                words[word].add(item_id)
+            vocabulary = self.vocabularies[field]
+            if vocabulary is not None and len(vocabulary) != len(words):
+                self.vocabularies[field] = None
+        for field, text in ((1, creator), (2, genre)):
+            ids = self.values[field].get(text)
+            if ids is None:
+                ids = self.values[field][text] = set()
+                for gram in text_grams(text):
+                    self.value_grams[field][gram].add(text)
+                for word in set(TOKEN_PATTERN.findall(text)):
+                    self.value_words[field][word].add(text)
+            ids.add(item_id)
+        if self.titles is not None:
+            bisect.insort(self.titles, (title, item_id))
+
+    def remove(self, item):
+        texts = self.texts.pop(item.id, None)
+        if texts is None:
+            return
+        title, creator, genre = texts
+        for gram in text_grams(title):
+            self.discard(self.grams, gram, item.id)
+        description = '' if item.description is None else str(item.description).lower()
+        for field, text in ((0, title), (3, description)):
+            for word in set(TOKEN_PATTERN.findall(text)):
+                self.discard(self.words[field], word, item.id)
+            vocabulary = self.vocabularies[field]
+            if vocabulary is not None and len(vocabulary) != len(self.words[field]):
+                self.vocabularies[field] = None
+        for field, text in ((1, creator), (2, genre)):
+            self.discard(self.values[field], text, item.id)
+            if text not in self.values[field]:
+                for gram in text_grams(text):
+                    self.discard(self.value_grams[field], gram, text)
+                for word in set(TOKEN_PATTERN.findall(text)):
+                    self.discard(self.value_words[field], word, text)
+        if self.titles is not None:
+            position = bisect.bisect_left(self.titles, (title, item.id))
+            if position < len(self.titles) and self.titles[position] == (title, item.id):
+                del self.titles[position]
+
+    def discard(self, index, key, item_id):
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(item_id)
+            if not ids:
+                del index[key]
+
+    def title(self, item_id):
+        texts = self.texts.get(item_id)
+        return texts[0] if texts is not None else ''
+
+    def search(self, term):
+        query = term.lower().strip()
+        if len(query) < 3:
+            return self.title_prefix(query)
+        tokens = TOKEN_PATTERN.findall(query)
+        query_grams = text_grams(query)
+
+        # Creator and genre values holding the query or any of its words,
+        # with the score each gives its items
+        value_scores = [{} for _ in FIELDS]
+        with_query = set()  # ids of items whose creator or genre holds the query
+        with_token = [set() for _ in tokens]  # per word, ids of items whose creator or genre holds it
+        for field in (1, 2):
+            weight = WEIGHTS[field]
+            values = self.values[field]
+            scores = value_scores[field]
+            for value in intersect([self.value_grams[field].get(gram, EMPTY) for gram in query_grams]):
+                if query in value:
+                    scores[value] = weight * (4 if value == query else 3 if value.startswith(query) else 2)
+                    with_query |= values[value]
+            for i, token in enumerate(tokens):
+                for value in self.value_words[field].get(token, EMPTY):
+                    scores[value] = scores.get(value, 0) + weight
+                    with_token[i] |= values[value]
+
+        # Items holding every word of the query in some field
+        title_words = [self.words[0].get(token, EMPTY) for token in tokens]
+        description_words = [self.words[3].get(token, EMPTY) for token in tokens]
+        word_sets = [title_ids | description_ids | value_ids
+                     for title_ids, description_ids, value_ids in zip(title_words, description_words, with_token)]
+        if tokens and len(tokens[-1]) >= 3:
+            word_sets[-1] |= self.prefix_ids(3, tokens[-1])
+        word_matches = intersect(word_sets)
+
+        # Items whose title matches are scored one by one
+        candidates = intersect([self.grams.get(gram, EMPTY) for gram in query_grams])
+        candidates |= word_matches & set().union(*title_words)
+        texts = self.texts
+        creator_scores, genre_scores = value_scores[1], value_scores[2]
+        scored = []
+        for item_id in candidates:
+            title, creator, genre = texts[item_id]
+            score = 0
+            if query in title:
+                score += 32 if title == query else 24 if title.startswith(query) else 16
+            for ids in title_words:
+                if item_id in ids:
+                    score += 8
+            if not score:
+                continue
+            score += creator_scores.get(creator, 0) + genre_scores.get(genre, 0)
+            for ids in description_words:
+                if item_id in ids:
+                    score += 1
+            scored.append((-score, title, item_id))
+        scored.sort()
+        ranked = [item_id for _, _, item_id in scored]
+        seen = set(ranked)
+
+        # Then the items of matching creators and genres, grouped by score
+        grouped = (with_query | (word_matches & set().union(*with_token))) - seen
+        groups = defaultdict(set)
+        if grouped:
+            creator_groups = self.score_groups(value_scores[1], self.values[1], grouped)
+            genre_groups = self.score_groups(value_scores[2], self.values[2], grouped)
+            for creator_score, creator_ids in creator_groups.items():
+                for genre_score, genre_ids in genre_groups.items():
+                    groups[creator_score + genre_score] |= creator_ids & genre_ids
+            in_creator_groups = set().union(*creator_groups.values())
+            in_genre_groups = set().union(*genre_groups.values())
+            for creator_score, creator_ids in creator_groups.items():
+                groups[creator_score] |= creator_ids - in_genre_groups
+            for genre_score, genre_ids in genre_groups.items():
+                groups[genre_score] |= genre_ids - in_creator_groups
+        segments = [ranked] + [groups[score] for score in sorted(groups, reverse=True)]
+        # And last the items that only match in their description
+        segments.append(word_matches - seen - grouped)
+        return SearchResult(self.items, segments, self.title)
+
+    def score_groups(self, scores, values, within):
+        # score -> ids among `within` of the values that have that score
+        groups = defaultdict(set)
+        for value, score in scores.items():
+            groups[score] |= values[value] & within
+        return groups
+
+    def prefix_ids(self, field, prefix):
+        # Ids of items with a word in `field` starting with `prefix`
+        words = self.words[field]
+        vocabulary = self.vocabularies[field]
+        if vocabulary is None:
+            vocabulary = self.vocabularies[field] = sorted(words)
+        start = bisect.bisect_left(vocabulary, prefix)
+        end = bisect.bisect_left(vocabulary, prefix + chr(sys.maxunicode))
+        return set().union(*(words.get(word, EMPTY) for word in vocabulary[start:end]))
+
+    def title_prefix(self, query):
+        # Titles starting with a one or two character query, in title order,
+        # then titles with a word starting with it
+        if not query:
+            return SearchResult(self.items)
+        if self.titles is None:
+            self.titles = sorted((texts[0], item_id) for item_id, texts in self.texts.items())
+        start = bisect.bisect_left(self.titles, (query,))
+        end = bisect.bisect_left(self.titles, (query + chr(sys.maxunicode),))
+        ranked = [item_id for _, item_id in self.titles[start:end]]
+        return SearchResult(self.items, [ranked, self.prefix_ids(0, query).difference(ranked)], self.title)
+
+
+def title_grams(title):
+    # Trigrams of a title padded with spaces, so word starts and ends count too
+    text = ' ' + ' '.join(str(title).lower().split()) + ' '
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class FuzzyIndex:
+    # Typo-tolerant title search ("harry poter" finds "Harry Potter"). A title
+    # matches when it holds at least `threshold` of the query's trigrams, so
+    # it must contain one of the query's rarest trigrams (prefix filtering);
+    # only those postings are walked, and for at most `max_candidates`
+    # titles. Matches are ranked by that share, then by Jaccard similarity so
+    # titles closest in length come first.
+    def __init__(self, items=None, threshold=0.5, max_candidates=20000):
+        self.items = items if items is not None else ItemCollection()
+        self.threshold = threshold
+        self.max_candidates = max_candidates
+        self.grams = defaultdict(set)  # trigram -> ids
+        self.sizes = {}  # id -> number of trigrams in its title
+        # A paged collection hands over its title column instead of items
+        if hasattr(self.items, 'field_rows'):
+            rows = self.items.field_rows(('title',))
+        else:
+            rows = ((item.id, [item.title]) for item in self.items)
+        for item_id, (title,) in rows:
+            self.add_title(item_id, title)
+
+    def add_title(self, item_id, title):
+        grams = title_grams(title)
+        for gram in grams:
+            self.grams[gram].add(item_id)
+        self.sizes[item_id] = len(grams)
+
+    def add(self, item):
+        self.add_title(item.id, item.title)
+
+    def remove(self, item):
+        for gram in title_grams(item.title):
+            ids = self.grams.get(gram)
+            if ids is not None:
+                ids.discard(item.id)
+                if not ids:
+                    del self.grams[gram]
+        self.sizes.pop(item.id, None)
+
+    def search(self, term, limit=50):
+        query = title_grams(term)
+        if not query:
+            return []
+        min_overlap = max(1, math.ceil(self.threshold * len(query)))
+        postings = sorted((self.grams.get(gram, set()) for gram in query), key=len)
+        prefix_length = len(query) - min_overlap + 1
+        counts = Counter()
+        for ids in postings[:prefix_length]:
+            if not counts:
+                counts.update(itertools.islice(ids, self.max_candidates))
+            elif len(counts) + len(ids) <= self.max_candidates:
+                counts.update(ids)
+            else:
+                # Too common to add candidates from; only count it for the ones we have
+                for item_id in counts:
+                    if item_id in ids:
+                        counts[item_id] += 1
+        scored = []
+        for item_id, overlap in counts.items():
+            size = self.sizes.get(item_id, 0)
+            if size < min_overlap:
+                continue
+            overlap += sum(1 for ids in postings[prefix_length:] if item_id in ids)
+            if overlap >= min_overlap:
+                scored.append((overlap, overlap / (len(query) + size - overlap), item_id))
+        results = []
+        for _, _, item_id in heapq.nlargest(limit, scored):
+            item = self.items.get(item_id)
+            if item is not None:
+                results.append(item)
+        return results
@@ -0,0 +1,475 @@
+import asyncio
+import itertools
+import json
+import os
+import queue
+import re
+import signal
+import socket
+import stat
+import threading
+
+from .metrics import count, span
+from .models import item_from_dict
+from .storage import StorageBackend
+
+# Requests and replies are JSON Lines: one object per line, each request
+# carrying an 'op' and an 'id' its reply echoes. Bulk requests can be large
+LINE_LIMIT = 1 << 26
+# A subscriber that stops reading is dropped once this much is waiting for it
+EVENT_BACKLOG = 1 << 24
+TCP_ADDRESS = re.compile(r'([\w.-]*):(\d+)')
+
+
+def parse_address(address):
+    # 'HOST:PORT' or ':PORT' is a TCP port, on this machine unless a host is
+    # given; anything else is the path of a Unix socket
+    match = TCP_ADDRESS.fullmatch(address)
+    if match:
+        return match.group(1) or '127.0.0.1', int(match.group(2))
+    return address
+
+
+class ConflictError(ValueError):
+    # An edit was refused because the item changed or went away since the
+    # client last saw it
+    pass
+
+
+def item_from_data(item_data):
+    item = item_from_dict(dict(item_data))
+    if item is None:
+        raise ValueError(f"Unknown item class {item_data.get('class')!r}")
+    return item
+
+
+def edit_data(op, item, old_item):
+    # One (op, item, old_item) change as sent to the service; the old item is
+    # the version the edit was made from
+    if op == 'add':
+        return item.to_dict()
+    if op == 'update':
+        return {'item': item.to_dict(), 'old': old_item.to_dict()}
+    return {'id': old_item.id, 'old': old_item.to_dict()}
+
+
+class CollectionService:
+    # Serves a CollectionManager to any number of clients over a Unix socket
+    # or a localhost TCP port. Requests are handled one at a time on the event
+    # loop, so each edit sees every edit before it, and an edit that names the
+    # version of the item it replaces is refused if that is not the saved one
+    # any more, so no client overwrites another's change unseen. With a
+    # write-behind manager, the edits of all clients are saved together.
+    # Subscribed clients get an {'event': 'changed'} line for every edit made
+    # by another client.
+    def __init__(self, manager):
+        self.manager = manager
+        self.subscribers = {}  # stream writer -> subscribed collections, None for all
+        self.server = None
+        self.handlers = {
+            'collections': self.collections, 'ids': self.ids, 'get': self.get, 'search': self.search,
+            'facets': self.facets, 'add': self.edit, 'update': self.edit, 'remove': self.edit,
+            'bulk': self.bulk, 'subscribe': self.subscribe, 'flush': self.flush,
+        }
+
+    async def start(self, address):
+        address = parse_address(address)
+        if isinstance(address, tuple):
+            self.server = await asyncio.start_server(self.handle, *address, limit=LINE_LIMIT)
+        else:
+            # A socket left behind by a service that didn't shut down cleanly
+            if os.path.exists(address) and stat.S_ISSOCK(os.stat(address).st_mode):
+                os.unlink(address)
+            self.server = await asyncio.start_unix_server(self.handle, address, limit=LINE_LIMIT)
+        return self.server
+
+    async def serve(self, address):
+        server = await self.start(address)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if not isinstance(parse_address(address), tuple) and os.path.exists(address):
+                os.unlink(address)
+
+    async def handle(self, reader, writer):
+        count('clients connected')
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                writer.write(self.respond(line, writer))
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass  # disconnected, or sent a line over LINE_LIMIT
+        finally:
+            self.subscribers.pop(writer, None)
+            writer.close()
+
+    def respond(self, line, origin):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.pop('id', None)
+            op = request.pop('op', None)
+            handler = self.handlers.get(op)
+            if handler is None:
+                raise ValueError(f"Unknown operation {op!r}")
+            with span('service request', 'service', op=op):
+                reply = {'id': request_id, 'result': handler(origin, op, **request)}
+            count('service requests')
+        except ConflictError as e:
+            reply = {'id': request_id, 'error': str(e), 'conflict': True}
+        except ValueError as e:
+            reply = {'id': request_id, 'error': str(e)}
+        except Exception as e:
+            reply = {'id': request_id, 'error': f"{type(e).__name__}: {e}"}
+        return (json.dumps(reply) + '\n').encode('utf-8')
+
+    def check_collection(self, collection):
+        if collection not in self.manager.collections:
+            raise ValueError(f"No collection named {collection!r}")
+
+    def collections(self, origin, op):
+        return {collection: len(items) for collection, items in self.manager.collections.items()}
+
+    def ids(self, origin, op, collection):
+        self.check_collection(collection)
+        return [item.id for item in self.manager.collections[collection]]
+
+    def get(self, origin, op, collection, ids):
+        # Items by id, None for those that are gone
+        self.check_collection(collection)
+        items = [self.manager.get_item(collection, item_id) for item_id in ids]
+        return [item.to_dict() if item is not None else None for item in items]
+
+    def search(self, origin, op, collection, term='', filters=None, sort=None, descending=False,
+               fuzzy=False, offset=0, limit=100):
+        # A page of CollectionManager.browse() results and how many there are
+        self.check_collection(collection)
+        results = self.manager.browse(collection, term, filters, sort, descending, fuzzy=fuzzy)
+        return {'total': len(results), 'items': [item.to_dict() for item in results[offset:offset + limit]]}
+
+    def facets(self, origin, op, collection, field, filters=None):
+        self.check_collection(collection)
+        return self.manager.facet_counts(collection, field, filters)
+
+    def edit(self, origin, op, collection, items):
+        changes = {}
+        result = self.apply(op, collection, items, [], changes)
+        self.notify(origin, changes)
+        return result
+
+    def bulk(self, origin, op, operations):
+        # Edits of one or more collections, applied entirely or not at all: a
+        # failed one undoes those before it
+        undo = []
+        changes = {}
+        try:
+            results = [self.apply(operation['op'], operation['collection'], operation['items'], undo, changes)
+                       for operation in operations]
+        except Exception:
+            for undo_edit in reversed(undo):
+                undo_edit()
+            raise
+        self.notify(origin, changes)
+        return results
+
+    def current(self, collection, item_id, old_item_data):
+        # The saved item an edit applies to, if it is the version the edit was made from
+        item = self.manager.get_item(collection, item_id)
+        if old_item_data is None:
+            if item is None:
+                raise ValueError(f"No item {item_id} in {collection}")
+        elif item is None:
+            raise ConflictError(f"{old_item_data.get('title')!r} was removed by someone else")
+        elif item.to_dict() != old_item_data:
+            raise ConflictError(f"{old_item_data.get('title')!r} was changed by someone else")
+        return item
+
+    def apply(self, op, collection, items, undo, changes):
+        manager = self.manager
+        self.check_collection(collection)
+        if op == 'add':
+            added = [item_from_data(item_data) for item_data in items]
+            manager.add_items(collection, added)
+            undo.append(lambda: manager.remove_items(collection, added))
+            edited = [('add', item) for item in added]
+            result = [item.id for item in added]
+        elif op == 'update':
+            replacements = []
+            for edit in items:
+                item = item_from_data(edit['item'])
+                replacements.append((self.current(collection, item.id, edit.get('old')), item))
+            manager.update_items(collection, replacements)
+            undo.append(lambda: manager.update_items(collection, [(new, old) for old, new in replacements]))
+            edited = [('update', item) for _, item in replacements]
+            result = len(replacements)
+        elif op == 'remove':
+            removed = {}
+            for edit in items:
+                removed[edit['id']] = self.current(collection, edit['id'], edit.get('old'))
+            removed = list(removed.values())
+            manager.remove_items(collection, removed)
+            undo.append(lambda: manager.add_items(collection, removed))
+            edited = [('remove', item) for item in removed]
+            result = len(removed)
+        else:
+            raise ValueError(f"Unknown edit {op!r}")
+        changes.setdefault(collection, []).extend(edited)
+        return result
+
+    def notify(self, origin, changes):
+        for writer, collections in list(self.subscribers.items()):
+            if writer is origin:
+                continue
+            if writer.transport.get_write_buffer_size() > EVENT_BACKLOG:
+                count('subscribers dropped')
+                self.subscribers.pop(writer)
+                writer.close()
+                continue
+            for collection, edited in changes.items():
+                if collections is None or collection in collections:
+                    event = {'event': 'changed', 'collection': collection,
+                             'changes': [{'op': op, 'item': item.to_dict()} for op, item in edited]}
+                    writer.write((json.dumps(event) + '\n').encode('utf-8'))
+
+    def subscribe(self, origin, op, collections=None):
+        if collections is not None:
+            for collection in collections:
+                self.check_collection(collection)
+            collections = set(collections)
+        self.subscribers[origin] = collections
+
+    def flush(self, origin, op):
+        # Returns once every edit so far is saved
+        self.manager.flush()
+
+
+def serve(manager, address):
+    # Runs a CollectionService until interrupted or terminated, then returns
+    # so the caller can save and close the manager
+    async def run():
+        task = asyncio.current_task()
+        loop = asyncio.get_running_loop()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signal_number, task.cancel)
+            except (NotImplementedError, RuntimeError):
+                pass  # no signal handlers on Windows; Ctrl-C still raises KeyboardInterrupt
+        try:
+            await CollectionService(manager).serve(address)
+        except asyncio.CancelledError:
+            pass
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+class ServiceClient:
+    # A blocking client of a CollectionService that threads can share. A
+    # reader thread matches replies to requests and hands change events to
+    # `on_event`. Failed requests raise ValueError, ConflictError for an edit
+    # made from an out of date item, and ConnectionError once the service is gone.
+    def __init__(self, address, on_event=None, timeout=60):
+        address = parse_address(address)
+        if isinstance(address, tuple):
+            self.socket = socket.create_connection(address)
+        else:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.connect(address)
+        self.reader = self.socket.makefile('rb')
+        self.on_event = on_event
+        self.timeout = timeout
+        self.request_ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.replies = {}  # request id -> [threading.Event, reply]
+        self.error = None  # why the connection ended
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        try:
+            for line in self.reader:
+                message = json.loads(line)
+                if 'event' in message:
+                    if self.on_event is not None:
+                        self.on_event(message)
+                    continue
+                with self.lock:
+                    waiter = self.replies.get(message['id'])
+                if waiter is not None:
+                    waiter[1] = message
+                    waiter[0].set()
+        except (OSError, ValueError) as e:
+            self.error = e
+        finally:
+            with self.lock:
+                self.error = ConnectionError(f"Lost the collection service: {self.error or 'connection closed'}")
+                for waiter in self.replies.values():
+                    waiter[0].set()
+
+    def request(self, op, **params):
+        request_id = next(self.request_ids)
+        waiter = [threading.Event(), None]
+        data = (json.dumps(dict(params, op=op, id=request_id)) + '\n').encode('utf-8')
+        with self.lock:
+            if self.error is not None:
+                raise self.error
+            self.replies[request_id] = waiter
+            try:
+                self.socket.sendall(data)
+            except OSError:
+                del self.replies[request_id]
+                raise
+        try:
+            if not waiter[0].wait(self.timeout):
+                raise TimeoutError(f"The collection service didn't answer {op!r} in {self.timeout}s")
+        finally:
+            with self.lock:
+                self.replies.pop(request_id, None)
+        reply = waiter[1]
+        if reply is None:
+            raise self.error
+        if 'error' in reply:
+            raise (ConflictError if reply.get('conflict') else ValueError)(reply['error'])
+        return reply['result']
+
+    def collections(self):
+        # collection -> number of items
+        return self.request('collections')
+
+    def ids(self, collection):
+        return self.request('ids', collection=collection)
+
+    def get_items(self, collection, ids):
+        return [item_from_data(item_data) if item_data is not None else None
+                for item_data in self.request('get', collection=collection, ids=list(ids))]
+
+    def get_item(self, collection, item_id):
+        return self.get_items(collection, [item_id])[0]
+
+    def search(self, collection, term='', filters=None, sort=None, descending=False, fuzzy=False,
+               offset=0, limit=100):
+        # (number of matches, items offset..offset + limit), as CollectionManager.browse() orders them
+        result = self.request('search', collection=collection, term=term, filters=filters, sort=sort,
+                              descending=descending, fuzzy=fuzzy, offset=offset, limit=limit)
+        return result['total'], [item_from_data(item_data) for item_data in result['items']]
+
+    def facet_counts(self, collection, field, filters=None):
+        return [tuple(entry) for entry in self.request('facets', collection=collection, field=field,
+                                                       filters=filters)]
+
+    def add_items(self, collection, items):
+        return self.bulk([('add', collection, items)])[0]
+
+    def add_item(self, collection, item):
+        self.add_items(collection, [item])
+
+    def update_items(self, collection, replacements):
+        # (old_item, new_item) pairs; the new item takes over the old one's id
+        return self.bulk([('update', collection, replacements)])[0]
+
+    def update_item(self, collection, old_item, new_item):
+        self.update_items(collection, [(old_item, new_item)])
+
+    def remove_items(self, collection, items):
+        return self.bulk([('remove', collection, items)])[0]
+
+    def remove_item(self, collection, item):
+        self.remove_items(collection, [item])
+
+    def bulk(self, operations):
+        # (op, collection, items) operations, applied entirely or not at all;
+        # items are (old_item, new_item) pairs for 'update'
+        requests = []
+        for op, collection, items in operations:
+            edits = []
+            for item in items:
+                if op == 'update':
+                    old_item, item = item
+                    item.id = old_item.id
+                    edits.append(edit_data(op, item, old_item))
+                else:
+                    edits.append(edit_data(op, item, item))
+            requests.append({'op': op, 'collection': collection, 'items': edits})
+        return self.request('bulk', operations=requests)
+
+    def subscribe(self, collections=None):
+        # Change events of these collections, or of all of them, go to on_event
+        self.request('subscribe', collections=collections)
+
+    def flush(self):
+        self.request('flush')
+
+    def close(self):
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.socket.close()
+        self.thread.join()
+        self.reader.close()
+
+
+class RemoteStorage(StorageBackend):
+    # A CollectionService as the storage of a local CollectionManager, e.g.
+    # the GUI's. Collections are fetched in batches of ids and each batch of
+    # edits is sent as one bulk request with the versions it was made from.
+    # Edits other clients make are queued for CollectionManager.sync(), as
+    # are the saved versions of items whose edit was refused.
+    def __init__(self, address):
+        self.changes = queue.Queue()
+        self.client = ServiceClient(address, on_event=self.queue_event)
+        # Subscribed before any ids are fetched, so no edit falls in between
+        self.client.subscribe()
+        self.file_names = {collection: address for collection in self.client.collections()}
+
+    def queue_event(self, event):
+        changes = [(change['op'], item_from_data(change['item'])) for change in event['changes']]
+        self.changes.put((event['collection'], changes))
+
+    def stream_collection(self, collection, batch_size=1000):
+        ids = self.client.ids(collection)
+        for start in range(0, len(ids), batch_size):
+            items = self.client.get_items(collection, ids[start:start + batch_size])
+            yield [item for item in items if item is not None], min(start + batch_size, len(ids)), len(ids)
+
+    def compacts(self, collection, size, changes):
+        return False
+
+    def record_batch(self, collection, items, changes, compact=None):
+        operations = []
+        for op, item, old_item in changes:
+            if operations and operations[-1]['op'] == op:
+                operations[-1]['items'].append(edit_data(op, item, old_item))
+            else:
+                operations.append({'op': op, 'collection': collection, 'items': [edit_data(op, item, old_item)]})
+        try:
+            with span('record batch', 'storage', collection=collection, changes=len(changes)):
+                self.client.request('bulk', operations=operations)
+        except Exception:
+            # None of the batch was saved: put the saved versions back, or the
+            # versions the edits were made from if the service is out of reach
+            local = [item or old_item for _, item, old_item in changes]
+            try:
+                saved = self.client.get_items(collection, [item.id for item in local])
+            except (OSError, ValueError):
+                saved = [old_item for _, _, old_item in changes]
+            self.changes.put((collection, [('update', item) if item is not None else ('remove', local_item)
+                                           for local_item, item in zip(local, saved)]))
+            raise
+
+    def remote_changes(self):
+        changes = []
+        while True:
+            try:
+                changes.append(self.changes.get_nowait())
+            except queue.Empty:
+                return changes
+
+    def close(self, collections):
+        self.client.close()
@@ -0,0 +1,242 @@
+import array
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+
+from .models import ITEM_CLASSES
+
+# A snapshot holds one collection as columns: a class code per item and, for
+# each of the seven fields below, a fixed-width (offset, length) pair into a
+# shared string heap. It is read through mmap, so opening one costs the same
+# for ten items as for ten million and items are only built when touched.
+#
+#     header | heap | classes (u8) | per column: offsets (u64), lengths (u32)
+#
+# A length with JSON_VALUE set marks a value stored as JSON text (numbers,
+# None) rather than as a plain UTF-8 string.
+MAGIC = b'GWSNAP\r\n'
+VERSION = 1
+HEADER = struct.Struct('<8sIIQ40s40sQQIII')
+COLUMNS = ('id', 'title', 'genre', 'description', 'image_url', 'creator', 'extra')
+CLASS_NAMES = tuple(ITEM_CLASSES)
+CLASS_CODES = {name: code for code, name in enumerate(CLASS_NAMES)}
+# class code -> field name -> column, 'creator' included
+FIELD_COLUMNS = [dict({name: column for column, name in enumerate(ITEM_CLASSES[class_name].FIELDS)}, creator=5)
+                 for class_name in CLASS_NAMES]
+JSON_VALUE = 1 << 31
+LITTLE_ENDIAN = sys.byteorder == 'little'
+
+
+def padding(size):
+    return -size % 8
+
+
+def decode_values(heap, base, offsets, lengths):
+    # `heap` is a copy of the snapshot heap starting at offset `base`
+    values = []
+    for offset, length in zip(offsets, lengths):
+        offset -= base
+        if length & JSON_VALUE:
+            values.append(json.loads(heap[offset:offset + (length & ~JSON_VALUE)]))
+        else:
+            values.append(heap[offset:offset + length].decode('utf-8'))
+    return values
+
+
+def write_snapshot(file_name, items, source_hash, source_stamp):
+    # `source_hash` is the journal base of the JSON files the items came from
+    # and `source_stamp` tells whether those files changed since
+    items = list(items)
+    count = len(items)
+    classes = array.array('B', bytes(count))
+    offsets = [array.array('Q', bytes(8 * count)) for _ in COLUMNS]
+    lengths = [array.array('I', bytes(4 * count)) for _ in COLUMNS]
+    heap_crc = 0
+    heap_size = 0
+    temp_name = file_name + '.tmp'
+    with open(temp_name, 'wb') as f:
+        f.write(bytes(HEADER.size + padding(HEADER.size)))
+        heap_offset = f.tell()
+        chunk = []
+        for i, item in enumerate(items):
+            classes[i] = CLASS_CODES[item.__class__.__name__]
+            # Item.FIELDS lists the creator and extra field last, as COLUMNS does
+            for column, name in enumerate(item.FIELDS):
+                value = getattr(item, name)
+                if isinstance(value, str):
+                    data = value.encode('utf-8')
+                    length = len(data)
+                else:
+                    data = json.dumps(value).encode('utf-8')
+                    length = len(data) | JSON_VALUE
+                offsets[column][i] = heap_size
+                lengths[column][i] = length
+                heap_size += len(data)
+                chunk.append(data)
+            if len(chunk) >= 7000:
+                data = b''.join(chunk)
+                heap_crc = zlib.crc32(data, heap_crc)
+                f.write(data)
+                chunk = []
+        data = b''.join(chunk)
+        heap_crc = zlib.crc32(data, heap_crc)
+        f.write(data)
+        f.write(bytes(padding(heap_size)))
+        if not LITTLE_ENDIAN:
+            for column in range(len(COLUMNS)):
+                offsets[column].byteswap()
+                lengths[column].byteswap()
+        columns_crc = 0
+        for data in [classes] + [column for pair in zip(offsets, lengths) for column in pair]:
+            data = data.tobytes()
+            columns_crc = zlib.crc32(data, columns_crc)
+            f.write(data + bytes(padding(len(data))))
+        header = HEADER.pack(MAGIC, VERSION, len(COLUMNS), count, source_hash.encode('ascii'),
+                             source_stamp.encode('ascii'), heap_offset, heap_size, heap_crc, columns_crc, 0)
+        header = header[:-4] + struct.pack('<I', zlib.crc32(header[:-4]))
+        f.seek(0)
+        f.write(header)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_name, file_name)
+
+
+class Snapshot:
+    # A read-only, memory-mapped snapshot. Indexing builds the item at that
+    # position; title(), item_id(), image_url() and value() read single fields
+    # without building one.
+    # Pages are shared with every other process that maps the same file.
+    def __init__(self, file_name):
+        with open(file_name, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self.read_header()
+        except ValueError:
+            self.close()
+            raise
+
+    def read_header(self):
+        if len(self.mmap) < HEADER.size:
+            raise ValueError("Snapshot is truncated")
+        header = self.mmap[:HEADER.size]
+        (magic, version, columns, self.count, source_hash, source_stamp, heap_offset, heap_size,
+         self.heap_crc, self.columns_crc, header_crc) = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError("Not a collection snapshot")
+        if version != VERSION or columns != len(COLUMNS):
+            raise ValueError(f"Unsupported snapshot version {version}")
+        if zlib.crc32(header[:-4]) != header_crc:
+            raise ValueError("Snapshot header checksum mismatch")
+        if not LITTLE_ENDIAN:
+            raise ValueError("Snapshots can only be mapped on little-endian machines")
+        self.source_hash = source_hash.decode('ascii')
+        self.source_stamp = source_stamp.decode('ascii')
+        count = self.count
+        columns_start = heap_offset + heap_size + padding(heap_size)
+        column_size = 8 * count + 4 * count + padding(4 * count)
+        if columns_start + count + padding(count) + len(COLUMNS) * column_size > len(self.mmap):
+            raise ValueError("Snapshot is truncated")
+        view = memoryview(self.mmap)
+        self.heap = view[heap_offset:heap_offset + heap_size]
+        position = columns_start
+        self.classes = view[position:position + count]
+        position += count + padding(count)
+        self.offsets = []
+        self.lengths = []
+        for _ in COLUMNS:
+            self.offsets.append(view[position:position + 8 * count].cast('Q'))
+            position += 8 * count
+            self.lengths.append(view[position:position + 4 * count].cast('I'))
+            position += 4 * count + padding(4 * count)
+        view.release()
+
+    def verify(self):
+        # Checks the heap and column checksums, which opening skips to stay O(1)
+        if zlib.crc32(self.heap) != self.heap_crc:
+            raise ValueError("Snapshot heap checksum mismatch")
+        columns_crc = 0
+        for data in [self.classes] + [column for pair in zip(self.offsets, self.lengths) for column in pair]:
+            columns_crc = zlib.crc32(data, columns_crc)
+        if columns_crc != self.columns_crc:
+            raise ValueError("Snapshot column checksum mismatch")
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.count)
+            if step == 1:
+                return self.items(start, stop)
+            return [self.item(i) for i in range(start, stop, step)]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("snapshot index out of range")
+        return self.item(index)
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self.item(i)
+
+    def value(self, column, index):
+        offset = self.offsets[column][index]
+        length = self.lengths[column][index]
+        if length & JSON_VALUE:
+            return json.loads(str(self.heap[offset:offset + (length & ~JSON_VALUE)], 'utf-8'))
+        return str(self.heap[offset:offset + length], 'utf-8')
+
+    def title(self, index):
+        return self.value(1, index)
+
+    def item_id(self, index):
+        return self.value(0, index)
+
+    def image_url(self, index):
+        return self.value(4, index)
+
+    def item(self, index):
+        item_id, title, genre, description, image_url, creator, extra = [
+            self.value(column, index) for column in range(len(COLUMNS))]
+        item_class = ITEM_CLASSES[CLASS_NAMES[self.classes[index]]]
+        return item_class(title, creator, genre, extra, description, image_url, item_id)
+
+    def heap_range(self, start, stop):
+        # The part of the heap holding items start..stop, and where it begins
+        base = self.offsets[0][start]
+        end = self.offsets[0][stop] if stop < self.count else len(self.heap)
+        return bytes(self.heap[base:end]), base
+
+    def column(self, column, start, stop):
+        # The values of one column for items start..stop, without building items
+        if start >= stop:
+            return []
+        heap, base = self.heap_range(start, stop)
+        return decode_values(heap, base, self.offsets[column][start:stop].tolist(),
+                             self.lengths[column][start:stop].tolist())
+
+    def class_codes(self, start, stop):
+        return self.classes[start:stop].tolist()
+
+    def items(self, start, stop):
+        # Builds a run of items from one copy of their part of the heap
+        if start >= stop:
+            return []
+        heap, base = self.heap_range(start, stop)
+        columns = [decode_values(heap, base, offsets[start:stop].tolist(), lengths[start:stop].tolist())
+                   for offsets, lengths in zip(self.offsets, self.lengths)]
+        item_classes = [ITEM_CLASSES[CLASS_NAMES[code]] for code in self.class_codes(start, stop)]
+        return [item_class(title, creator, genre, extra, description, image_url, item_id)
+                for item_class, item_id, title, genre, description, image_url, creator, extra
+                in zip(item_classes, *columns)]
+
+    def close(self):
+        for name in ('heap', 'classes', 'offsets', 'lengths'):
+            views = getattr(self, name, None)
+            for view in (views if isinstance(views, list) else [views]):
+                if view is not None:
+                    view.release()
+        self.mmap.close()
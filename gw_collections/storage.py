@@ -0,0 +1,706 @@
+import codecs
+import hashlib
+import json
+import os
+import pickle
+import re
+import sqlite3
+
+from .collection import ItemCollection, PagedCollection
+from .metrics import count, span
+from .models import item_creator, item_from_dict, new_item_id, validate_items
+from .query import facet_value
+from .search import TOKEN_PATTERN
+from .snapshot import Snapshot, write_snapshot
+
+
+class StorageBackend:
+    # What CollectionManager needs from its storage; FileManager keeps
+    # collections in JSON files, SQLiteStorage in a SQLite database
+    # Storages whose search() and query() can answer set this, so the
+    # manager doesn't build in-memory indexes for them up front
+    answers_queries = False
+
+    def load_data(self, cache_size=None):
+        # With a cache_size, collections that can be paged are opened as a
+        # PagedCollection keeping that many built items instead of loaded in full
+        collections = {}
+        for collection in self.file_names:
+            with span('load collection', 'storage', collection=collection):
+                items = self.page_collection(collection, cache_size) if cache_size else None
+                if items is None:
+                    items = ItemCollection()
+                    for batch, _, _ in self.stream_collection(collection):
+                        items.extend(batch)
+                self.finish_loading(collection, items)
+                collections[collection] = items
+            count('items loaded', len(items))
+        return collections
+
+    def page_collection(self, collection, cache_size):
+        # A PagedCollection over the stored collection, or None if it has to be streamed
+        return None
+
+    def discard_snapshot(self, collection):
+        # The snapshot a PagedCollection was opened on turned out damaged
+        pass
+
+    def stream_collection(self, collection, batch_size=1000):
+        # Yields (items, done, total) batches, done/total being a progress measure
+        raise NotImplementedError
+
+    def finish_loading(self, collection, items):
+        # Called once every batch is in place; returns the number of changes
+        # applied on top of the streamed items
+        return 0
+
+    def record_batch(self, collection, items, changes, compact=None):
+        # Persist a list of (op, item, old_item) changes, already applied to
+        # `items` in that order, as a single write; `compact` is what
+        # compacts() said for them, if the caller asked beforehand
+        raise NotImplementedError
+
+    def compacts(self, collection, size, changes):
+        # Whether record_batch would rewrite the whole collection, the only
+        # time it reads `items` rather than just the changes
+        return True
+
+    def search(self, collection, term):
+        # Ids of the items matching `term`, best first, or None if only the
+        # manager's in-memory index can answer
+        return None
+
+    def query(self, collection, filters, sort):
+        # Ids of the items matching the facet `filters` in `sort` order, or None
+        return None
+
+    def remote_changes(self):
+        # [(collection, [(op, item)])] edits saved by other clients since the
+        # last call, for storages shared with them
+        return []
+
+    def close(self, collections):
+        pass
+
+
+def iter_json_objects(f, digest=None, chunk_size=1 << 16):
+    # Yields (object, bytes_read) for each top-level object of a JSON array or
+    # JSON Lines file, reading it in chunks instead of all at once
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    pos = 0
+    bytes_read = 0
+    eof = False
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,[]':
+            pos += 1
+        if pos < len(buffer):
+            try:
+                obj, end = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                if eof:
+                    raise
+            else:
+                yield obj, bytes_read
+                pos = end
+                continue
+        elif eof:
+            return
+        # The next object continues past the buffer, read another chunk
+        chunk = f.read(chunk_size)
+        if digest is not None:
+            digest.update(chunk)
+        bytes_read += len(chunk)
+        eof = not chunk
+        buffer = buffer[pos:] + text_decoder.decode(chunk, final=eof)
+        pos = 0
+
+
+def read_shard(file_name):
+    # Runs in a loader process: parse and validate one shard file and send its
+    # items back as a single protocol 5 pickle, which the parent unpickles in C
+    digest = hashlib.sha1()
+    items = []
+    missing_ids = False
+    with open(file_name, 'rb') as f:
+        for item_data, _ in iter_json_objects(f, digest):
+            if 'id' not in item_data:
+                missing_ids = True
+            item = item_from_dict(item_data)
+            if item is not None:
+                items.append(item)
+    validate_items(items)
+    return pickle.dumps((items, digest.hexdigest(), missing_ids), protocol=5)
+
+
+def shards_hash(digests):
+    return hashlib.sha1(''.join(digests).encode('ascii')).hexdigest()
+
+
+class FileManager(StorageBackend):
+    def __init__(self, file_names, compact_threshold=1000, workers=None, binary_snapshots=False):
+        # A collection is kept in one JSON file or, for large catalogues, in a
+        # list of shard files that are parsed in parallel by `workers`
+        # processes (default: one per core)
+        self.file_names = file_names
+        self.workers = workers
+        # With binary_snapshots, a memory-mapped copy of each collection is
+        # kept next to its JSON files and read instead while they are unchanged
+        self.binary_snapshots = binary_snapshots
+        # Edits are appended to a per-collection journal and folded into the
+        # JSON snapshot once the journal outgrows the collection
+        self.compact_threshold = compact_threshold
+        self.snapshot_hashes = {}
+        self.journal_sizes = {}
+        # Collections whose snapshot lacks ids (or repeats one); they are
+        # rewritten once loaded, or before the first journal record refers
+        # to an id if that fails
+        self.unsaved_ids = set()
+
+    def shards(self, collection):
+        file_names = self.file_names[collection]
+        return [file_names] if isinstance(file_names, str) else list(file_names)
+
+    def journal_name(self, collection):
+        return self.shards(collection)[0] + '.journal'
+
+    def snapshot_name(self, collection):
+        return self.shards(collection)[0] + '.snap'
+
+    def source_stamp(self, collection):
+        # Changes whenever one of the collection's JSON files is rewritten
+        stamp = hashlib.sha1()
+        for file_name in self.shards(collection):
+            if os.path.exists(file_name):
+                stat = os.stat(file_name)
+                stamp.update(f'{file_name}\0{stat.st_size}\0{stat.st_mtime_ns}\0'.encode('utf-8'))
+        return stamp.hexdigest()
+
+    def open_snapshot(self, collection, verify=False):
+        # The collection's binary snapshot, or None if there is no usable one.
+        # With verify, its checksums are checked too, which reads all of it
+        snapshot_name = self.snapshot_name(collection)
+        if not self.binary_snapshots or not os.path.exists(snapshot_name):
+            return None
+        try:
+            snapshot = Snapshot(snapshot_name)
+        except (OSError, ValueError):
+            return None
+        if snapshot.source_stamp != self.source_stamp(collection):
+            snapshot.close()
+            return None
+        if verify:
+            try:
+                snapshot.verify()
+            except ValueError:
+                snapshot.close()
+                return None
+        return snapshot
+
+    def discard_snapshot(self, collection):
+        # The open mapping stays readable; the next start streams the JSON files
+        try:
+            os.remove(self.snapshot_name(collection))
+        except OSError:
+            pass
+
+    def write_snapshot(self, collection, items):
+        with span('save binary snapshot', 'storage', collection=collection, items=len(items)):
+            write_snapshot(self.snapshot_name(collection), items, self.snapshot_hashes[collection],
+                           self.source_stamp(collection))
+
+    def page_collection(self, collection, cache_size):
+        # Opening doesn't read the snapshot, so its checksums aren't checked
+        # here; see PagedCollection.verify
+        snapshot = self.open_snapshot(collection)
+        if snapshot is None:
+            return None
+        self.snapshot_hashes[collection] = snapshot.source_hash
+        return PagedCollection(snapshot, cache_size)
+
+    def stream_collection(self, collection, batch_size=1000):
+        # Yields (items, done, total) batches from the binary snapshot if there
+        # is a current, intact one, from the JSON files otherwise; the journal
+        # is replayed separately once every batch is in place
+        if not self.binary_snapshots:
+            yield from self.stream_json(collection, batch_size)
+            return
+        snapshot = self.open_snapshot(collection, verify=True)
+        if snapshot is not None:
+            try:
+                self.snapshot_hashes[collection] = snapshot.source_hash
+                for start in range(0, len(snapshot), batch_size):
+                    end = min(start + batch_size, len(snapshot))
+                    yield snapshot[start:end], end, len(snapshot)
+            finally:
+                snapshot.close()
+            return
+        loaded = []
+        for batch in self.stream_json(collection, batch_size):
+            loaded.extend(batch[0])
+            yield batch
+        # Collections without ids get theirs, and a snapshot, when finish_loading compacts them
+        if collection not in self.unsaved_ids:
+            try:
+                self.write_snapshot(collection, loaded)
+            except OSError:
+                pass  # the snapshot only speeds up the next start
+
+    def stream_json(self, collection, batch_size=1000):
+        # Yields (items, bytes_read, total_bytes) batches from the JSON files
+        shards = self.shards(collection)
+        if len(shards) > 1 and (self.workers or os.cpu_count() or 1) > 1:
+            yield from self.stream_shards(collection, shards, batch_size)
+            return
+        sharded = len(shards) > 1
+        shards = [file_name for file_name in shards if os.path.exists(file_name)]
+        total_bytes = sum(os.path.getsize(file_name) for file_name in shards)
+        done = 0
+        digests = []
+        batch = []
+        seen = set()
+        for file_name in shards:
+            digest = hashlib.sha1()
+            with open(file_name, 'rb') as f:
+                for item_data, bytes_read in iter_json_objects(f, digest):
+                    if 'id' not in item_data:
+                        self.unsaved_ids.add(collection)
+                    item = self.load_item(item_data)
+                    if item is None:
+                        continue
+                    if item.id in seen:
+                        item.id = new_item_id()
+                        self.unsaved_ids.add(collection)
+                    seen.add(item.id)
+                    batch.append(item)
+                    if len(batch) >= batch_size:
+                        yield batch, done + bytes_read, total_bytes
+                        batch = []
+            done += os.path.getsize(file_name)
+            digests.append(digest.hexdigest())
+        if batch:
+            yield batch, done, total_bytes
+        if sharded:
+            self.snapshot_hashes[collection] = shards_hash(digests)
+        else:
+            self.snapshot_hashes[collection] = digests[0] if digests else hashlib.sha1(b'').hexdigest()
+
+    def stream_shards(self, collection, shards, batch_size):
+        # Shards are parsed in a process pool and handed back in order
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        shards = [file_name for file_name in shards if os.path.exists(file_name)]
+        total_bytes = sum(os.path.getsize(file_name) for file_name in shards)
+        bytes_read = 0
+        digests = []
+        seen = set()
+        # Spawned rather than forked: the GUI loads from a thread next to Tk
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(self.workers, mp_context=context) as executor:
+            for file_name, result in zip(shards, executor.map(read_shard, shards)):
+                items, digest, missing_ids = pickle.loads(result)
+                digests.append(digest)
+                if missing_ids:
+                    self.unsaved_ids.add(collection)
+                for item in items:
+                    if item.id in seen:
+                        item.id = new_item_id()
+                        self.unsaved_ids.add(collection)
+                    seen.add(item.id)
+                bytes_read += os.path.getsize(file_name)
+                for start in range(0, len(items), batch_size):
+                    yield items[start:start + batch_size], bytes_read, total_bytes
+        self.snapshot_hashes[collection] = shards_hash(digests)
+
+    def load_item(self, item_data):
+        return item_from_dict(item_data)
+
+    def finish_loading(self, collection, items):
+        changes = self.replay_journal(collection, items)
+        # Items read without ids (or with repeated ones) got new ones; they are
+        # written back at once so they stay the same on the next start, which
+        # can then also open the binary snapshot written alongside
+        if collection in self.unsaved_ids:
+            try:
+                self.compact(collection, items)
+            except OSError:
+                pass  # written on the first edit instead
+        return changes
+
+    def replay_journal(self, collection, items):
+        self.journal_sizes[collection] = 0
+        journal_name = self.journal_name(collection)
+        if not os.path.exists(journal_name):
+            return 0
+        with open(journal_name, 'r') as f:
+            lines = f.read().splitlines()
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # A torn final line from a crash mid-append
+                break
+        # The journal only applies to the snapshot it was started from; if the
+        # snapshot was rewritten after it, its edits are already folded in
+        if not records or records[0].get('base') != self.snapshot_hashes[collection]:
+            return 0
+        for record in records[1:]:
+            op = record['op']
+            if op == 'add':
+                item = self.load_item(record['item'])
+                if item is not None:
+                    items.add(item)
+            elif op == 'update':
+                item = self.load_item(record['item'])
+                if item is not None:
+                    items.replace(item)
+            elif op == 'remove':
+                items.remove(record['id'])
+        self.journal_sizes[collection] = len(records) - 1
+        return len(records) - 1
+
+    def save_data(self, collections):
+        # Rewrites whole collections; the manager only ever records batches
+        for collection, items in collections.items():
+            self.compact(collection, items)
+
+    def save_collection(self, collection):
+        collection_data = []
+        for item in collection:
+            collection_data.append(self.save_item(item))
+        return collection_data
+
+    def save_item(self, item):
+        return item.to_dict()
+
+    def compacts(self, collection, size, changes):
+        journal_size = self.journal_sizes.get(collection, 0) + len(changes)
+        return journal_size > max(self.compact_threshold, size) or collection in self.unsaved_ids
+
+    def record_batch(self, collection, items, changes, compact=None):
+        # Append the changes to the collection's journal with one write and
+        # fsync, or rewrite the snapshot instead once the journal outgrows it
+        if compact is None:
+            compact = self.compacts(collection, len(items), changes)
+        if compact:
+            self.compact(collection, items)
+            return
+        journal_size = self.journal_sizes.get(collection, 0) + len(changes)
+        with span('journal write', 'storage', collection=collection, changes=len(changes)):
+            lines = []
+            for op, item, old_item in changes:
+                record = {'op': op}
+                if item is not None:
+                    record['item'] = self.save_item(item)
+                else:
+                    record['id'] = old_item.id
+                lines.append(json.dumps(record) + '\n')
+            journal_name = self.journal_name(collection)
+            if not os.path.exists(journal_name):
+                self.write_file(journal_name, self.journal_header(collection))
+            with open(journal_name, 'a') as f:
+                f.write(''.join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+        self.journal_sizes[collection] = journal_size
+
+    def compact(self, collection, items):
+        shards = self.shards(collection)
+        with span('save snapshot', 'storage', collection=collection, items=len(items)):
+            collection_data = self.save_collection(items)
+            if len(shards) == 1:
+                snapshot = json.dumps(collection_data).encode('utf-8')
+                self.write_file(shards[0], snapshot)
+                snapshot_hash = hashlib.sha1(snapshot).hexdigest()
+                saved = len(snapshot)
+            else:
+                # Items are spread evenly over the shards, in order
+                per_shard = -(-len(collection_data) // len(shards))
+                snapshots = [json.dumps(collection_data[i * per_shard:(i + 1) * per_shard]).encode('utf-8')
+                             for i in range(len(shards))]
+                self.write_files(list(zip(shards, snapshots)))
+                snapshot_hash = shards_hash([hashlib.sha1(snapshot).hexdigest() for snapshot in snapshots])
+                saved = sum(map(len, snapshots))
+        count('bytes saved', saved)
+        self.snapshot_hashes[collection] = snapshot_hash
+        self.unsaved_ids.discard(collection)
+        if self.binary_snapshots:
+            self.write_snapshot(collection, items)
+        # Starting a fresh journal last keeps a crash in between harmless:
+        # the old journal no longer matches the new snapshot and is ignored
+        self.write_file(self.journal_name(collection), self.journal_header(collection))
+        self.journal_sizes[collection] = 0
+
+    def compact_pending(self, collections):
+        for collection, items in collections.items():
+            if self.journal_sizes.get(collection):
+                self.compact(collection, items)
+
+    def close(self, collections):
+        self.compact_pending(collections)
+
+    def journal_header(self, collection):
+        return (json.dumps({'base': self.snapshot_hashes.get(collection, hashlib.sha1(b'').hexdigest())}) + '\n').encode('utf-8')
+
+    def write_file(self, file_name, data):
+        # Write to a temporary file and rename it over the target so readers
+        # never see a half-written file
+        self.write_files([(file_name, data)])
+
+    def write_files(self, files):
+        # Every file is written out before any of them replaces its target,
+        # which keeps the window where shards disagree down to the renames
+        for file_name, data in files:
+            with open(file_name + '.tmp', 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        for file_name, _ in files:
+            os.replace(file_name + '.tmp', file_name)
+
+
+def fts_phrase(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+class SQLiteStorage(StorageBackend):
+    # One table per collection with indexed title/genre/creator columns and
+    # two FTS5 tables for text search, one by trigram for substrings and one
+    # by word; the JSON files are imported on first run
+    answers_queries = True
+    QUERY_COLUMNS = ('title', 'genre', 'creator')
+
+    def __init__(self, db_path, file_names):
+        self.db_path = db_path
+        self.file_names = file_names
+        for collection in self.file_names:
+            if not re.fullmatch(r'[A-Za-z_]\w*', collection):
+                raise ValueError(f"Invalid collection name: {collection!r}")
+        self.rowids = {collection: {} for collection in self.file_names}  # item id -> rowid
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        with self.connection:
+            self.connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            for collection in self.file_names:
+                self.create_tables(collection)
+        self.migrate()
+        self.backfill_ids()
+        self.backfill_words()
+
+    def create_tables(self, collection):
+        self.connection.execute(f'''CREATE TABLE IF NOT EXISTS {collection} (
+            id INTEGER PRIMARY KEY,
+            class TEXT NOT NULL,
+            title TEXT,
+            genre TEXT,
+            creator TEXT,
+            data TEXT NOT NULL)''')
+        for column in ('title', 'genre', 'creator'):
+            self.connection.execute(
+                f'CREATE INDEX IF NOT EXISTS {collection}_{column} ON {collection} ({column} COLLATE NOCASE)')
+        self.connection.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {collection}_fts USING fts5("
+            f"title, creator, genre, description, tokenize='trigram')")
+        self.connection.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {collection}_words USING fts5("
+            f"title, creator, genre, description, "
+            f"tokenize=\"unicode61 remove_diacritics 0 tokenchars '_'\", prefix='1 2')")
+
+    def migrate(self):
+        json_files = FileManager(self.file_names)
+        for collection, file_name in self.file_names.items():
+            key = f'migrated:{collection}'
+            if self.connection.execute('SELECT 1 FROM meta WHERE key = ?', (key,)).fetchone():
+                continue
+            items = ItemCollection()
+            for batch, _, _ in json_files.stream_collection(collection):
+                items.extend(batch)
+            # Only the journal is read; the JSON files are left as they are
+            json_files.replay_journal(collection, items)
+            with self.connection:
+                self.insert_rows(collection, items)
+                self.rowids[collection] = {}
+                files = file_name if isinstance(file_name, str) else json.dumps(file_name)
+                self.connection.execute('INSERT INTO meta (key, value) VALUES (?, ?)', (key, files))
+
+    def backfill_ids(self):
+        # Rows stored before items had ids get one, so they stay stable across runs
+        for collection in self.file_names:
+            rows = self.connection.execute(
+                f"SELECT id FROM {collection} WHERE json_extract(data, '$.id') IS NULL").fetchall()
+            if rows:
+                with self.connection:
+                    self.connection.executemany(
+                        f"UPDATE {collection} SET data = json_set(data, '$.id', ?) WHERE id = ?",
+                        [(new_item_id(), rowid) for rowid, in rows])
+
+    def backfill_words(self):
+        # Databases made before the word index get it from the trigram one
+        for collection in self.file_names:
+            if self.connection.execute(f'SELECT 1 FROM {collection}_words LIMIT 1').fetchone():
+                continue
+            with self.connection:
+                self.connection.execute(
+                    f'INSERT INTO {collection}_words (rowid, title, creator, genre, description) '
+                    f'SELECT rowid, title, creator, genre, description FROM {collection}_fts')
+
+    def stream_collection(self, collection, batch_size=1000):
+        # Yields (items, rows_read, total_rows); a separate connection lets the
+        # loader thread read while the Tk thread writes other collections
+        connection = sqlite3.connect(self.db_path)
+        try:
+            total = connection.execute(f'SELECT COUNT(*) FROM {collection}').fetchone()[0]
+            cursor = connection.execute(f'SELECT id, data FROM {collection} ORDER BY id')
+            rowids = self.rowids[collection]
+            done = 0
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                items = []
+                for rowid, data in rows:
+                    item = item_from_dict(json.loads(data))
+                    if item is not None:
+                        rowids[item.id] = rowid
+                        items.append(item)
+                done += len(rows)
+                yield items, done, total
+        finally:
+            connection.close()
+
+    def compacts(self, collection, size, changes):
+        return False
+
+    def record_batch(self, collection, items, changes, compact=None):
+        rowids = self.rowids[collection]
+        # Each batch of edits is one transaction
+        with span('record batch', 'storage', collection=collection, changes=len(changes)), self.connection:
+            for op, item, old_item in changes:
+                if op == 'add':
+                    rowids[item.id] = self.insert_row(collection, item)
+                elif op == 'update':
+                    rowid = rowids.pop(old_item.id)
+                    self.delete_row(collection, rowid)
+                    rowids[item.id] = self.insert_row(collection, item, rowid)
+                elif op == 'remove':
+                    self.delete_row(collection, rowids.pop(old_item.id))
+
+    def save_data(self, collections):
+        with span('save data', 'storage'), self.connection:
+            for collection, items in collections.items():
+                self.connection.execute(f'DELETE FROM {collection}')
+                self.connection.execute(f'DELETE FROM {collection}_fts')
+                self.connection.execute(f'DELETE FROM {collection}_words')
+                self.rowids[collection] = {}
+                self.insert_rows(collection, items)
+
+    def insert_rows(self, collection, items):
+        rowids = self.rowids[collection]
+        for item in items:
+            rowids[item.id] = self.insert_row(collection, item)
+
+    def insert_row(self, collection, item, rowid=None):
+        cursor = self.connection.execute(
+            f'INSERT INTO {collection} (id, class, title, genre, creator, data) VALUES (?, ?, ?, ?, ?, ?)',
+            (rowid, item.__class__.__name__, str(item.title), str(item.genre), str(item_creator(item)),
+             json.dumps(item.to_dict())))
+        rowid = cursor.lastrowid
+        texts = (rowid, str(item.title), str(item_creator(item)), str(item.genre), str(item.description))
+        for table in (f'{collection}_fts', f'{collection}_words'):
+            self.connection.execute(
+                f'INSERT INTO {table} (rowid, title, creator, genre, description) VALUES (?, ?, ?, ?, ?)', texts)
+        return rowid
+
+    def delete_row(self, collection, rowid):
+        self.connection.execute(f'DELETE FROM {collection} WHERE id = ?', (rowid,))
+        self.connection.execute(f'DELETE FROM {collection}_fts WHERE rowid = ?', (rowid,))
+        self.connection.execute(f'DELETE FROM {collection}_words WHERE rowid = ?', (rowid,))
+
+    def search(self, collection, term):
+        # Ids of the items SearchIndex would match: ones holding the query in
+        # their title, creator or genre, through the trigram index, and ones
+        # holding every word of it, the last one also as the start of a
+        # description word, through the word index; best first
+        query = term.lower().strip()
+        if len(query) < 3:
+            return self.title_prefix(collection, query)
+        tokens = TOKEN_PATTERN.findall(query)
+        matches = [(f'{collection}_fts', '{title creator genre} : ' + fts_phrase(query))]
+        if tokens:
+            words = [fts_phrase(token) for token in tokens]
+            if len(tokens[-1]) >= 3:
+                words[-1] = f'({words[-1]} OR description : {words[-1]} *)'
+            matches.append((f'{collection}_words', ' AND '.join(words)))
+        params = [expression for _, expression in matches]
+        # Ranked by the trigram index, when the query and its words are long
+        # enough for it to find a superset of the matches
+        long_words = [fts_phrase(token) for token in tokens if len(token) >= 3]
+        if long_words:
+            source = f'{collection}_fts JOIN {collection} t ON t.id = {collection}_fts.rowid'
+            where = [f'{collection}_fts MATCH ?']
+            params.insert(0, f"{fts_phrase(query)} OR ({' AND '.join(long_words)})")
+            order = f'bm25({collection}_fts, 8.0, 4.0, 2.0, 1.0)'
+        else:
+            source, where, order = f'{collection} t', [], 't.title COLLATE NOCASE'
+        matched = ' OR '.join(f't.id IN (SELECT rowid FROM {table} WHERE {table} MATCH ?)' for table, _ in matches)
+        where.append(f'({matched})')
+        rows = self.connection.execute(
+            f"SELECT json_extract(t.data, '$.id') FROM {source} WHERE {' AND '.join(where)} ORDER BY {order}",
+            params)
+        return [item_id for item_id, in rows]
+
+    def title_prefix(self, collection, query):
+        # Titles starting with a one or two character query, then titles with
+        # a word starting with it, each in title order as SearchIndex has them
+        if not query:
+            return []
+        words = TOKEN_PATTERN.fullmatch(query)
+        if words:
+            rows = self.connection.execute(
+                f"SELECT t.title, json_extract(t.data, '$.id') FROM {collection}_words "
+                f"JOIN {collection} t ON t.id = {collection}_words.rowid WHERE {collection}_words MATCH ?",
+                (f'title : {fts_phrase(query)} *',))
+        else:
+            pattern = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            rows = self.connection.execute(
+                f"SELECT title, json_extract(data, '$.id') FROM {collection} WHERE title LIKE ? ESCAPE '\\'",
+                (pattern,))
+        ranked = []
+        for title, item_id in rows:
+            title = title.lower()
+            starts = title.startswith(query)
+            # Only a query of word characters can start a word past the first
+            if starts or words:
+                ranked.append((not starts, title, item_id))
+        return [item_id for _, _, item_id in sorted(ranked)]
+
+    def query(self, collection, filters, sort):
+        # Item ids matching facet filters on the indexed columns (matched
+        # case-insensitively), by title or in storage order; None for other
+        # filters and sort orders, and without filters, where every row would
+        # be read and an in-memory sorted index does better
+        if not filters or any(field not in self.QUERY_COLUMNS for field in filters):
+            return None
+        if tuple(sort or ()) not in ((), ('title',)):
+            return None
+        conditions = []
+        params = []
+        for field, values in filters.items():
+            if isinstance(values, (str, int, float)):
+                values = [values]
+            values = [facet_value(value) for value in values]
+            conditions.append(f'{field} COLLATE NOCASE IN ({", ".join("?" * len(values))})')
+            params += values
+        sql = f"SELECT json_extract(data, '$.id') FROM {collection}"
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY title COLLATE NOCASE, id' if sort else ' ORDER BY id'
+        return [item_id for item_id, in self.connection.execute(sql, params)]
+
+    def close(self, collections):
+        self.connection.execute('PRAGMA optimize')
+        self.connection.close()
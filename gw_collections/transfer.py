@@ -0,0 +1,64 @@
+import csv
+import json
+import os
+
+from .models import ITEM_CLASSES, item_from_dict
+from .storage import iter_json_objects
+
+
+def read_rows(file_name):
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension == '.csv':
+        with open(file_name, 'r', newline='', encoding='utf-8') as f:
+            yield from csv.DictReader(f)
+    elif extension in ('.jsonl', '.ndjson', '.json'):
+        with open(file_name, 'rb') as f:
+            for row, _ in iter_json_objects(f):
+                yield row
+    else:
+        raise ValueError(f"Unsupported file type: {file_name}")
+
+
+def read_items(file_name, item_class=None):
+    # Reads every row before returning so a bad file is rejected as a whole,
+    # with one message listing all of its problems
+    if isinstance(item_class, type):
+        item_class = item_class.__name__
+    items = []
+    errors = []
+    for number, row in enumerate(read_rows(file_name), 1):
+        if not isinstance(row, dict):
+            errors.append(f"row {number}: expected an object, got {type(row).__name__}")
+            continue
+        class_name = row.get('class') or item_class
+        if class_name not in ITEM_CLASSES:
+            errors.append(f"row {number}: unknown class {class_name!r}")
+            continue
+        row['class'] = class_name
+        try:
+            items.append(item_from_dict(row))
+        except KeyError as e:
+            errors.append(f"row {number}: missing field {e}")
+    if errors:
+        raise ValueError(f"{file_name}: {len(errors)} invalid rows:\n" + "\n".join(errors))
+    return items
+
+
+def write_items(file_name, items):
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension not in ('.csv', '.jsonl', '.ndjson'):
+        raise ValueError(f"Unsupported file type: {file_name}")
+    temp_name = file_name + '.tmp'
+    with open(temp_name, 'w', newline='', encoding='utf-8') as f:
+        if extension == '.csv':
+            fieldnames = ['class']
+            for class_name in sorted({item.__class__.__name__ for item in items}):
+                fieldnames += [name for name in ITEM_CLASSES[class_name].FIELDS if name not in fieldnames]
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            for item in items:
+                writer.writerow(item.to_dict())
+        else:
+            for item in items:
+                f.write(json.dumps(item.to_dict()) + '\n')
+    os.replace(temp_name, file_name)